@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""压测客户端资源监控: 区分服务器瓶颈与客户端 (sysbench) 瓶颈
+
+所有 CPU/IO 监控原本都来自 MySQL 服务器，客户端自己的 CPU、软中断和网卡从未记录，
+无法判断 QPS 上不去是服务器到了极限还是压测机到了极限。压测期间在客户端本机运行
+proc_sampler.py --procs sysbench，写入结果目录的 client_sampler.log。
+
+每个测试只取负载运行期间 (THREADS_STARTED ~ STATS_PRINTED) 的客户端样本；客户端样本与
+sysbench 使用同一个时钟，不需要估计时钟偏差。客户端整体CPU或最忙核先达到饱和阈值、
+而服务器CPU低于客户端且未饱和时，标记为客户端瓶颈: 这类结果不能作为服务器容量。
+"""
+import os
+from datetime import datetime
+
+from cpu_hotspot import summarize_cpu_hotspots
+from monitor_collectors import parse_proc_sampler_log
+from network_metrics import network_sample
+from time_align import TIME_FORMAT
+from compressed_logs import log_exists
+
+CLIENT_LOG = 'client_sampler.log'
+
+# 客户端整体CPU利用率达到该值视为饱和 (%)
+CLIENT_SATURATION_UTIL = 85.0
+# 客户端最忙核利用率达到该值视为饱和 (%)，网卡中断或 sysbench 单线程打满一个核时整体CPU并不高
+CLIENT_CORE_SATURATION = 95.0
+# 服务器CPU利用率低于该值才认为服务器尚未饱和 (%)
+SERVER_SATURATION_UTIL = 85.0
+
+# 报告中展示的列: (列名, 汇总键, 格式)
+CLIENT_COLUMNS = [
+    ('客户端CPU(%)', 'cpu_util', '{:.1f}'),
+    ('客户端最忙核(%)', 'max_core_util', '{:.1f}'),
+    ('客户端软中断(%)', 'cpu_sirq', '{:.1f}'),
+    ('sysbench CPU(核)', 'proc_cores', '{:.2f}'),
+    ('客户端入包/s', 'pkts_in', '{:,.0f}'),
+    ('客户端出包/s', 'pkts_out', '{:,.0f}'),
+    ('服务器CPU(%)', 'server_util', '{:.1f}'),
+    ('判定', 'verdict', '{}'),
+]
+
+
+def load_client_data(result_dir):
+    """读取客户端采样数据，没有时返回空字典"""
+    log_file = os.path.join(result_dir, CLIENT_LOG)
+    if not log_exists(log_file):
+        return {}
+    return parse_proc_sampler_log(log_file)
+
+
+def client_window(client_data, test_times):
+    """负载运行期间的客户端样本 (按时间排序)；没有毫秒时间点的旧结果按秒级起止时间"""
+    if not client_data:
+        return []
+    if test_times.get('threads_started_ms') and test_times.get('stats_printed_ms'):
+        start = datetime.fromtimestamp(test_times['threads_started_ms'] / 1000.0)
+        end = datetime.fromtimestamp(test_times['stats_printed_ms'] / 1000.0)
+    elif test_times.get('start') and test_times.get('end'):
+        start = datetime.strptime(test_times['start'], TIME_FORMAT)
+        end = datetime.strptime(test_times['end'], TIME_FORMAT)
+    else:
+        return []
+    # 第一个完整的采样周期从负载开始后才算起
+    return [client_data[ts] for ts in sorted(client_data) if start < ts <= end]
+
+
+def _cpu_util(sample):
+    if 'cpu_util' in sample:
+        return sample['cpu_util']
+    return sample['cpu_user'] + sample['cpu_sys'] + sample['cpu_wait'] + sample['cpu_sirq']
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def summarize_client(samples, server_samples):
+    """汇总一个测试的客户端样本，没有样本时返回 None
+
+    server_samples 为同一测试按秒对齐的服务器监控样本，用于比较谁先饱和。
+    """
+    if not samples:
+        return None
+
+    hotspot = summarize_cpu_hotspots(samples)
+    networks = [network_sample(s) for s in samples]
+    summary = {
+        'cpu_util': _mean(_cpu_util(s) for s in samples),
+        'cpu_sirq': _mean(s['cpu_sirq'] for s in samples),
+        'max_core_util': hotspot['max_core_util'] if hotspot else None,
+        'proc_cores': _mean(s['proc_cpu'] / 100.0 for s in samples if 'proc_cpu' in s),
+        'pkts_in': _mean(n['pkts_in'] for n in networks),
+        'pkts_out': _mean(n['pkts_out'] for n in networks),
+        'server_util': _mean(_cpu_util(s) for s in server_samples if s),
+        'sample_count': len(samples),
+    }
+    summary['client_bound'] = client_bound(summary)
+    summary['verdict'] = '⚠️ 客户端瓶颈' if summary['client_bound'] else '正常'
+    return summary
+
+
+def client_bound(summary):
+    """客户端先于服务器饱和: 客户端整体或单核饱和，而服务器未饱和且CPU低于客户端"""
+    saturated = (summary['cpu_util'] >= CLIENT_SATURATION_UTIL or
+                 (summary['max_core_util'] or 0) >= CLIENT_CORE_SATURATION)
+    if not saturated:
+        return False
+    server_util = summary['server_util']
+    if server_util is None:
+        return True
+    return server_util < SERVER_SATURATION_UTIL and server_util < max(summary['cpu_util'],
+                                                                      summary['max_core_util'] or 0)
+
+
+def format_client(summary):
+    """按 CLIENT_COLUMNS 格式化一行汇总，没有数据的列显示 N/A"""
+    values = []
+    for _, key, fmt in CLIENT_COLUMNS:
+        value = summary.get(key) if summary else None
+        values.append(fmt.format(value) if value is not None else "N/A")
+    return values
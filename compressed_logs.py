@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""压缩的结果文件: 透明读取 .gz/.xz/.zst，以及把结果目录原地归档压缩
+
+结果目录中每秒输出的 sysbench 日志与 tsar.log 占了历史结果的大部分空间，重新合并时也是读取量的大头。
+报告与合并工具通过这里的函数读取结果文件: 按原文件名查找，原文件不存在时依次查找 .gz、.xz、.zst
+压缩版本并流式解压，调用方始终使用未压缩的文件名；结果包 (result_pack.py) 中的文件也经由这里读取。
+.gz/.xz 使用标准库；.zst 依次尝试 Python 3.14 的 compression.zstd、zstandard 模块与 zstd 命令。
+
+    python3 compressed_logs.py archive 结果目录 [--format gz|xz|zst] [--level N]
+
+归档只压缩日志与配置快照 (ARCHIVE_PATTERNS)，报告文件与检查点保持原样；归档后的目录不能再续跑。
+"""
+import argparse
+import fnmatch
+import glob
+import gzip
+import io
+import lzma
+import os
+import shutil
+import subprocess
+import sys
+
+from result_pack import glob_pack, locate_in_pack, open_member, pack_member_exists
+
+COMPRESSED_SUFFIXES = ['.gz', '.xz', '.zst']
+# 归档时压缩的文件与保持原样的文件 (fnmatch 模式)
+ARCHIVE_PATTERNS = ['*.log', '*.txt', '*_perf_schema.json']
+ARCHIVE_EXCLUDE = ['checkpoint.log', 'performance_report.*']
+DEFAULT_LEVELS = {'gz': 6, 'xz': 6, 'zst': 10}
+# 小于该字节数的文件压缩收益很小，归档时跳过
+MIN_ARCHIVE_SIZE = 512
+
+
+def find_log(path):
+    """实际存在的文件: 原文件、其压缩版本或结果包内的文件 (返回 path 本身)，都不存在时返回 None"""
+    if os.path.exists(path):
+        return path
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(path + suffix):
+            return path + suffix
+    if pack_member_exists(path):
+        return path
+    return None
+
+
+def log_exists(path):
+    return find_log(path) is not None
+
+
+class _ZstdPipe(io.BufferedReader):
+    """zstd -dc 的输出，关闭时回收子进程"""
+
+    def __init__(self, path):
+        self.proc = subprocess.Popen(['zstd', '-dcq', path], stdout=subprocess.PIPE, bufsize=0)
+        super().__init__(self.proc.stdout)
+
+    def close(self):
+        super().close()
+        self.proc.wait()
+
+
+def _open_zstd(path):
+    try:
+        from compression import zstd
+        return zstd.open(path, 'rb')
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    except ImportError:
+        pass
+    if shutil.which('zstd'):
+        return _ZstdPipe(path)
+    raise OSError(f"读取 {path} 需要 zstd 命令或 zstandard 模块")
+
+
+def open_log_bytes(path):
+    """以二进制方式打开结果文件 (必要时流式解压)，文件及其压缩版本都不存在时抛出 FileNotFoundError"""
+    actual = find_log(path)
+    if actual is None:
+        raise FileNotFoundError(path)
+    if not os.path.exists(actual):
+        return open_member(*locate_in_pack(actual))
+    if actual.endswith('.gz'):
+        return gzip.open(actual, 'rb')
+    if actual.endswith('.xz'):
+        return lzma.open(actual, 'rb')
+    if actual.endswith('.zst'):
+        return _open_zstd(actual)
+    return open(actual, 'rb')
+
+
+def open_log(path, encoding=None, errors=None):
+    """以文本方式打开结果文件 (必要时流式解压)，文件及其压缩版本都不存在时抛出 FileNotFoundError"""
+    if os.path.exists(path):
+        return open(path, 'r', encoding=encoding, errors=errors)
+    return io.TextIOWrapper(open_log_bytes(path), encoding=encoding, errors=errors)
+
+
+def glob_logs(pattern):
+    """与 glob.glob 相同，但也匹配压缩版本与结果包内的文件，返回去重后的未压缩文件名"""
+    paths = set(glob.glob(pattern))
+    for suffix in COMPRESSED_SUFFIXES:
+        paths.update(path[:-len(suffix)] for path in glob.glob(pattern + suffix))
+    paths.update(glob_pack(pattern))
+    return sorted(paths)
+
+
+def _compress_file(path, fmt, level):
+    """压缩一个文件 (先写临时文件再改名)，删除原文件，返回压缩后的大小"""
+    target = f"{path}.{fmt}"
+    temp = target + '.tmp'
+    if fmt == 'zst':
+        with open(temp, 'wb') as out:
+            subprocess.check_call(['zstd', '-q', '-c', f'-{level}', path], stdout=out)
+    else:
+        opener = gzip.open(temp, 'wb', compresslevel=level) if fmt == 'gz' else lzma.open(temp, 'wb', preset=level)
+        with open(path, 'rb') as source, opener as out:
+            shutil.copyfileobj(source, out, 1024 * 1024)
+    shutil.copystat(path, temp)
+    os.replace(temp, target)
+    os.remove(path)
+    return os.path.getsize(target)
+
+
+def archive_result_dir(result_dir, fmt='gz', level=None):
+    """原地压缩结果目录中的日志与配置快照，返回 (压缩的文件数, 压缩前字节数, 压缩后字节数)"""
+    if fmt == 'zst' and not shutil.which('zstd'):
+        raise OSError("归档为 .zst 需要 zstd 命令")
+    level = DEFAULT_LEVELS[fmt] if level is None else level
+    count = before = after = 0
+    for name in sorted(os.listdir(result_dir)):
+        path = os.path.join(result_dir, name)
+        if (not os.path.isfile(path) or any(name.endswith(suffix) for suffix in COMPRESSED_SUFFIXES)
+                or not any(fnmatch.fnmatch(name, pattern) for pattern in ARCHIVE_PATTERNS)
+                or any(fnmatch.fnmatch(name, pattern) for pattern in ARCHIVE_EXCLUDE)):
+            continue
+        size = os.path.getsize(path)
+        if size < MIN_ARCHIVE_SIZE:
+            continue
+        after += _compress_file(path, fmt, level)
+        before += size
+        count += 1
+    return count, before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description='结果目录的压缩归档')
+    parser.add_argument('action', choices=['archive'])
+    parser.add_argument('result_dir', nargs='+', help='结果目录')
+    parser.add_argument('--format', choices=sorted(DEFAULT_LEVELS), default='gz')
+    parser.add_argument('--level', type=int, help='压缩级别 (默认 gz/xz 为 6，zst 为 10)')
+    args = parser.parse_args()
+
+    for result_dir in args.result_dir:
+        if not os.path.isdir(result_dir):
+            print(f"错误: 结果目录不存在: {result_dir}")
+            sys.exit(1)
+        try:
+            count, before, after = archive_result_dir(result_dir, args.format, args.level)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"错误: 归档失败: {e}")
+            sys.exit(1)
+        ratio = f"{after * 100 / before:.1f}%" if before else '-'
+        print(f"{result_dir}: 压缩 {count} 个文件，{before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB ({ratio})")
+
+
+if __name__ == "__main__":
+    main()
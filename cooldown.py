@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""测试之间的自适应冷却: 等到 MySQL 服务器安静下来再开始下一个测试
+
+128 线程的写入测试结束后，InnoDB 还会持续几十秒刷脏页和 purge，直接开始下一个
+测试会影响其结果；只读测试之后则没有需要等待的后台工作。这里每秒轮询:
+    - 脏页比例 (Innodb_buffer_pool_pages_dirty / Innodb_buffer_pool_pages_total)
+    - undo 历史链表长度 (INNODB_METRICS 的 trx_rseg_history_len)
+    - 服务器磁盘 IO 利用率 (通过 ssh 读取 /proc/diskstats，可选)
+每个信号不高于阈值、或者两次轮询之间的变化不超过很小的绝对容差 (后台工作已停止) 即视为安静，
+仍在上升或下降的信号都不算安静；连续若干次安静后结束等待，超过最长时间也结束。等待时长与结束时的各信号值追加写入冷却记录。
+
+用法: MYSQL_PWD=密码 python3 cooldown.py -H 主机 -P 端口 -u 用户 --label 测试名 \\
+          [--diskstats-cmd "ssh root@主机 cat /proc/diskstats"] [--disks nvme1n1] -o 结果目录/cooldown.log
+"""
+import argparse
+import shlex
+import subprocess
+import time
+
+from dataset_manifest import run_query
+from proc_sampler import read_diskstats, disk_fields, SKIP_DISK_PREFIXES
+from compressed_logs import open_log
+
+# 默认阈值: 脏页比例(%)、历史链表长度、IO利用率(%)
+DIRTY_PCT_THRESHOLD = 1.0
+HISTORY_THRESHOLD = 1000
+IO_UTIL_THRESHOLD = 10.0
+# 高于阈值的信号在两次轮询之间变化不超过该绝对容差时视为 "已停止变化": 脏页比例(百分点)、历史链表长度
+DIRTY_PCT_TOLERANCE = 0.05
+HISTORY_TOLERANCE = 10
+
+
+def read_innodb_signals(args):
+    """返回 (脏页比例%, 历史链表长度)"""
+    rows = run_query(args, "SHOW GLOBAL STATUS LIKE 'Innodb_buffer_pool_pages_%'; "
+                           "SELECT NAME, COUNT FROM information_schema.INNODB_METRICS "
+                           "WHERE NAME = 'trx_rseg_history_len'")
+    values = {}
+    for row in rows:
+        if len(row) == 2:
+            try:
+                values[row[0]] = int(row[1])
+            except ValueError:
+                continue
+    total = values.get('Innodb_buffer_pool_pages_total', 0)
+    dirty_pct = values.get('Innodb_buffer_pool_pages_dirty', 0) * 100.0 / total if total else 0.0
+    return dirty_pct, values.get('trx_rseg_history_len')
+
+
+def whole_disks(text):
+    """/proc/diskstats 中的物理整盘 (排除分区与虚拟设备)"""
+    names = [line.split()[2] for line in text.splitlines() if len(line.split()) >= 14]
+    names = [name for name in names if not name.startswith(SKIP_DISK_PREFIXES)]
+    return {name for name in names
+            if not any(other != name and name.startswith(other) for other in names)}
+
+
+class DiskMonitor:
+    """通过命令 (通常是 ssh) 读取服务器的 /proc/diskstats，计算两次读取之间的IO利用率"""
+
+    def __init__(self, command, disks):
+        self.command = shlex.split(command)
+        self.disks = set(disks)
+        self.prev = None
+
+    def util(self):
+        text = subprocess.check_output(self.command, universal_newlines=True)
+        now = time.monotonic()
+        if not self.disks:
+            self.disks = whole_disks(text)
+        stats = read_diskstats(text, self.disks)
+        prev, self.prev = self.prev, (now, stats)
+        if prev is None or now <= prev[0]:
+            return None
+        return disk_fields(prev[1], stats, now - prev[0])['io_util']
+
+
+def settled(value, previous, threshold, tolerance):
+    """信号不高于阈值，或与上一次相比变化不超过绝对容差 (上升或仍在下降都不算)"""
+    if value is None:
+        return True
+    if value <= threshold:
+        return True
+    return previous is not None and abs(value - previous) <= tolerance
+
+
+def wait_until_quiet(args, disk_monitor):
+    """轮询直到服务器安静，返回 (等待秒数, 结束原因, 最后一次的信号值)"""
+    start = time.monotonic()
+    previous = {}
+    quiet_polls = 0
+    signals = {}
+    if disk_monitor:
+        disk_monitor.util()
+
+    while True:
+        time.sleep(args.interval)
+        dirty_pct, history = read_innodb_signals(args)
+        signals = {'dirty_pct': dirty_pct, 'history': history,
+                   'io_util': disk_monitor.util() if disk_monitor else None}
+
+        quiet = (settled(dirty_pct, previous.get('dirty_pct'), args.dirty_pct, DIRTY_PCT_TOLERANCE) and
+                 settled(history, previous.get('history'), args.history, HISTORY_TOLERANCE) and
+                 (signals['io_util'] is None or signals['io_util'] <= args.io_util))
+        quiet_polls = quiet_polls + 1 if quiet else 0
+        previous = signals
+
+        elapsed = time.monotonic() - start
+        if quiet_polls >= args.quiet_polls and elapsed >= args.min_time:
+            return elapsed, 'quiet', signals
+        if elapsed >= args.max_time:
+            return elapsed, 'timeout', signals
+
+
+def parse_cooldown_log(log_file):
+    """解析冷却记录，返回 [{'label','seconds','reason'}]；文件不存在时返回空列表"""
+    records = []
+    try:
+        with open_log(log_file) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 4 or parts[0] != 'COOLDOWN':
+                    continue
+                try:
+                    records.append({'label': parts[1], 'seconds': float(parts[2]), 'reason': parts[3]})
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return records
+
+
+def format_cooldown(records):
+    """冷却记录的报告文字"""
+    if not records:
+        return "固定间隔 (未启用自适应冷却)"
+    total = sum(r['seconds'] for r in records)
+    longest = max(records, key=lambda r: r['seconds'])
+    timeouts = sum(1 for r in records if r['reason'] == 'timeout')
+    text = (f"共 {total:.0f} 秒 ({len(records)} 次)，最长 {longest['seconds']:.0f} 秒 "
+            f"(在 {longest['label']} 之前)")
+    if timeouts:
+        text += f"，{timeouts} 次达到最长等待时间"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测试之间等待MySQL服务器安静')
+    parser.add_argument('-H', '--host', default='127.0.0.1')
+    parser.add_argument('-P', '--port', default='3306')
+    parser.add_argument('-u', '--user', default='root')
+    parser.add_argument('-D', '--database', default='information_schema')
+    parser.add_argument('--label', required=True, help='即将开始的测试名称')
+    parser.add_argument('--diskstats-cmd', default='', help='读取服务器 /proc/diskstats 的命令，留空不检查IO')
+    parser.add_argument('--disks', default='', help='检查的磁盘设备，逗号分隔，默认全部物理盘')
+    parser.add_argument('--dirty-pct', type=float, default=DIRTY_PCT_THRESHOLD, help='脏页比例阈值(%%)')
+    parser.add_argument('--history', type=int, default=HISTORY_THRESHOLD, help='历史链表长度阈值')
+    parser.add_argument('--io-util', type=float, default=IO_UTIL_THRESHOLD, help='IO利用率阈值(%%)')
+    parser.add_argument('--interval', type=float, default=1.0, help='轮询间隔(秒)')
+    parser.add_argument('--quiet-polls', type=int, default=2, help='连续安静的轮询次数')
+    parser.add_argument('--min-time', type=float, default=2, help='最短等待时间(秒)')
+    parser.add_argument('--max-time', type=float, default=120, help='最长等待时间(秒)')
+    parser.add_argument('-o', '--output', required=True, help='冷却记录文件 (追加)')
+    parser.add_argument('--mysql-bin', default='mysql', help='mysql客户端命令')
+    args = parser.parse_args()
+
+    disk_monitor = None
+    if args.diskstats_cmd:
+        disk_monitor = DiskMonitor(args.diskstats_cmd, [d for d in args.disks.split(',') if d])
+
+    try:
+        elapsed, reason, signals = wait_until_quiet(args, disk_monitor)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"警告: 冷却检查失败，按最短时间等待: {e}")
+        time.sleep(args.min_time)
+        return
+
+    values = ' '.join(f"{name}={value:.2f}" if isinstance(value, float) else f"{name}={value}"
+                      for name, value in signals.items())
+    with open(args.output, 'a') as f:
+        f.write(f"COOLDOWN {args.label} {elapsed:.1f} {reason} {values}\n")
+    print(f"冷却 {elapsed:.1f} 秒 ({'服务器已安静' if reason == 'quiet' else '达到最长等待时间'}): {values}")
+
+
+if __name__ == "__main__":
+    main()
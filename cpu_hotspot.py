@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""单核 CPU / 软中断热点检测
+
+平均 CPU 软中断很低时，网卡队列亲和性仍可能把一两个核的软中断打满。
+这里使用按秒对齐后的每核数据 (tsar --percpu 的 cpuN_* 列或 proc_sampler
+的 cpuN_util/cpuN_sirq/cpuN_net_rx 列)，为每个测试计算最忙核利用率、
+不均衡指数，并在单核饱和而整体 CPU 偏低时标记热点。
+"""
+import re
+
+PERCPU_UTIL_KEY = re.compile(r'^(cpu\d+)_util$')
+PERCPU_NET_RX_KEY = re.compile(r'^cpu\d+_net_rx$')
+
+# 单核利用率达到该值视为饱和 (%)
+CORE_SATURATION_UTIL = 90.0
+# 整体CPU利用率低于该值时，单核饱和才算热点 (%)
+LOW_OVERALL_UTIL = 50.0
+# 热点秒数占比达到该值时标记该测试
+HOTSPOT_FRACTION = 0.5
+
+# 报告中展示的列: (列名, 汇总键, 格式)
+CPU_HOTSPOT_COLUMNS = [
+    ('核数', 'cores', '{:d}'),
+    ('最忙核', 'busiest_core', '{}'),
+    ('最忙核利用率(%)', 'max_core_util', '{:.1f}'),
+    ('最忙核软中断(%)', 'max_core_sirq', '{:.1f}'),
+    ('整体CPU(%)', 'overall_util', '{:.1f}'),
+    ('不均衡指数', 'imbalance', '{:.2f}'),
+    ('NET_RX集中度(%)', 'net_rx_share', '{:.1f}'),
+    ('热点秒占比(%)', 'hotspot_pct', '{:.1f}'),
+]
+
+
+def _cores(sample):
+    """样本中的每核名称，按核编号排序"""
+    cores = []
+    for key in sample:
+        match = PERCPU_UTIL_KEY.match(key)
+        if match:
+            cores.append(match.group(1))
+    return sorted(cores, key=lambda name: int(name[3:]))
+
+
+def summarize_cpu_hotspots(samples):
+    """汇总一个测试各秒的每核数据，样本中没有每核字段时返回 None
+
+    - max_core_util / max_core_sirq: 每秒最忙核的利用率/软中断，取各秒平均
+    - imbalance: 每秒 最忙核利用率 / 各核平均利用率，取各秒平均 (1 表示完全均衡)
+    - net_rx_share: 最忙核处理的 NET_RX 软中断占全部核的比例
+    - hotspot: 单核饱和且整体CPU低于 LOW_OVERALL_UTIL 的秒数占比达到 HOTSPOT_FRACTION
+    """
+    samples = [s for s in samples if s and _cores(s)]
+    if not samples:
+        return None
+
+    core_util_totals = {}
+    max_utils = []
+    max_sirqs = []
+    overall_utils = []
+    ratios = []
+    hotspot_seconds = 0
+    for sample in samples:
+        utils = {core: sample[f'{core}_util'] for core in _cores(sample)}
+        for core, util in utils.items():
+            core_util_totals[core] = core_util_totals.get(core, 0.0) + util
+
+        max_util = max(utils.values())
+        mean_util = sum(utils.values()) / len(utils)
+        overall = sample.get('cpu_util', mean_util)
+        max_utils.append(max_util)
+        max_sirqs.append(max(sample.get(f'{core}_sirq', 0.0) for core in utils))
+        overall_utils.append(overall)
+        if mean_util > 0:
+            ratios.append(max_util / mean_util)
+        if max_util >= CORE_SATURATION_UTIL and overall < LOW_OVERALL_UTIL:
+            hotspot_seconds += 1
+
+    count = len(samples)
+    busiest = max(core_util_totals, key=core_util_totals.get)
+
+    net_rx_share = None
+    net_rx_total = sum(v for s in samples for k, v in s.items() if PERCPU_NET_RX_KEY.match(k))
+    if net_rx_total > 0:
+        net_rx_share = sum(s.get(f'{busiest}_net_rx', 0.0) for s in samples) * 100 / net_rx_total
+
+    hotspot_fraction = hotspot_seconds / count
+    return {
+        'cores': len(core_util_totals),
+        'busiest_core': busiest,
+        'max_core_util': sum(max_utils) / count,
+        'max_core_sirq': sum(max_sirqs) / count,
+        'overall_util': sum(overall_utils) / count,
+        'imbalance': sum(ratios) / len(ratios) if ratios else None,
+        'net_rx_share': net_rx_share,
+        'hotspot_pct': hotspot_fraction * 100,
+        'hotspot': hotspot_fraction >= HOTSPOT_FRACTION,
+        'sample_count': count,
+    }
+
+
+def format_cpu_hotspot(summary):
+    """按 CPU_HOTSPOT_COLUMNS 格式化一行汇总，没有数据的列显示 N/A"""
+    values = []
+    for _, key, fmt in CPU_HOTSPOT_COLUMNS:
+        value = summary.get(key) if summary else None
+        values.append(fmt.format(value) if value is not None else "N/A")
+    return values
+
+
+def hotspot_flag(summary):
+    """热点标记文字"""
+    if not summary:
+        return "N/A"
+    if summary['hotspot']:
+        return f"⚠ 单核热点 ({summary['busiest_core']})"
+    return "-"
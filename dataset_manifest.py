@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""sysbench 测试数据集清单: 准备数据后记录，复用数据前校验
+
+create: 数据准备完成后记录表数量、每张表的精确行数与 id 范围、表结构摘要、
+        抽样行校验值，写入 JSON 清单。
+verify: 复用已有数据前只做廉价检查 (information_schema + 主键上的 MIN/MAX 与
+        抽样点查)，确认表数量、表结构、id 范围与配置及清单一致，
+        发现被截断、缺表或表结构不同的数据集时以非0退出。
+        之前的写入类测试会追加行 (最大 id 超过 table_size) 或删掉少量行，
+        这类漂移只作为警告输出，不中止测试。
+
+用法:
+    MYSQL_PWD=密码 python3 dataset_manifest.py create -H 主机 -P 端口 -u 用户 -D 库 \\
+        --tables 16 --table-size 1000000 -o 清单文件 [--prepare-seconds 秒]
+    MYSQL_PWD=密码 python3 dataset_manifest.py verify -H 主机 -P 端口 -u 用户 -D 库 \\
+        --tables 16 --table-size 1000000 -m 清单文件
+
+抽样行校验值只用于识别数据来源: 写入类场景会修改 k/c/pad 列，
+因此 verify 只检查抽样 id 是否存在，不比较校验值；缺失的抽样 id 不超过
+MAX_MISSING_SAMPLE_RATIO 时只警告。
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+# 每张表抽样检查的 id 个数 (均匀分布在 1..table_size)
+SAMPLE_IDS = 16
+# information_schema.TABLES.TABLE_ROWS 是估算值，低于期望行数的该比例视为异常
+MIN_ROW_ESTIMATE_RATIO = 0.5
+# 所有表合计缺失的抽样 id 不超过该比例时只警告 (写入类场景删除的行)，超过视为数据集被截断
+MAX_MISSING_SAMPLE_RATIO = 0.1
+
+
+def run_query(args, sql):
+    """通过 mysql 客户端执行 SQL，返回按制表符切分的行"""
+    cmd = [args.mysql_bin, '-h', args.host, '-P', str(args.port), '-u', args.user,
+           '-N', '-B', '-D', args.database, '-e', sql]
+    output = subprocess.check_output(cmd, universal_newlines=True)
+    return [line.split('\t') for line in output.splitlines() if line]
+
+
+def sample_ids(table_size):
+    """均匀分布的抽样 id"""
+    count = min(SAMPLE_IDS, table_size)
+    return sorted({1 + i * (table_size - 1) // max(count - 1, 1) for i in range(count)})
+
+
+def table_names(tables):
+    return [f'sbtest{i}' for i in range(1, tables + 1)]
+
+
+def read_tables(args):
+    """information_schema 中的表信息: {表名: {'engine', 'row_estimate', 'create_time'}}"""
+    rows = run_query(args, f"""
+        SELECT TABLE_NAME, ENGINE, IFNULL(TABLE_ROWS, 0), IFNULL(CREATE_TIME, '')
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = '{args.database}' AND TABLE_NAME REGEXP '^sbtest[0-9]+$'""")
+    return {name: {'engine': engine, 'row_estimate': int(estimate), 'create_time': created}
+            for name, engine, estimate, created in rows}
+
+
+def read_schema_digest(args):
+    """每张表的列与索引定义摘要: {表名: md5}"""
+    columns = run_query(args, f"""
+        SELECT TABLE_NAME,
+               GROUP_CONCAT(CONCAT(COLUMN_NAME, ' ', COLUMN_TYPE) ORDER BY ORDINAL_POSITION SEPARATOR ',')
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = '{args.database}' AND TABLE_NAME REGEXP '^sbtest[0-9]+$'
+        GROUP BY TABLE_NAME""")
+    indexes = run_query(args, f"""
+        SELECT TABLE_NAME,
+               GROUP_CONCAT(CONCAT(IF(INDEX_NAME = 'PRIMARY', 'PRIMARY', 'k'), ':', COLUMN_NAME)
+                            ORDER BY INDEX_NAME, SEQ_IN_INDEX SEPARATOR ',')
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = '{args.database}' AND TABLE_NAME REGEXP '^sbtest[0-9]+$'
+        GROUP BY TABLE_NAME""")
+    # sysbench 的二级索引名带表序号 (k_1, k_2 ...)，统一成 k 以便各表比较
+    definitions = {name: definition for name, definition in columns}
+    for name, definition in indexes:
+        definitions[name] = definitions.get(name, '') + ';' + definition
+    return {name: hashlib.md5(definition.encode()).hexdigest() for name, definition in definitions.items()}
+
+
+def read_id_ranges(args, names):
+    """主键 id 的最小/最大值，走主键索引两端，代价与表大小无关"""
+    sql = ' UNION ALL '.join(f"SELECT '{name}', IFNULL(MIN(id), 0), IFNULL(MAX(id), 0) FROM {name}"
+                             for name in names)
+    return {name: (int(low), int(high)) for name, low, high in run_query(args, sql)}
+
+
+def read_samples(args, names, ids, checksum):
+    """抽样 id 的命中行数，checksum=True 时同时计算这些行的 CRC32 校验值"""
+    id_list = ','.join(str(i) for i in ids)
+    value = ("CRC32(GROUP_CONCAT(id, ':', k, ':', c, ':', pad ORDER BY id))" if checksum else "0")
+    sql = ' UNION ALL '.join(f"SELECT '{name}', COUNT(*), IFNULL({value}, 0) FROM {name} WHERE id IN ({id_list})"
+                             for name in names)
+    return {name: (int(found), int(crc)) for name, found, crc in run_query(args, sql)}
+
+
+def read_row_counts(args, names):
+    """精确行数 (全表扫描，只在准备数据后执行一次)"""
+    sql = ' UNION ALL '.join(f"SELECT '{name}', COUNT(*) FROM {name}" for name in names)
+    return {name: int(count) for name, count in run_query(args, sql)}
+
+
+def create_manifest(args):
+    names = table_names(args.tables)
+    ids = sample_ids(args.table_size)
+    tables = read_tables(args)
+    digests = read_schema_digest(args)
+    ranges = read_id_ranges(args, names)
+    samples = read_samples(args, names, ids, checksum=True)
+    counts = read_row_counts(args, names)
+
+    manifest = {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'host': args.host,
+        'port': str(args.port),
+        'database': args.database,
+        'tables': args.tables,
+        'table_size': args.table_size,
+        'prepare_seconds': args.prepare_seconds,
+        'sample_ids': ids,
+        'table_info': {}
+    }
+    for name in names:
+        manifest['table_info'][name] = {
+            'rows': counts.get(name, 0),
+            'id_range': list(ranges.get(name, (0, 0))),
+            'schema': digests.get(name),
+            'engine': tables.get(name, {}).get('engine'),
+            'create_time': tables.get(name, {}).get('create_time'),
+            'sample_checksum': samples.get(name, (0, 0))[1]
+        }
+    return manifest
+
+
+def verify_dataset(args, manifest):
+    """返回 (错误列表, 警告列表, 提示列表)"""
+    errors = []
+    warnings = []
+    notices = []
+    names = table_names(args.tables)
+    ids = sample_ids(args.table_size)
+
+    tables = read_tables(args)
+    missing = [name for name in names if name not in tables]
+    if missing:
+        errors.append(f"缺少 {len(missing)} 张表: {', '.join(missing[:5])}{' ...' if len(missing) > 5 else ''}")
+        return errors, warnings, notices
+
+    digests = read_schema_digest(args)
+    ranges = read_id_ranges(args, names)
+    samples = read_samples(args, names, ids, checksum=False)
+    expected_schema = manifest['table_info'][names[0]]['schema'] if manifest else digests.get(names[0])
+
+    missing_samples = []
+    for name in names:
+        low, high = ranges.get(name, (0, 0))
+        if low != 1 or high < args.table_size:
+            errors.append(f"{name}: id 范围为 {low}..{high}，期望 1..{args.table_size}")
+        elif high > args.table_size:
+            warnings.append(f"{name}: 最大 id 为 {high}，超过 {args.table_size} (之前的测试追加了行)")
+        found = samples.get(name, (0, 0))[0]
+        if found != len(ids):
+            missing_samples.append(f"{name}: 抽样 {len(ids)} 个 id 只命中 {found} 行")
+        if tables[name]['row_estimate'] < args.table_size * MIN_ROW_ESTIMATE_RATIO:
+            errors.append(f"{name}: 估算行数 {tables[name]['row_estimate']} 远小于 {args.table_size}")
+        if digests.get(name) != expected_schema:
+            errors.append(f"{name}: 表结构与{'清单' if manifest else ' sbtest1 '}不一致")
+
+    missing = sum(len(ids) - samples.get(name, (0, 0))[0] for name in names)
+    if missing > len(ids) * len(names) * MAX_MISSING_SAMPLE_RATIO:
+        errors.extend(missing_samples)
+    else:
+        warnings.extend(missing_samples)
+
+    if manifest is None:
+        notices.append("没有数据集清单，只按配置校验")
+    else:
+        if (manifest['tables'], manifest['table_size']) != (args.tables, args.table_size):
+            errors.append(f"清单为 {manifest['tables']}表×{manifest['table_size']}行，"
+                          f"与配置 {args.tables}表×{args.table_size}行 不一致")
+        recreated = [name for name in names
+                     if name in manifest['table_info']
+                     and manifest['table_info'][name]['create_time'] != tables[name]['create_time']]
+        if recreated:
+            notices.append(f"{len(recreated)} 张表的创建时间与清单不同 (数据集在清单之后被重建)")
+
+    return errors, warnings, notices
+
+
+def load_manifest(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='sysbench 测试数据集清单的记录与校验')
+    parser.add_argument('action', choices=['create', 'verify'])
+    parser.add_argument('-H', '--host', default='127.0.0.1')
+    parser.add_argument('-P', '--port', default='3306')
+    parser.add_argument('-u', '--user', default='root')
+    parser.add_argument('-D', '--database', default='sbtest')
+    parser.add_argument('--tables', type=int, required=True)
+    parser.add_argument('--table-size', type=int, required=True)
+    parser.add_argument('-o', '--output', help='create: 清单输出文件')
+    parser.add_argument('-m', '--manifest', help='verify: 已有的清单文件 (可不存在)')
+    parser.add_argument('--prepare-seconds', type=float, help='create: 数据准备耗时(秒)')
+    parser.add_argument('--mysql-bin', default='mysql', help='mysql客户端命令')
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'create':
+            manifest = create_manifest(args)
+            with open(args.output, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            total = sum(info['rows'] for info in manifest['table_info'].values())
+            print(f"数据集清单已生成: {args.output} ({args.tables}表，共{total}行)")
+            return
+
+        errors, warnings, notices = verify_dataset(args, load_manifest(args.manifest))
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"错误: 无法读取数据集信息: {e}")
+        sys.exit(2)
+
+    for notice in notices:
+        print(f"提示: {notice}")
+    for warning in warnings[:20]:
+        print(f"警告: {warning}")
+    if errors:
+        print(f"数据集校验失败 ({len(errors)} 项):")
+        for error in errors[:20]:
+            print(f"  - {error}")
+        sys.exit(1)
+    print(f"数据集校验通过: {args.tables}表×{args.table_size}行{f' ({len(warnings)} 项警告)' if warnings else ''}")
+
+
+if __name__ == "__main__":
+    main()
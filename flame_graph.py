@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""mysqld 的 on-CPU 火焰图: perf script 输出折叠为调用栈计数，并渲染为可交互的 SVG
+
+tsar 的 "CPU系统 40%" 说明不了时间花在哪里。FLAME_GRAPH=true 时，每个场景的最高并发数测试在运行
+中段对 mysqld 执行 perf record -g (频率 FLAME_GRAPH_FREQ，时长 FLAME_GRAPH_DURATION)，perf script
+的输出经 collapse 折叠为 <测试名>_cpu_stacks.txt:
+    线程名;根函数;...;叶子函数 样本数
+每行一个不同的调用栈 (与 flamegraph.pl 的输入格式相同)，内核函数带 _[k] 后缀。报告据此渲染火焰图
+(点击函数放大，点击最底层的 all 还原) 并列出自身样本最多的函数。
+
+用法:
+    perf script | python3 flame_graph.py collapse -o 测试名_cpu_stacks.txt
+    python3 flame_graph.py svg -i 测试名_cpu_stacks.txt -o flame.svg
+"""
+import argparse
+import os
+import re
+import sys
+import zlib
+from collections import Counter
+from html import escape
+
+from compressed_logs import log_exists, open_log
+
+CPU_STACKS_SUFFIX = '_cpu_stacks.txt'
+# 窄于全部样本该比例的函数不绘制，控制内联到报告中的 SVG 大小
+MIN_FRAME_FRACTION = 0.001
+FRAME_HEIGHT = 16
+# 报告中列出的自身样本最多的函数数
+TOP_FUNCTIONS = 15
+
+# 热点函数表的列: (列名, 键, 格式)
+FLAME_COLUMNS = [
+    ('函数', 'name', '{}'),
+    ('自身样本', 'self', '{:,}'),
+    ('自身占比(%)', 'self_pct', '{:.1f}'),
+    ('含子调用占比(%)', 'total_pct', '{:.1f}'),
+]
+
+# perf script 的样本头: "线程名 PID[/TID] [CPU] 时间戳: ..."，线程名可能包含空格
+SAMPLE_HEADER = re.compile(r'^(\S.*?)\s+\d+(?:/\d+)?\s')
+SYMBOL_OFFSET = re.compile(r'\+0x[0-9a-f]+$')
+
+ZOOM_SCRIPT = """<script type="text/ecmascript"><![CDATA[
+function flameZoom(g) {
+  var svg = g.ownerSVGElement, width = +svg.getAttribute('data-width'), pad = 10;
+  var x0 = +g.getAttribute('data-x'), w0 = +g.getAttribute('data-w'), d0 = +g.getAttribute('data-d');
+  var frames = svg.querySelectorAll('g.frame');
+  for (var i = 0; i < frames.length; i++) {
+    var f = frames[i], x = +f.getAttribute('data-x'), w = +f.getAttribute('data-w'), d = +f.getAttribute('data-d');
+    var ancestor = d < d0 && x <= x0 + 1e-6 && x + w >= x0 + w0 - 1e-6;
+    var inside = d >= d0 && x >= x0 - 1e-6 && x + w <= x0 + w0 + 1e-6;
+    if (!ancestor && !inside) { f.style.display = 'none'; continue; }
+    f.style.display = '';
+    var nx = ancestor ? 0 : (x - x0) / w0 * width, nw = ancestor ? width : w / w0 * width;
+    f.querySelector('rect').setAttribute('x', nx + pad);
+    f.querySelector('rect').setAttribute('width', Math.max(nw - 0.5, 0.1));
+    var text = f.querySelector('text'), name = f.getAttribute('data-n'), chars = Math.floor((nw - 6) / 7);
+    text.setAttribute('x', nx + pad + 3);
+    text.textContent = chars < 3 ? '' : (name.length > chars ? name.slice(0, chars - 2) + '..' : name);
+  }
+}
+]]></script>"""
+
+
+def _frame_name(line):
+    """perf script 的调用栈行 "地址 符号+偏移 (模块)" 中的函数名"""
+    body = line.strip()
+    _, _, body = body.partition(' ')
+    symbol, sep, module = body.rpartition(' (')
+    if not sep:
+        symbol, module = body, ''
+    module = module.rstrip(')')
+    symbol = SYMBOL_OFFSET.sub('', symbol.strip())
+    if not symbol or symbol == '[unknown]':
+        symbol = f"[{os.path.basename(module) or 'unknown'}]"
+    if module.startswith('[kernel'):
+        symbol += '_[k]'
+    return symbol.replace(';', ':')
+
+
+def collapse_perf_script(lines):
+    """把 perf script 的输出折叠为 {调用栈: 样本数}，调用栈以线程名为根、从外到内用分号连接"""
+    stacks = Counter()
+    comm, frames = None, []
+    for line in lines:
+        if not line.strip():
+            if comm is not None and frames:
+                stacks[';'.join([comm] + frames[::-1])] += 1
+            comm, frames = None, []
+        elif line[0] in ' \t':
+            if comm is not None:
+                frames.append(_frame_name(line))
+        else:
+            match = SAMPLE_HEADER.match(line)
+            comm = match.group(1).replace(';', ':').replace(' ', '_') if match else None
+    if comm is not None and frames:
+        stacks[';'.join([comm] + frames[::-1])] += 1
+    return stacks
+
+
+def write_collapsed(stacks, path):
+    with open(path, 'w') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def load_collapsed(path):
+    """读取折叠后的调用栈 {调用栈: 样本数}，文件不存在或为空时返回 None"""
+    if not log_exists(path):
+        return None
+    stacks = Counter()
+    with open_log(path, errors='replace') as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks or None
+
+
+def top_functions(stacks, limit=TOP_FUNCTIONS):
+    """自身样本 (位于栈顶) 最多的函数，并给出包含子调用的占比"""
+    total = sum(stacks.values())
+    self_samples, total_samples = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')[1:]
+        if not frames:
+            continue
+        self_samples[frames[-1]] += count
+        for name in set(frames):
+            total_samples[name] += count
+    return [{'name': name, 'self': count, 'self_pct': count * 100 / total,
+             'total_pct': total_samples[name] * 100 / total}
+            for name, count in self_samples.most_common(limit)]
+
+
+def format_function(row, html=False):
+    """热点函数表的一行；函数名在 HTML 中转义，在 Markdown 中转义竖线"""
+    values = [fmt.format(row[key]) for _, key, fmt in FLAME_COLUMNS]
+    values[0] = escape(values[0]) if html else values[0].replace('|', '\\|')
+    return values
+
+
+def _build_tree(stacks):
+    """调用栈计数 -> 树 {名称: [样本数, 子节点]}"""
+    root = {}
+    for stack, count in stacks.items():
+        children = root
+        for name in stack.split(';'):
+            node = children.setdefault(name, [0, {}])
+            node[0] += count
+            children = node[1]
+    return root
+
+
+def _frame_color(name):
+    """按函数名散列出稳定的暖色，内核函数偏橙，线程名 (根) 为灰色"""
+    value = zlib.crc32(name.encode()) % 1000 / 1000
+    if name.endswith('_[k]'):
+        return f"rgb(230,{120 + int(value * 60)},40)"
+    return f"rgb({205 + int(value * 50)},{int(value * 180)},50)"
+
+
+def render_flame_svg(stacks, title, width=1200):
+    """调用栈计数 -> 可交互的火焰图 (内联SVG，无外部依赖)"""
+    total = sum(stacks.values())
+    if not total:
+        return ''
+    pad, top = 10, 30
+    scale = (width - 2 * pad) / total
+    frames = [('all', 0, total, 0)]
+
+    def layout(children, x, depth):
+        for name in sorted(children):
+            count, grandchildren = children[name]
+            if count >= total * MIN_FRAME_FRACTION:
+                frames.append((name, x, count, depth))
+                layout(grandchildren, x, depth + 1)
+            x += count
+
+    layout(_build_tree(stacks), 0, 1)
+    max_depth = max(depth for _, _, _, depth in frames)
+    height = top + (max_depth + 1) * FRAME_HEIGHT + 10
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'data-width="{width - 2 * pad}" font-family="monospace" font-size="11">',
+             ZOOM_SCRIPT,
+             f'<rect width="{width}" height="{height}" fill="#fdfdf5"/>',
+             f'<text x="{width / 2}" y="18" text-anchor="middle" font-size="13" '
+             f'font-family="sans-serif">{escape(title)}</text>']
+    for name, x, count, depth in frames:
+        fx, fw = x * scale, count * scale
+        y = height - 10 - (depth + 1) * FRAME_HEIGHT
+        chars = int((fw - 6) / 7)
+        label = '' if chars < 3 else (name if len(name) <= chars else name[:chars - 2] + '..')
+        color = '#ccc' if depth <= 1 else _frame_color(name)
+        parts.append(
+            f'<g class="frame" onclick="flameZoom(this)" style="cursor:pointer" data-n="{escape(name)}" '
+            f'data-x="{fx:.2f}" data-w="{fw:.2f}" data-d="{depth}">'
+            f'<title>{escape(name)} ({count:,} 样本, {count * 100 / total:.2f}%)</title>'
+            f'<rect x="{fx + pad:.2f}" y="{y}" width="{max(fw - 0.5, 0.1):.2f}" height="{FRAME_HEIGHT - 1}" '
+            f'fill="{color}" rx="2"/>'
+            f'<text x="{fx + pad + 3:.2f}" y="{y + FRAME_HEIGHT - 4}">{escape(label)}</text></g>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='perf script 调用栈折叠与火焰图')
+    parser.add_argument('action', choices=['collapse', 'svg'])
+    parser.add_argument('-i', '--input', help='输入文件 (collapse 默认读取标准输入)')
+    parser.add_argument('-o', '--output', required=True, help='输出文件')
+    parser.add_argument('--title', default='mysqld On-CPU 火焰图')
+    args = parser.parse_args()
+
+    if args.action == 'collapse':
+        source = open(args.input, 'r', errors='replace') if args.input else sys.stdin
+        with source:
+            stacks = collapse_perf_script(source)
+        if not stacks:
+            print("警告: 没有采集到调用栈 (perf 未安装、找不到 mysqld 进程或权限不足)")
+            sys.exit(1)
+        write_collapsed(stacks, args.output)
+        print(f"已折叠 {sum(stacks.values()):,} 个样本 ({len(stacks):,} 个不同的调用栈): {args.output}")
+    else:
+        stacks = load_collapsed(args.input) if args.input else None
+        if not stacks:
+            print(f"没有调用栈数据: {args.input}")
+            sys.exit(1)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(render_flame_svg(stacks, args.title))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,111 +3,55 @@ import os
 import sys
 import re
 from datetime import datetime, timedelta
-import glob
+from time_align import (parse_sysbench_intervals, align_results, format_clock_skew, average_samples,
+                        saturated_metrics, format_window_stat, WINDOW_STAT_COLUMNS)
+from monitor_collectors import load_monitor_data
+from mysql_status_collector import (parse_mysql_status_log, summarize_mysql_status,
+                                    format_mysql_status, MYSQL_STATUS_COLUMNS)
+from cpu_hotspot import summarize_cpu_hotspots, format_cpu_hotspot, hotspot_flag, CPU_HOTSPOT_COLUMNS
+from client_monitor import load_client_data, client_window, summarize_client, format_client, CLIENT_COLUMNS
+from network_metrics import summarize_network, format_network, NETWORK_COLUMNS
+from stall_detection import detect_stalls, reported_stalls, format_stall, STALL_COLUMNS
+from warmup import parse_warmup_log, format_warmup
+from cooldown import parse_cooldown_log, format_cooldown
+from scenarios import (find_result_logs, parse_scenario_manifest, collect_scenario_definitions,
+                       format_scenario, SCENARIO_COLUMNS)
+from perf_schema import (load_perf_schema, scenario_profiles, format_wait, format_statement,
+                         STATEMENT_COLUMNS)
+from flame_graph import (load_collapsed, top_functions, format_function, render_flame_svg,
+                         CPU_STACKS_SUFFIX, FLAME_COLUMNS)
+from profiling import profile_from_argv, phase, report_profile
+from validity import validate_results, validity_badge, format_finding, VALIDITY_COLUMNS
+from rate_sweep import (load_rate_sweeps, format_rate_step, render_latency_svg, sweep_series,
+                        RATE_SWEEP_COLUMNS)
+from compressed_logs import log_exists, open_log
+from result_pack import pack_path, report_dir
 
-def parse_tsar_log(tsar_file):
-    """解析tsar.log文件，返回时间戳和CPU/IO数据的字典"""
-    tsar_data = {}
-    
-    if not os.path.exists(tsar_file):
-        print(f"警告: tsar.log文件不存在: {tsar_file}")
-        return tsar_data
-    
-    with open(tsar_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('Time') or '---' in line:
-                continue
-            
-            parts = line.split()
-            if len(parts) < 6:
-                continue
-            
-            # 解析时间格式: 22/11/25-15:33:45
-            time_str = parts[0]
-            try:
-                # tsar格式: 22/11/25-15:33:45 表示 2025-11-22 15:33:45
-                date_part, time_part = time_str.split('-')
-                yy, mm, dd = date_part.split('/')
-                
-                # 转换为完整日期: 22/11/25 -> 2025-11-22
-                full_year = f"20{yy}"
-                dt = datetime.strptime(f"{full_year}-{mm}-{dd} {time_part}", "%Y-%m-%d %H:%M:%S")
-                
-                # 解析CPU数据 (user, sys, wait, hirq, sirq, util)
-                cpu_user = float(parts[1])
-                cpu_sys = float(parts[2]) 
-                cpu_wait = float(parts[3])
-                cpu_sirq = float(parts[5])  # CPU软中断
-                
-                # 解析IO数据 (最后一列是IO util)
-                io_util = 0.0
-                if len(parts) >= 24:  # 确保有完整的IO数据
-                    io_util = float(parts[23])  # IO利用率 (最后一列)
-                
-                tsar_data[dt] = {
-                    'cpu_user': cpu_user,
-                    'cpu_sys': cpu_sys,
-                    'cpu_wait': cpu_wait,
-                    'cpu_sirq': cpu_sirq,
-                    'io_util': io_util
-                }
-            except (ValueError, IndexError) as e:
-                continue
-    
-    return tsar_data
-
-def get_tsar_avg_for_period(tsar_data, start_time, end_time):
-    """获取指定时间段内的tsar数据平均值"""
+def get_tsar_avg_for_period(tsar_data, start_time, end_time, skew_seconds=0):
+    """获取指定时间段内的tsar数据平均值与分布 (没有每秒结果可对齐时使用)"""
     if not tsar_data:
         return None
     
-    # 转换时间字符串为datetime对象
-    start_dt = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S")
-    end_dt = datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S")
+    # 转换时间字符串为datetime对象，并换算到服务端时钟
+    start_dt = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S") + timedelta(seconds=skew_seconds)
+    end_dt = datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S") + timedelta(seconds=skew_seconds)
     
-    # 收集时间段内的数据，允许前后30秒的误差
+    # 只收集时间段内的数据，不再放宽窗口，避免混入相邻测试的样本
     period_data = []
     for ts, data in tsar_data.items():
-        if (start_dt - timedelta(seconds=30)) <= ts <= (end_dt + timedelta(seconds=30)):
+        if start_dt <= ts <= end_dt:
             period_data.append(data)
     
-    # 如果还是没有数据，尝试更宽松的匹配（只匹配时间，忽略日期）
-    if not period_data:
-        start_time_only = start_dt.time()
-        end_time_only = end_dt.time()
-        for ts, data in tsar_data.items():
-            ts_time = ts.time()
-            if start_time_only <= ts_time <= end_time_only:
-                period_data.append(data)
-    
-    # 如果仍然没有数据，尝试找最接近的时间段数据
-    if not period_data:
-        # 扩大搜索范围到前后5分钟
-        for ts, data in tsar_data.items():
-            if (start_dt - timedelta(minutes=5)) <= ts <= (end_dt + timedelta(minutes=5)):
-                period_data.append(data)
-    
     if not period_data:
         return None
     
-    # 计算平均值
-    avg_data = {
-        'cpu_user': sum(d['cpu_user'] for d in period_data) / len(period_data),
-        'cpu_sys': sum(d['cpu_sys'] for d in period_data) / len(period_data),
-        'cpu_wait': sum(d['cpu_wait'] for d in period_data) / len(period_data),
-        'cpu_sirq': sum(d['cpu_sirq'] for d in period_data) / len(period_data),
-        'io_util': sum(d['io_util'] for d in period_data) / len(period_data),
-        'sample_count': len(period_data)
-    }
-    
-    return avg_data
+    return average_samples(period_data)
 
 def parse_sysbench_result(log_file):
     """解析sysbench结果文件"""
     result = {}
     
-    with open(log_file, 'r') as f:
+    with open_log(log_file) as f:
         content = f.read()
     
     # 提取QPS和TPS
@@ -130,40 +74,52 @@ def parse_sysbench_result(log_file):
     return result
 
 def parse_test_time(time_file):
-    """解析测试时间文件"""
+    """解析测试时间文件
+
+    兼容只有 TEST_START_TIME/TEST_END_TIME (秒级) 的旧格式；新格式由 sysbench_tee.py
+    追加 epoch 毫秒与单调时钟毫秒，其中负载起止 (threads_started/stats_printed)
+    以 TEST_START 的 epoch 为锚点、按单调时钟差值换算，不受 NTP 调整影响。
+    """
     times = {}
-    if os.path.exists(time_file):
-        with open(time_file, 'r') as f:
+    ms_values = {}
+    if log_exists(time_file):
+        with open_log(time_file) as f:
             for line in f:
                 if 'TEST_START_TIME:' in line:
                     times['start'] = line.split(':', 1)[1].strip()
                 elif 'TEST_END_TIME:' in line:
                     times['end'] = line.split(':', 1)[1].strip()
+                elif '_MS:' in line:
+                    key, value = line.split(':', 1)
+                    try:
+                        ms_values[key.strip()] = int(value.strip())
+                    except ValueError:
+                        continue
+    
+    start_epoch = ms_values.get('TEST_START_EPOCH_MS')
+    start_mono = ms_values.get('TEST_START_MONO_MS')
+    for name in ('TEST_START', 'THREADS_STARTED', 'STATS_PRINTED', 'TEST_END'):
+        epoch_ms = ms_values.get(f'{name}_EPOCH_MS')
+        mono_ms = ms_values.get(f'{name}_MONO_MS')
+        if start_epoch is not None and start_mono is not None and mono_ms is not None:
+            epoch_ms = start_epoch + (mono_ms - start_mono)
+        if epoch_ms is not None:
+            times[f'{name.lower()}_ms'] = epoch_ms
     return times
 
 def generate_markdown_report(result_dir):
     """生成Markdown报告"""
     
-    # 解析tsar.log
-    tsar_file = os.path.join(result_dir, 'tsar.log')
-    tsar_data = parse_tsar_log(tsar_file)
+    phase('解析监控数据')
+    # 解析系统监控数据 (tsar.log 或 proc_sampler.log)
+    tsar_data, monitor_source = load_monitor_data(result_dir)
     
+    phase('解析测试日志')
     # 收集所有测试结果
     results = []
     
-    # 查找所有测试日志文件
-    log_files = glob.glob(os.path.join(result_dir, 'oltp_*_*threads.log'))
-    
-    for log_file in log_files:
-        filename = os.path.basename(log_file)
-        # 解析文件名: oltp_point_select_1threads.log
-        match = re.match(r'(oltp_\w+)_(\d+)threads\.log', filename)
-        if not match:
-            continue
-        
-        scenario = match.group(1)
-        threads = int(match.group(2))
-        
+    # 查找所有测试日志文件: <场景ID>_<并发数>threads.log (场景可以是自定义 Lua 脚本)
+    for log_file, scenario, threads in find_result_logs(result_dir):
         # 解析sysbench结果
         sysbench_result = parse_sysbench_result(log_file)
         
@@ -171,10 +127,12 @@ def generate_markdown_report(result_dir):
         time_file = log_file.replace('.log', '_time.log')
         test_times = parse_test_time(time_file)
         
-        # 获取对应时间段的tsar数据
-        tsar_avg = None
-        if test_times.get('start') and test_times.get('end'):
-            tsar_avg = get_tsar_avg_for_period(tsar_data, test_times['start'], test_times['end'])
+        # 解析每秒结果，用于与tsar数据按秒对齐
+        intervals = parse_sysbench_intervals(log_file)
+        
+        # 解析压测期间的MySQL状态增量
+        status_file = log_file.replace('.log', '_mysql_status.log')
+        mysql_status = summarize_mysql_status(parse_mysql_status_log(status_file), test_times)
         
         result = {
             'scenario': scenario,
@@ -185,7 +143,13 @@ def generate_markdown_report(result_dir):
             'p95_latency': sysbench_result.get('p95_latency', 0),
             'start_time': test_times.get('start', ''),
             'end_time': test_times.get('end', ''),
-            'tsar_data': tsar_avg
+            'tsar_data': None,
+            'intervals': intervals,
+            'test_times': test_times,
+            'mysql_status': mysql_status,
+            'scenario_manifest': parse_scenario_manifest(time_file),
+            'perf_schema': load_perf_schema(log_file.replace('.log', '_perf_schema.json')),
+            'cpu_stacks': load_collapsed(log_file.replace('.log', CPU_STACKS_SUFFIX))
         }
         
         results.append(result)
@@ -193,40 +157,99 @@ def generate_markdown_report(result_dir):
     # 按测试开始时间排序（测试执行顺序）
     results.sort(key=lambda x: x['start_time'] if x['start_time'] else '')
     
+    phase('按秒对齐监控数据')
+    # 估计客户端与服务端的时钟偏差，并把每秒结果与tsar样本按秒对齐
+    skew_info = align_results(results, tsar_data)
+    
+    # 没有每秒结果的测试按测试时间段匹配
+    for result in results:
+        if not result['joined'] and result['start_time'] and result['end_time']:
+            result['tsar_data'] = get_tsar_avg_for_period(
+                tsar_data, result['start_time'], result['end_time'], skew_info['skew'])
+    
+    phase('汇总指标与有效性检查')
+    # 每核CPU热点 (需要 tsar --percpu 或 proc_sampler 的每核数据)
+    for result in results:
+        result['cpu_hotspot'] = summarize_cpu_hotspots([row['tsar'] for row in result['joined']])
+    
+    # 网络吞吐/包速率 (需要 tsar --traffic --tcp --pcsw 或 proc_sampler)
+    for result in results:
+        result['network'] = summarize_network(result['joined'])
+    
+    # 每秒吞吐相对滚动基线的停顿与下跌，对照同一秒的监控样本
+    for result in results:
+        result['stalls'] = detect_stalls(result)
+    
+    # 压测客户端资源 (客户端本机 proc_sampler)，判断结果是否受客户端限制
+    client_data = load_client_data(result_dir)
+    for result in results:
+        result['client'] = summarize_client(client_window(client_data, result['test_times']),
+                                            [row['tsar'] for row in result['joined']])
+    client_bound_tests = [f"{r['scenario']}_{r['threads']}threads" for r in results
+                          if r['client'] and r['client']['client_bound']]
+    
+    # 结果有效性检查 (错误率、重连、线程公平性、监控覆盖、运行时长、每秒结果缺失)
+    validate_results(result_dir, results, bool(tsar_data))
+    
+    phase('读取附加记录')
+    # 读取缓冲池预热记录
+    warmup_info = parse_warmup_log(os.path.join(result_dir, 'warmup.log'))
+    cooldown_records = parse_cooldown_log(os.path.join(result_dir, 'cooldown.log'))
+    
+    # 各场景的脚本与参数 (来自每个测试的参数清单)
+    scenario_definitions = collect_scenario_definitions(results)
+    
+    # 读取开环固定速率扫描结果
+    rate_sweeps = load_rate_sweeps(result_dir)
+    
     # 读取服务器配置
     server_config = ""
     config_file = os.path.join(result_dir, 'server_config.txt')
-    if os.path.exists(config_file):
-        with open(config_file, 'r') as f:
+    if log_exists(config_file):
+        with open_log(config_file) as f:
             server_config = f.read()
     
     # 读取测试配置
     test_config = ""
     test_config_file = os.path.join(result_dir, 'test_config.txt')
-    if os.path.exists(test_config_file):
-        with open(test_config_file, 'r') as f:
+    if log_exists(test_config_file):
+        with open_log(test_config_file) as f:
             test_config = f.read()
     
     # 读取MySQL配置
     mysql_config = ""
     mysql_config_file = os.path.join(result_dir, 'mysql_variables.txt')
-    if os.path.exists(mysql_config_file):
-        with open(mysql_config_file, 'r') as f:
+    if log_exists(mysql_config_file):
+        with open_log(mysql_config_file) as f:
             mysql_config = f.read()
     
+    phase('渲染Markdown')
     # 生成Markdown
     markdown_content = f"""# MySQL 性能测试报告 v7 Final
 
 **测试时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  
-**测试工具**: sysbench + tsar (按时间段精确匹配)  
-**tsar数据样本**: {len(tsar_data)} 条记录  
+**测试工具**: sysbench + {monitor_source or 'tsar'} (按秒对齐)  
+**监控数据样本**: {len(tsar_data)} 条记录 (来源: {monitor_source or '无'})  
+**时钟偏差估计**: {format_clock_skew(skew_info)}  
+**缓冲池预热**: {format_warmup(warmup_info)}  
+**测试间冷却**: {format_cooldown(cooldown_records)}  
 
 ## 测试配置信息
 
 ```
 {test_config}
 ```
-
+"""
+    
+    if scenario_definitions:
+        headers = [header for header, _ in SCENARIO_COLUMNS]
+        markdown_content += "\n### 测试场景定义\n\n"
+        markdown_content += "| " + " | ".join(headers) + " |\n"
+        markdown_content += "|" + "|".join("------" for _ in headers) + "|\n"
+        for definition in scenario_definitions:
+            markdown_content += f"| {' | '.join(format_scenario(definition))} |\n"
+    
+    markdown_content += f"""
 ## MySQL配置参数
 
 ```
@@ -241,11 +264,12 @@ def generate_markdown_report(result_dir):
 
 ## 性能测试结果汇总 (含CPU/IO监控数据)
 
-| 测试场景 | 并发数 | QPS | TPS | 平均延迟(ms) | 95%延迟(ms) | CPU软中断(%) | CPU用户(%) | CPU系统(%) | CPU等待(%) | IO利用率(%) | 监控样本数 | 测试时间段 |
-|---------|--------|-----|-----|-------------|-------------|-------------|------------|------------|------------|-------------|------------|------------|"""
+| 测试场景 | 并发数 | QPS | TPS | 平均延迟(ms) | 95%延迟(ms) | CPU软中断(%) | CPU用户(%) | CPU系统(%) | CPU等待(%) | IO利用率(%) | CPU峰值(%) | CPU饱和(%) | IO峰值(%) | IO饱和(%) | 监控样本数 | 测试时间段 | 有效性 |
+|---------|--------|-----|-----|-------------|-------------|-------------|------------|------------|------------|-------------|------------|------------|-----------|-----------|------------|------------|--------|"""
     
     for result in results:
         cpu_sirq = cpu_user = cpu_sys = cpu_wait = io_util = sample_count = "N/A"
+        cpu_peak = cpu_saturated = io_peak = io_saturated = "N/A"
         
         if result['tsar_data']:
             cpu_sirq = f"{result['tsar_data']['cpu_sirq']:.1f}"
@@ -254,11 +278,143 @@ def generate_markdown_report(result_dir):
             cpu_wait = f"{result['tsar_data']['cpu_wait']:.1f}"
             io_util = f"{result['tsar_data']['io_util']:.1f}"
             sample_count = str(result['tsar_data']['sample_count'])
+            stats = result['tsar_data']['stats']
+            cpu_peak = f"{stats['cpu_busy']['max']:.1f}"
+            cpu_saturated = f"{stats['cpu_busy']['saturated']:.0f}"
+            io_peak = f"{stats['io_util']['max']:.1f}"
+            io_saturated = f"{stats['io_util']['saturated']:.0f}"
         
         time_range = f"{result['start_time']} ~ {result['end_time']}" if result['start_time'] else "N/A"
         
         markdown_content += f"""
-| {result['scenario']} | {result['threads']} | {result['qps']:,.0f} | {result['tps']:,.0f} | {result['avg_latency']:.2f} | {result['p95_latency']:.2f} | {cpu_sirq} | {cpu_user} | {cpu_sys} | {cpu_wait} | {io_util} | {sample_count} | {time_range} |"""
+| {result['scenario']} | {result['threads']} | {result['qps']:,.0f} | {result['tps']:,.0f} | {result['avg_latency']:.2f} | {result['p95_latency']:.2f} | {cpu_sirq} | {cpu_user} | {cpu_sys} | {cpu_wait} | {io_util} | {cpu_peak} | {cpu_saturated} | {io_peak} | {io_saturated} | {sample_count} | {time_range} | {validity_badge(result['validity'])} |"""
+    
+    # 达到饱和阈值的监控指标的窗口分布 (平均值会掩盖饱和时段)
+    if any(saturated_metrics(result['tsar_data']) for result in results):
+        headers = [header for header, _, _ in WINDOW_STAT_COLUMNS]
+        markdown_content += "\n\n### 监控指标分布 (有秒数达到饱和阈值的指标)\n\n"
+        markdown_content += "| 测试场景 | 并发数 | 指标 (饱和阈值) | " + " | ".join(headers) + " |\n"
+        markdown_content += "|---------|--------|------|" + "|".join("------" for _ in headers) + "|"
+        for result in results:
+            for _, label, threshold, stat in saturated_metrics(result['tsar_data']):
+                markdown_content += f"""
+| {result['scenario']} | {result['threads']} | {label} (≥{threshold}%) | {' | '.join(format_window_stat(stat))} |"""
+    
+    # 吞吐停顿与下跌 (每秒tps低于滚动基线)
+    if any(result['stalls'] for result in results):
+        headers = [header for header, _, _ in STALL_COLUMNS]
+        markdown_content += "\n\n### 吞吐停顿与下跌\n\n"
+        markdown_content += "| 测试场景 | 并发数 | " + " | ".join(headers) + " |\n"
+        markdown_content += "|---------|--------|" + "|".join("------" for _ in headers) + "|"
+        for result in results:
+            for event in reported_stalls(result['stalls']):
+                markdown_content += f"""
+| {result['scenario']} | {result['threads']} | {' | '.join(format_stall(event))} |"""
+    
+    # 结果有效性检查发现的问题
+    if any(result['validity']['findings'] for result in results):
+        headers = [header for header, _ in VALIDITY_COLUMNS]
+        markdown_content += "\n\n### 结果有效性检查\n\n"
+        markdown_content += "| 测试场景 | 并发数 | " + " | ".join(headers) + " |\n"
+        markdown_content += "|---------|--------|" + "|".join("------" for _ in headers) + "|"
+        for result in results:
+            for finding in result['validity']['findings']:
+                markdown_content += f"""
+| {result['scenario']} | {result['threads']} | {' | '.join(format_finding(finding))} |"""
+    
+    # MySQL内部状态 (压测期间每秒平均)
+    if any(result['mysql_status'] for result in results):
+        headers = [header for header, _, _ in MYSQL_STATUS_COLUMNS]
+        markdown_content += "\n\n### MySQL内部状态 (压测期间每秒平均)\n\n"
+        markdown_content += "| 测试场景 | 并发数 | " + " | ".join(headers) + " |\n"
+        markdown_content += "|---------|--------|" + "|".join("------" for _ in headers) + "|"
+        for result in results:
+            values = format_mysql_status(result['mysql_status'])
+            markdown_content += f"""
+| {result['scenario']} | {result['threads']} | {' | '.join(values)} |"""
+    
+    # performance_schema 等待事件随并发数的变化，以及最高并发数下耗时最多的语句
+    for scenario, threads_list, events, profile, peak_threads, statements in scenario_profiles(results):
+        markdown_content += f"\n\n### 等待事件: {scenario} (每秒等待时间ms, 占比)\n\n"
+        markdown_content += "| 等待事件 | " + " | ".join(f"{threads}线程" for threads in threads_list) + " |\n"
+        markdown_content += "|---------|" + "|".join("------" for _ in threads_list) + "|"
+        for event in events:
+            values = [format_wait(profile[threads].get(event)) for threads in threads_list]
+            markdown_content += f"""
+| {event} | {' | '.join(values)} |"""
+        if statements:
+            headers = [header for header, _, _ in STATEMENT_COLUMNS]
+            markdown_content += f"\n\n#### 耗时最多的语句 ({peak_threads}线程)\n\n"
+            markdown_content += "| " + " | ".join(headers) + " |\n"
+            markdown_content += "|" + "|".join("------" for _ in headers) + "|"
+            for row in statements:
+                markdown_content += f"""
+| {' | '.join(format_statement(row))} |"""
+    
+    # mysqld On-CPU 火焰图 (各场景最高并发数的测试，图片写入结果目录)
+    for result in results:
+        if not result['cpu_stacks']:
+            continue
+        test_name = f"{result['scenario']}_{result['threads']}threads"
+        chart_file = f"flame_{test_name}.svg"
+        with open(os.path.join(report_dir(result_dir), chart_file), 'w', encoding='utf-8') as f:
+            f.write(render_flame_svg(result['cpu_stacks'], f"{test_name} mysqld On-CPU"))
+        headers = [header for header, _, _ in FLAME_COLUMNS]
+        markdown_content += f"\n\n### On-CPU 火焰图: {test_name} ({sum(result['cpu_stacks'].values()):,} 样本)\n\n"
+        markdown_content += f"[{test_name} 火焰图 (浏览器中打开可点击放大)]({chart_file})\n\n"
+        markdown_content += "| " + " | ".join(headers) + " |\n"
+        markdown_content += "|" + "|".join("------" for _ in headers) + "|"
+        for row in top_functions(result['cpu_stacks']):
+            markdown_content += f"""
+| {' | '.join(format_function(row))} |"""
+    
+    # 网络吞吐与包速率 (按秒对齐的监控数据)
+    if any(result['network'] for result in results):
+        headers = [header for header, _, _ in NETWORK_COLUMNS]
+        markdown_content += "\n\n### 网络吞吐与包速率\n\n"
+        markdown_content += "| 测试场景 | 并发数 | " + " | ".join(headers) + " |\n"
+        markdown_content += "|---------|--------|" + "|".join("------" for _ in headers) + "|"
+        for result in results:
+            values = format_network(result['network'])
+            markdown_content += f"""
+| {result['scenario']} | {result['threads']} | {' | '.join(values)} |"""
+    
+    # 单核CPU热点 (按秒对齐的每核数据)
+    if any(result['cpu_hotspot'] for result in results):
+        headers = [header for header, _, _ in CPU_HOTSPOT_COLUMNS] + ['热点']
+        markdown_content += "\n\n### 单核CPU/软中断热点\n\n"
+        markdown_content += "| 测试场景 | 并发数 | " + " | ".join(headers) + " |\n"
+        markdown_content += "|---------|--------|" + "|".join("------" for _ in headers) + "|"
+        for result in results:
+            values = format_cpu_hotspot(result['cpu_hotspot']) + [hotspot_flag(result['cpu_hotspot'])]
+            markdown_content += f"""
+| {result['scenario']} | {result['threads']} | {' | '.join(values)} |"""
+    
+    # 压测客户端资源
+    if any(result['client'] for result in results):
+        headers = [header for header, _, _ in CLIENT_COLUMNS]
+        markdown_content += "\n\n### 压测客户端资源\n\n"
+        if client_bound_tests:
+            markdown_content += f"> ⚠️ 以下测试受压测客户端限制，结果不能作为服务器容量: {', '.join(client_bound_tests)}\n\n"
+        markdown_content += "| 测试场景 | 并发数 | " + " | ".join(headers) + " |\n"
+        markdown_content += "|---------|--------|" + "|".join("------" for _ in headers) + "|"
+        for result in results:
+            values = format_client(result['client'])
+            markdown_content += f"""
+| {result['scenario']} | {result['threads']} | {' | '.join(values)} |"""
+    
+    # 开环固定速率扫描 (延迟-负载曲线，图片写入结果目录)
+    for scenario, steps in sorted(rate_sweeps.items()):
+        chart_file = f"latency_vs_load_{scenario}.svg"
+        with open(os.path.join(report_dir(result_dir), chart_file), 'w', encoding='utf-8') as f:
+            f.write(render_latency_svg(sweep_series(steps), f"{scenario} 延迟-负载曲线"))
+        headers = [header for header, _, _ in RATE_SWEEP_COLUMNS]
+        markdown_content += f"\n\n### 固定速率扫描: {scenario}\n\n![{scenario} 延迟-负载曲线]({chart_file})\n\n"
+        markdown_content += "| " + " | ".join(headers) + " |\n"
+        markdown_content += "|" + "|".join("------" for _ in headers) + "|"
+        for step in steps:
+            markdown_content += f"""
+| {' | '.join(format_rate_step(step))} |"""
     
     markdown_content += """
 
@@ -294,31 +450,44 @@ def generate_markdown_report(result_dir):
 
 ## 说明
 
-- CPU/IO数据来源于tsar监控日志，按测试时间段精确匹配并计算平均值
-- 监控样本数表示该测试时间段内tsar记录的数据点数量
+- CPU/IO数据来源于tsar监控日志，先用每秒tps与tsar CPU利用率互相关估计客户端/服务端时钟偏差，再与每秒结果逐秒对齐后计算平均值
+- 监控样本数表示该测试运行的各秒中对齐到tsar记录的数据点数量
+- 停顿与下跌: 每秒tps低于前30秒中位数 (滚动基线) 的一半记为下跌，相隔不超过1秒的合并为一个事件，最低点低于基线10%时为停顿；对照同一秒的tsar样本，按IO利用率 ≥ 90%、CPU等待 ≥ 20%、CPU繁忙 ≥ 90%、软中断 ≥ 10% 的顺序给出可能的瓶颈，都未饱和时多为锁、刷脏或redo等MySQL内部等待；每个测试最多列出持续最长的20个
+- 峰值与饱和: CPU峰值为窗口内 CPU繁忙 (用户 + 系统 + 软中断) 的最大值，CPU饱和为其 ≥ 90% 的秒数占比；IO峰值/IO饱和同理 (≥ 90%)。有秒数达到饱和阈值的指标在 "监控指标分布" 表中列出中位数、p95、最大值与标准差
 - 系统监控数据与性能数据时间精确对应，确保数据准确性
+- 有效性: 按规则检查错误率 (默认 > 0.1% 警告、> 1% 无效)、重连次数、线程事件数不均衡 (标准差/平均值)、监控覆盖率、实际运行时长 / TEST_TIME 与每秒结果缺失，阈值可用 VALIDITY_* 配置覆盖；无效的测试在合并报告中不参与排名
+- 火焰图: FLAME_GRAPH=true 时对各场景最高并发数的测试在运行中段执行 perf record -g (采样频率与时长见测试配置)，宽度为样本占比，从下到上为调用链，内核函数带 _[k] 后缀；SVG 在浏览器中打开可点击函数放大。热点函数表按自身样本 (位于栈顶) 排序，含子调用占比包括其调用的函数
+- MySQL内部状态来自压测期间每秒一次的 SHOW GLOBAL STATUS 增量，BP命中率 = 1 - Innodb_buffer_pool_reads / Innodb_buffer_pool_read_requests
+- 等待事件: 每个测试前后读取 performance_schema.events_waits_summary_global_by_event_name 的增量 (不含 idle)，单元格为每秒等待时间 (ms，多个线程的等待累加，可超过1000) 与占全部等待时间的比例；列出各并发数下前8的事件，随并发数上升占比变大的事件即竞争点。mutex/rwlock 仪表默认关闭，需设置 PERF_SCHEMA_ENABLE_WAITS=true；语句来自 events_statements_summary_by_digest 的增量
+- 网络: 包/查询 = (入包 + 出包) / QPS，字节/查询同理，按同一秒的监控样本与每秒QPS计算；重传率 = TCP重传报文 / 发出报文 (需要 tsar --traffic --tcp --pcsw 或 proc_sampler)；没有网卡包计数时只显示重传与上下文切换
+- 固定速率扫描: sysbench --rate 按闭环峰值TPS的百分比施加固定到达速率 (开环)，延迟分位数由 --histogram 计算，队列为等待执行的事件数，达成率 = 实际TPS / 目标TPS
+- 客户端: 压测机本机 proc_sampler 在负载运行期间的样本 (client_sampler.log)，sysbench CPU 以核数计；客户端整体CPU ≥ 85% 或最忙核 ≥ 95%，而服务器CPU未饱和 (< 85%) 且低于客户端时判定为客户端瓶颈，其结果不能作为服务器容量
+- 单核热点: 每秒取最忙核利用率，不均衡指数 = 最忙核利用率 / 各核平均利用率；单核利用率 ≥ 90% 而整体CPU < 50% 的秒数过半时标记热点 (需要 tsar --percpu 或 proc_sampler 每核数据)
 - 测试使用sysbench工具，针对MySQL数据库进行标准化性能测试
 
 ---
 *报告生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*
 """
     
+    phase('写入报告')
     # 写入Markdown文件
-    report_file = os.path.join(result_dir, 'performance_report.md')
+    report_file = os.path.join(report_dir(result_dir), 'performance_report.md')
     with open(report_file, 'w', encoding='utf-8') as f:
         f.write(markdown_content)
     
     return report_file
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("用法: python3 generate_markdown_report.py <结果目录>")
+    argv = profile_from_argv(sys.argv)
+    if len(argv) != 2:
+        print("用法: python3 generate_markdown_report.py [--profile[=cProfile文件]] <结果目录>")
         sys.exit(1)
     
-    result_dir = sys.argv[1]
-    if not os.path.exists(result_dir):
+    result_dir = argv[1]
+    if not os.path.exists(result_dir) and not pack_path(result_dir):
         print(f"错误: 结果目录不存在: {result_dir}")
         sys.exit(1)
     
     report_file = generate_markdown_report(result_dir)
     print(f"Markdown测试报告已生成: {report_file}")
+    report_profile()
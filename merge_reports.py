@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
 import sys
-import os
 import re
 from datetime import datetime
 
+from rate_sweep import render_latency_svg
+from server_config import load_server_settings, config_diff_markdown
+from profiling import profile_from_argv, phase, report_profile
+from compressed_logs import log_exists, open_log
+from result_pack import report_path
+
+# Built-in sysbench scenarios with their own comparison sections; anything else is a custom scenario
+STANDARD_SCENARIOS = ['oltp_point_select', 'oltp_read_only', 'oltp_read_write', 'oltp_write_only']
+
 def extract_innodb_buffer_pool_size(content):
     """Extract and convert innodb_buffer_pool_size to GB"""
     match = re.search(r'innodb_buffer_pool_size\s+(\d+)', content)
@@ -18,15 +26,28 @@ def extract_all_performance_data(content):
     lines = content.split('\n')
     results = {}
     
+    in_summary = False
+    headers = []
+    
     for line in lines:
-        if '| oltp_' in line and line.count('|') > 10:
+        # Only rows of the main summary table; later tables also start with the scenario name
+        if '| 测试场景 | 并发数 | QPS |' in line:
+            in_summary = True
+            headers = [p.strip() for p in line.split('|')]
+            continue
+        if in_summary and not line.startswith('|'):
+            in_summary = False
+        if in_summary and line.startswith('| ') and line.count('|') > 10:
             parts = [p.strip() for p in line.split('|')]
             if len(parts) > 3 and parts[1] and parts[2]:
                 scenario = parts[1]
                 threads = parts[2]
                 if scenario not in results:
                     results[scenario] = {}
+                # Reports without the validity column are treated as valid
+                validity = parts[headers.index('有效性')] if '有效性' in headers else ''
                 results[scenario][threads] = {
+                    'invalid': '无效' in validity,
                     'qps': parts[3] if len(parts) > 3 else '',
                     'tps': parts[4] if len(parts) > 4 else '',
                     'avg_latency': parts[5] if len(parts) > 5 else '',
@@ -45,6 +66,92 @@ def extract_innodb_flush_log(content):
     match = re.search(r'innodb_flush_log_at_trx_commit\s+(\d+)', content)
     return match.group(1) if match else "N/A"
 
+def format_cell(cell, key):
+    """Comparison table value; cells the validity check marked invalid are flagged"""
+    if not cell:
+        return '-'
+    value = cell.get(key, '-')
+    return f"{value} ❌" if cell.get('invalid') else value
+
+def invalid_cells(env_names, env_data):
+    """(env, scenario, threads) of every cell marked invalid, excluded from rankings"""
+    return [(env, scenario, threads) for env in env_names if env in env_data
+            for scenario, cells in env_data[env]['performance'].items()
+            for threads, cell in sorted(cells.items(), key=lambda item: int(item[0]))
+            if cell.get('invalid')]
+
+def extract_network_data(content):
+    """Extract per-cell network metrics from the network throughput table"""
+    lines = content.split('\n')
+    results = {}
+    headers = None
+    
+    for line in lines:
+        if '| 测试场景 | 并发数 | 入包/s |' in line:
+            headers = [p.strip() for p in line.split('|')]
+            continue
+        if headers and not line.startswith('|'):
+            headers = None
+        if headers and line.startswith('| '):
+            parts = [p.strip() for p in line.split('|')]
+            row = dict(zip(headers, parts))
+            results.setdefault(parts[1], {})[parts[2]] = {
+                'pkts_in': row.get('入包/s', 'N/A'),
+                'pkts_out': row.get('出包/s', 'N/A'),
+                'pkts_per_query': row.get('包/查询', 'N/A'),
+                'bytes_per_query': row.get('字节/查询', 'N/A'),
+                'retrans_pct': row.get('重传率(%)', 'N/A')
+            }
+    
+    return results
+
+def extract_scenario_definitions(content):
+    """Extract scenario ID -> (script, options) from the scenario definition table"""
+    lines = content.split('\n')
+    results = {}
+    in_table = False
+    
+    for line in lines:
+        if line.startswith('| 场景ID | 脚本 | 参数 |'):
+            in_table = True
+            continue
+        if in_table and not line.startswith('|'):
+            in_table = False
+        if in_table and line.startswith('| '):
+            parts = [p.strip() for p in line.split('|')]
+            results[parts[1]] = (parts[2], parts[3])
+    
+    return results
+
+def extract_rate_sweep_data(content):
+    """Extract fixed-rate sweep steps per scenario from the latency-vs-load tables"""
+    lines = content.split('\n')
+    results = {}
+    scenario = None
+    headers = None
+    
+    for line in lines:
+        if line.startswith('### 固定速率扫描:'):
+            scenario = line.split(':', 1)[1].strip()
+            continue
+        if scenario and line.startswith('| 目标负载(%) |'):
+            headers = [p.strip() for p in line.split('|')]
+            continue
+        if headers and not line.startswith('|'):
+            headers = None
+            scenario = None
+        if headers and re.match(r'\|\s*\d+\s*\|', line):
+            row = dict(zip(headers, [p.strip() for p in line.split('|')]))
+            results.setdefault(scenario, []).append({
+                'percent': row.get('目标负载(%)'),
+                'target_rate': row.get('目标TPS', 'N/A'),
+                'tps': row.get('实际TPS', 'N/A'),
+                'achieved_pct': row.get('达成率(%)', 'N/A'),
+                'p99': row.get('p99(ms)', 'N/A')
+            })
+    
+    return results
+
 def extract_cpu_memory_info(content):
     """Extract CPU model, cores, and memory info"""
     cpu_match = re.search(r'型号名称：\s*(.+)', content)
@@ -68,8 +175,15 @@ def extract_summary_table_rows(content, env_name):
     lines = content.split('\n')
     rows = []
     
+    in_summary = False
+    
     for line in lines:
-        if '| oltp_' in line and '| 128 |' in line:
+        if '| 测试场景 | 并发数 | QPS |' in line:
+            in_summary = True
+            continue
+        if in_summary and not line.startswith('|'):
+            in_summary = False
+        if in_summary and line.startswith('| ') and '| 128 |' in line:
             # Remove monitoring sample count column and add environment
             parts = line.split('|')
             if len(parts) >= 13:
@@ -82,17 +196,19 @@ def extract_summary_table_rows(content, env_name):
 def merge_reports(env_names):
     """Merge multiple performance reports"""
     
+    phase('读取报告')
     # Read all reports
     reports = {}
     for env in env_names:
-        file_path = f"{env}/performance_report.md"
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
+        file_path = report_path(env, 'performance_report.md')
+        if log_exists(file_path):
+            with open_log(file_path, encoding='utf-8') as f:
                 reports[env] = f.read()
         else:
             print(f"Warning: {file_path} not found")
             return
     
+    phase('解析报告')
     # Extract data for summary
     env_data = {}
     
@@ -101,6 +217,9 @@ def merge_reports(env_names):
         buffer_size = extract_innodb_buffer_pool_size(content)
         flush_log = extract_innodb_flush_log(content)
         perf_data = extract_all_performance_data(content)
+        network_data = extract_network_data(content)
+        rate_sweep_data = extract_rate_sweep_data(content)
+        scenario_definitions = extract_scenario_definitions(content)
         
         env_data[env] = {
             'cpu_model': cpu_model,
@@ -108,9 +227,13 @@ def merge_reports(env_names):
             'memory': memory,
             'buffer_size': buffer_size,
             'flush_log': flush_log,
-            'performance': perf_data
+            'performance': perf_data,
+            'network': network_data,
+            'rate_sweep': rate_sweep_data,
+            'scenarios': scenario_definitions
         }
     
+    phase('生成合并报告')
     # Generate merged report
     output = f"""# MySQL Sysbench 性能测试综合报告
 
@@ -129,6 +252,11 @@ def merge_reports(env_names):
             data = env_data[env]
             output += f"| **{env}** | {data['cpu_model']} | {data['cores']} | {data['memory']} | {data['buffer_size']} | {data['flush_log']} |\n"
     
+    # Settings that differ between environments, to explain throughput gaps
+    phase('配置差异')
+    output += config_diff_markdown(env_names, [load_server_settings(env) for env in env_names])
+    phase('生成合并报告')
+    
     output += """
 ### 测试配置
 
@@ -155,7 +283,7 @@ def merge_reports(env_names):
             perf = env_data[env]['performance']['oltp_point_select']
             row = f"| **{env}** |"
             for threads in ['1', '8', '16', '32', '64', '128']:
-                qps = perf.get(threads, {}).get('qps', '-')
+                qps = format_cell(perf.get(threads), 'qps')
                 row += f" {qps} |"
             output += row + "\n"
     
@@ -168,7 +296,7 @@ def merge_reports(env_names):
             perf = env_data[env]['performance']['oltp_write_only']
             row = f"| **{env}** |"
             for threads in ['1', '8', '16', '32', '64', '128']:
-                qps = perf.get(threads, {}).get('qps', '-')
+                qps = format_cell(perf.get(threads), 'qps')
                 row += f" {qps} |"
             output += row + "\n"
     
@@ -181,7 +309,7 @@ def merge_reports(env_names):
             perf = env_data[env]['performance']['oltp_read_write']
             row = f"| **{env}** |"
             for threads in ['1', '8', '16', '32', '64', '128']:
-                qps = perf.get(threads, {}).get('qps', '-')
+                qps = format_cell(perf.get(threads), 'qps')
                 row += f" {qps} |"
             output += row + "\n"
     
@@ -194,10 +322,42 @@ def merge_reports(env_names):
             perf = env_data[env]['performance']['oltp_read_only']
             row = f"| **{env}** |"
             for threads in ['1', '8', '16', '32', '64', '128']:
-                qps = perf.get(threads, {}).get('qps', '-')
+                qps = format_cell(perf.get(threads), 'qps')
                 row += f" {qps} |"
             output += row + "\n"
     
+    # Custom scenarios (own Lua scripts or non-default options), any thread counts
+    custom_scenarios = sorted({scenario for env in env_names if env in env_data
+                               for scenario in env_data[env]['performance']
+                               if scenario not in STANDARD_SCENARIOS})
+    for scenario in custom_scenarios:
+        thread_counts = sorted({threads for env in env_names if env in env_data
+                                for threads in env_data[env]['performance'].get(scenario, {})}, key=int)
+        output += f"\n### 自定义场景: {scenario}\n\n"
+        definitions = {env_data[env]['scenarios'][scenario] for env in env_names
+                       if env in env_data and scenario in env_data[env]['scenarios']}
+        for script, options in sorted(definitions):
+            output += f"- 脚本: `{script}`，参数: `{options}`\n"
+        if len(definitions) > 1:
+            output += "- ⚠️ 各环境的场景定义不一致，结果不可直接比较\n"
+        output += "\n| 环境 |" + "".join(f" {threads}线程 QPS / p95(ms) |" for threads in thread_counts) + "\n"
+        output += "|------|" + "".join("------|" for _ in thread_counts) + "\n"
+        for env in env_names:
+            if env in env_data and scenario in env_data[env]['performance']:
+                perf = env_data[env]['performance'][scenario]
+                row = f"| **{env}** |"
+                for threads in thread_counts:
+                    cell = perf.get(threads)
+                    row += f" {format_cell(cell, 'qps')} / {format_cell(cell, 'p95_latency')} |"
+                output += row + "\n"
+    
+    excluded = invalid_cells(env_names, env_data)
+    if excluded:
+        output += "\n### ❌ 无效结果 (不参与排名)\n\n"
+        output += "以下测试未通过结果有效性检查 (错误率、重连、线程不均衡、运行时长等)，详见各环境报告的 \"结果有效性检查\" 表:\n\n"
+        for env, scenario, threads in excluded:
+            output += f"- **{env}**: {scenario} {threads}线程\n"
+    
     output += """
 ---
 
@@ -214,7 +374,7 @@ def merge_reports(env_names):
             perf = env_data[env]['performance']['oltp_point_select']
             row = f"| **{env}** |"
             for threads in ['1', '8', '16', '32', '64', '128']:
-                latency = perf.get(threads, {}).get('p95_latency', '-')
+                latency = format_cell(perf.get(threads), 'p95_latency')
                 row += f" {latency} |"
             output += row + "\n"
     
@@ -227,7 +387,7 @@ def merge_reports(env_names):
             perf = env_data[env]['performance']['oltp_read_write']
             row = f"| **{env}** |"
             for threads in ['1', '8', '16', '32', '64', '128']:
-                latency = perf.get(threads, {}).get('p95_latency', '-')
+                latency = format_cell(perf.get(threads), 'p95_latency')
                 row += f" {latency} |"
             output += row + "\n"
     
@@ -240,7 +400,7 @@ def merge_reports(env_names):
             perf = env_data[env]['performance']['oltp_write_only']
             row = f"| **{env}** |"
             for threads in ['1', '8', '16', '32', '64', '128']:
-                latency = perf.get(threads, {}).get('p95_latency', '-')
+                latency = format_cell(perf.get(threads), 'p95_latency')
                 row += f" {latency} |"
             output += row + "\n"
     
@@ -269,7 +429,7 @@ def merge_reports(env_names):
     output += header + "\n" + separator + "\n"
     
     # Add 64-thread comparison for all scenarios
-    scenarios = ['oltp_point_select', 'oltp_read_only', 'oltp_read_write', 'oltp_write_only']
+    scenarios = STANDARD_SCENARIOS + custom_scenarios
     scenario_names = {
         'oltp_point_select': '点查询',
         'oltp_read_only': '只读',
@@ -281,12 +441,73 @@ def merge_reports(env_names):
         row = f"| **{scenario_names.get(scenario, scenario)}** |"
         for env in env_names:
             if env in env_data and scenario in env_data[env]['performance']:
-                qps = env_data[env]['performance'][scenario].get('64', {}).get('qps', '-')
+                qps = format_cell(env_data[env]['performance'][scenario].get('64'), 'qps')
                 row += f" {qps} |"
             else:
                 row += " - |"
         output += row + "\n"
     
+    # Packets per query across environments: network-bound hosts need more packets per query
+    # or hit a flat packet rate while QPS stops scaling
+    if any(env_data[env]['network'] for env in env_names if env in env_data):
+        output += """
+## 🌐 网络包量对比
+
+### 点查询每查询包数 (入包+出包)/QPS
+
+| 环境 | 1线程 | 8线程 | 16线程 | 32线程 | 64线程 | 128线程 |
+|------|-------|-------|--------|--------|--------|----------|
+"""
+        for env in env_names:
+            network = env_data.get(env, {}).get('network', {}).get('oltp_point_select')
+            if network:
+                row = f"| **{env}** |"
+                for threads in ['1', '8', '16', '32', '64', '128']:
+                    row += f" {network.get(threads, {}).get('pkts_per_query', '-')} |"
+                output += row + "\n"
+        
+        output += "\n### 点查询128线程网络负载\n\n"
+        output += "| 环境 | QPS | 入包/s | 出包/s | 包/查询 | 字节/查询 | 重传率(%) |\n"
+        output += "|------|-----|--------|--------|---------|-----------|-----------|\n"
+        for env in env_names:
+            network = env_data.get(env, {}).get('network', {}).get('oltp_point_select', {}).get('128')
+            if network:
+                qps = format_cell(env_data[env]['performance'].get('oltp_point_select', {}).get('128'), 'qps')
+                output += (f"| **{env}** | {qps} | {network['pkts_in']} | {network['pkts_out']} | "
+                           f"{network['pkts_per_query']} | {network['bytes_per_query']} | {network['retrans_pct']} |\n")
+    
+    # p99 against offered load: where each environment's latency knee sits
+    sweep_scenarios = sorted({scenario for env in env_names if env in env_data
+                              for scenario in env_data[env]['rate_sweep']})
+    if sweep_scenarios:
+        output += """
+## 📈 延迟-负载曲线对比 (固定速率扫描)
+"""
+        for scenario in sweep_scenarios:
+            series = []
+            output += f"\n### {scenario}: p99延迟(ms) / 达成率(%)\n\n"
+            output += "| 环境 | 目标负载(%) | 目标TPS | 实际TPS | 达成率(%) | p99(ms) |\n"
+            output += "|------|-------------|---------|---------|-----------|---------|\n"
+            for env in env_names:
+                steps = env_data.get(env, {}).get('rate_sweep', {}).get(scenario, [])
+                points = []
+                for step in steps:
+                    output += (f"| **{env}** | {step['percent']} | {step['target_rate']} | {step['tps']} | "
+                               f"{step['achieved_pct']} | {step['p99']} |\n")
+                    try:
+                        points.append((float(step['target_rate'].replace(',', '')), float(step['p99'])))
+                    except ValueError:
+                        continue
+                if points:
+                    series.append((env, points))
+            
+            chart = render_latency_svg(series, f"{scenario} p99延迟 - 目标负载")
+            if chart:
+                chart_file = f"mysql_sysbench_latency_vs_load_{scenario}.svg"
+                with open(chart_file, 'w', encoding='utf-8') as f:
+                    f.write(chart)
+                output += f"\n![{scenario} p99延迟 - 目标负载]({chart_file})\n"
+    
     output += """
 """
     
@@ -307,11 +528,14 @@ def merge_reports(env_names):
                     break
             
             chapter_content = '\n'.join(lines[start_idx:])
+            # Charts are written next to each environment's report
+            chapter_content = chapter_content.replace('](latency_vs_load_', f']({env}/latency_vs_load_')
             
             # Remove monitoring sample count column from tables
             chapter_lines = chapter_content.split('\n')
             processed_lines = []
             in_table = False
+            sample_column = None
             skip_section = False
             
             for line in chapter_lines:
@@ -335,33 +559,24 @@ def merge_reports(env_names):
                 # Check if we're in the main performance table
                 if '| 测试场景 | 并发数 | QPS |' in line:
                     in_table = True
-                    # Remove 监控样本数 column from header
+                    # Remove 监控样本数 column from header; its position depends on the report version
                     parts = line.split('|')
-                    if '监控样本数' in line:
-                        # Find and remove 监控样本数 column
-                        new_parts = []
-                        for part in parts:
-                            if '监控样本数' not in part:
-                                new_parts.append(part)
-                        processed_lines.append('|'.join(new_parts))
-                    else:
-                        processed_lines.append(line)
+                    sample_column = next((i for i, part in enumerate(parts) if '监控样本数' in part), None)
+                    if sample_column is not None:
+                        del parts[sample_column]
+                    processed_lines.append('|'.join(parts))
                 elif in_table and line.startswith('|------'):
                     # Remove corresponding separator
                     parts = line.split('|')
-                    if len(parts) > 13:  # Has monitoring sample count column
-                        new_parts = parts[:12] + parts[13:]
-                        processed_lines.append('|'.join(new_parts))
-                    else:
-                        processed_lines.append(line)
-                elif in_table and line.startswith('| oltp_'):
+                    if sample_column is not None and len(parts) > sample_column:
+                        del parts[sample_column]
+                    processed_lines.append('|'.join(parts))
+                elif in_table and line.startswith('| '):
                     # Remove monitoring sample count data
                     parts = line.split('|')
-                    if len(parts) > 13:  # Has monitoring sample count column
-                        new_parts = parts[:12] + parts[13:]
-                        processed_lines.append('|'.join(new_parts))
-                    else:
-                        processed_lines.append(line)
+                    if sample_column is not None and len(parts) > sample_column:
+                        del parts[sample_column]
+                    processed_lines.append('|'.join(parts))
                 elif in_table and (line.strip() == '' or not line.startswith('|')):
                     # End of table
                     in_table = False
@@ -406,6 +621,7 @@ def merge_reports(env_names):
 
 - CPU/IO数据来源于tsar监控日志，按测试时间段精确匹配并计算平均值
 - 系统监控数据与性能数据时间精确对应，确保数据准确性
+- 标记 ❌ 的结果未通过结果有效性检查，不参与排名与环境推荐
 - 测试使用sysbench工具，针对MySQL数据库进行标准化性能测试
 
 ---
@@ -416,15 +632,18 @@ def merge_reports(env_names):
     output += f"*报告生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n"
     
     # Write output
+    phase('写入报告')
     with open('mysql_sysbench.md', 'w', encoding='utf-8') as f:
         f.write(output)
     
     print(f"合并报告已生成: mysql_sysbench.md")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python3 merge_reports.py env1,env2,env3,...")
+    argv = profile_from_argv(sys.argv)
+    if len(argv) != 2:
+        print("Usage: python3 merge_reports.py [--profile[=cprofile_file]] env1,env2,env3,...")
         sys.exit(1)
     
-    env_names = sys.argv[1].split(',')
+    env_names = argv[1].split(',')
     merge_reports(env_names)
+    report_profile()
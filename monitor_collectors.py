@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""系统监控数据采集器
+
+每种采集器对应结果目录中的一个日志文件，解析函数统一返回
+{datetime(整秒): {'cpu_user', 'cpu_sys', 'cpu_wait', 'cpu_sirq', 'cpu_util', 'io_util', ...}}，
+报告生成器通过 load_monitor_data 按 MONITOR_COLLECTORS 的顺序选用第一个存在的日志。
+"""
+import os
+import re
+from datetime import datetime, timedelta
+
+from compressed_logs import log_exists, open_log
+
+
+# tsar cpu 模块的列名到报告字段的映射
+TSAR_CPU_FIELDS = {
+    'user': 'cpu_user',
+    'sys': 'cpu_sys',
+    'wait': 'cpu_wait',
+    'hirq': 'cpu_hirq',
+    'sirq': 'cpu_sirq',
+    'util': 'cpu_util',
+}
+
+# tsar io 模块 (-I 设备) 的列名到报告字段的映射
+TSAR_IO_FIELDS = {
+    'rs': 'io_rs',
+    'ws': 'io_ws',
+    'await': 'io_await',
+    'util': 'io_util',
+}
+
+PERCPU_GROUP = re.compile(r'^cpu\d+$')
+
+UNIT_SCALE = {'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12}
+
+
+def _tsar_value(text):
+    """解析tsar数值，支持 2.8M / 7.5K 这样的单位后缀"""
+    scale = UNIT_SCALE.get(text[-1:])
+    if scale:
+        return float(text[:-1]) * scale
+    return float(text)
+
+
+def _tsar_columns(group_line, field_line):
+    """根据tsar的两行表头，返回每一列的 (模块/设备名, 列名)
+
+    第一行形如 "Time  ----cpu---- ----sfdv0n1----"，第二行是各列名称 (右对齐)，
+    按列名结束位置落在哪个 "---名称---" 区间确定它所属的模块。
+    """
+    groups = [(m.start(), m.end(), m.group().strip('-'))
+              for m in re.finditer(r'-+[^\s-]*-+', group_line)]
+    columns = []
+    for m in re.finditer(r'\S+', field_line):
+        if m.start() == 0:
+            continue  # Time
+        owner = ''
+        for start, end, name in groups:
+            if start <= m.end() - 1 <= end:
+                owner = name
+                break
+        columns.append((owner, m.group()))
+    return columns
+
+
+def _tsar_sample(columns, values):
+    """把一行tsar数值映射为报告字段
+
+    cpu 模块映射为 cpu_*；--percpu 的 cpuN 模块映射为 cpuN_*；带 await/util 列的
+    设备模块映射为 io_*；其余模块保存为 模块名_列名。
+    多块盘时 io_* 全部取自该秒 util 最高的一块盘 (最可能成为瓶颈的盘)，
+    使 io_util、io_rs/io_ws 与 io_await 描述同一块盘，而不是各盘数值的拼凑。
+    """
+    sample = {}
+    devices = {}
+    io_groups = {owner for owner, field in columns if field == 'await'}
+    for (owner, field), value in zip(columns, values):
+        if owner == 'cpu' and field in TSAR_CPU_FIELDS:
+            sample[TSAR_CPU_FIELDS[field]] = value
+        elif PERCPU_GROUP.match(owner):
+            sample[f'{owner}_{field}'] = value
+        elif owner in io_groups:
+            if field in TSAR_IO_FIELDS:
+                devices.setdefault(owner, {})[TSAR_IO_FIELDS[field]] = value
+        else:
+            sample[f'{owner}_{field}'] = value
+    if devices:
+        sample.update(max(devices.values(), key=lambda device: device.get('io_util', 0.0)))
+    return sample
+
+
+def parse_tsar_log(tsar_file):
+    """解析tsar.log文件，返回时间戳和CPU/IO数据的字典
+
+    列含义由tsar周期性输出的表头决定，因此 --cpu/--percpu/--io 等模块的任意组合都能解析；
+    文件开头缺少表头时按 "tsar --cpu --io -I 设备" 的固定列位置解析。
+    """
+    tsar_data = {}
+    
+    if not log_exists(tsar_file):
+        print(f"警告: tsar.log文件不存在: {tsar_file}")
+        return tsar_data
+    
+    columns = None
+    group_line = ''
+    with open_log(tsar_file) as f:
+        for line in f:
+            line = line.rstrip()
+            if line.startswith('Time'):
+                if '---' in line:
+                    group_line = line
+                else:
+                    columns = _tsar_columns(group_line, line)
+                continue
+            
+            parts = line.split()
+            if len(parts) < 6:
+                continue
+            
+            # 解析时间格式: 22/11/25-15:33:45
+            time_str = parts[0]
+            try:
+                # tsar格式: 22/11/25-15:33:45 表示 2025-11-22 15:33:45 (日/月/年)
+                date_part, time_part = time_str.split('-')
+                dd, mm, yy = date_part.split('/')
+                
+                # 转换为完整日期: 22/11/25 -> 2025-11-22
+                full_year = f"20{yy}"
+                dt = datetime.strptime(f"{full_year}-{mm}-{dd} {time_part}", "%Y-%m-%d %H:%M:%S")
+                
+                if columns:
+                    sample = _tsar_sample(columns, [_tsar_value(v) for v in parts[1:]])
+                    sample.setdefault('io_util', 0.0)
+                else:
+                    # 解析CPU数据 (user, sys, wait, hirq, sirq, util)，IO利用率为最后一列
+                    sample = {
+                        'cpu_user': float(parts[1]),
+                        'cpu_sys': float(parts[2]),
+                        'cpu_wait': float(parts[3]),
+                        'cpu_sirq': float(parts[5]),
+                        'cpu_util': float(parts[6]),
+                        'io_util': float(parts[23]) if len(parts) >= 24 else 0.0
+                    }
+                
+                if 'cpu_user' not in sample:
+                    continue
+                tsar_data[dt] = sample
+            except (ValueError, IndexError) as e:
+                continue
+    
+    return tsar_data
+
+
+def parse_proc_sampler_log(log_file):
+    """解析 proc_sampler.py 输出的日志，返回与 parse_tsar_log 相同结构的字典
+
+    采样时间戳为 epoch 微秒，归到最近的整秒；采样间隔小于1秒时同一秒内的样本取平均。
+    """
+    buckets = {}
+    fields = None
+
+    if not log_exists(log_file):
+        print(f"警告: proc_sampler日志文件不存在: {log_file}")
+        return {}
+
+    with open_log(log_file) as f:
+        for line in f:
+            if line.startswith('# fields:'):
+                fields = line.split(':', 1)[1].split()
+                continue
+            if not line.strip() or line.startswith('#') or fields is None:
+                continue
+
+            parts = line.split()
+            if len(parts) != len(fields):
+                continue
+            try:
+                values = [float(v) for v in parts]
+            except ValueError:
+                continue
+
+            sample = dict(zip(fields, values))
+            ts = datetime.fromtimestamp(sample.pop('ts_us') / 1000000.0)
+            ts = (ts + timedelta(microseconds=500000)).replace(microsecond=0)
+            buckets.setdefault(ts, []).append(sample)
+
+    monitor_data = {}
+    for ts, samples in buckets.items():
+        if len(samples) == 1:
+            monitor_data[ts] = samples[0]
+        else:
+            monitor_data[ts] = {key: sum(s[key] for s in samples) / len(samples) for key in samples[0]}
+    return monitor_data
+
+
+# (采集器名称, 结果目录中的日志文件名, 解析函数)
+MONITOR_COLLECTORS = [
+    ('tsar', 'tsar.log', parse_tsar_log),
+    ('proc_sampler', 'proc_sampler.log', parse_proc_sampler_log),
+]
+
+
+def load_monitor_data(result_dir):
+    """加载结果目录中的系统监控数据，返回 (数据字典, 采集器名称)"""
+    for name, filename, parser in MONITOR_COLLECTORS:
+        log_file = os.path.join(result_dir, filename)
+        if log_exists(log_file):
+            return parser(log_file), name
+
+    print(f"警告: 结果目录中没有系统监控数据 ({', '.join(c[1] for c in MONITOR_COLLECTORS)})")
+    return {}, None
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""多客户端压测: 多个 sysbench 进程/主机同时施压，按秒汇总为一份结果
+
+128 线程以上时单个 sysbench 客户端的 CPU 往往先到瓶颈，测到的峰值其实是客户端的峰值。
+这里把总线程数平均分给多个客户端 (本机进程或 ssh 主机)，各客户端在约定的时刻同时开始，
+每个客户端的输出单独保存为 <日志>_client<N>.log，再汇总为普通格式的 sysbench 日志:
+    - 每秒结果按墙上时钟的秒对齐 (以本机收到各客户端 "Threads started!" 的时刻为起点)，
+      tps/qps/读写/错误数相加；同一秒的延迟分位数无法精确合并，取各客户端中的最大值
+    - 汇总结果的查询数、事务数相加，平均延迟按事务数加权，95% 延迟由合并后的
+      --histogram 直方图计算
+汇总日志与时间文件的格式与单客户端相同，报告生成器无需区分。远程客户端需要与本机时钟同步 (NTP)。
+
+用法: python3 multi_client.py --clients "local local host2" --threads 128 \\
+          -o 结果目录/测试名.log -t 结果目录/测试名_time.log -- sysbench 场景 --mysql-host=... run
+"""
+import argparse
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+from rate_sweep import parse_histogram, histogram_percentile
+from sysbench_tee import MARKERS, timestamp_lines
+from time_align import parse_sysbench_intervals
+
+# 约定开始时刻距现在的秒数 (留给 ssh 建立连接)
+START_DELAY = 3
+SUMMARY_PATTERNS = {
+    'queries': r'queries:\s+(\d+)\s+\((\d+\.?\d*)\s+per sec\.\)',
+    'transactions': r'transactions:\s+(\d+)\s+\((\d+\.?\d*)\s+per sec\.\)',
+    'ignored_errors': r'ignored errors:\s+(\d+)\s+\((\d+\.?\d*)\s+per sec\.\)',
+    'reconnects': r'reconnects:\s+(\d+)\s+\((\d+\.?\d*)\s+per sec\.\)',
+}
+LATENCY_KEYS = ['min', 'avg', 'max', '95th percentile', 'sum']
+
+
+def split_threads(threads, clients):
+    """把总线程数平均分给各客户端，余数分给前面的客户端；线程数少于客户端数时只用部分客户端"""
+    count = min(threads, len(clients))
+    return [(clients[i], threads // count + (1 if i < threads % count else 0)) for i in range(count)]
+
+
+def client_command(client, command, threads, start_epoch):
+    """客户端执行的命令: 等到约定时刻再启动 sysbench"""
+    sysbench = ' '.join(shlex.quote(arg) for arg in command[:-1] + [f'--threads={threads}', command[-1]])
+    wait = (f"sleep $(awk -v s={start_epoch:.3f} -v n=$(date +%s.%N) "
+            f"'BEGIN {{ d = s - n; print (d > 0 ? d : 0) }}')")
+    script = f"{wait}; exec {sysbench} 2>&1"
+    if client == 'local':
+        return ['sh', '-c', script]
+    return ['ssh', client, script]
+
+
+class Client(threading.Thread):
+    """运行一个客户端并保存其输出，记录本机收到各标记行的时刻"""
+
+    def __init__(self, index, host, threads, command, log_file):
+        super().__init__()
+        self.index = index
+        self.host = host
+        self.threads = threads
+        self.command = command
+        self.log_file = log_file
+        self.marks = {}
+        self.returncode = None
+
+    def run(self):
+        with open(self.log_file, 'w') as log:
+            process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                       universal_newlines=True)
+            for line in process.stdout:
+                for marker, name in MARKERS:
+                    if name not in self.marks and line.startswith(marker):
+                        self.marks[name] = time.time() * 1000
+                log.write(line)
+            self.returncode = process.wait()
+
+
+def parse_summary(log_file):
+    """单个客户端的汇总结果: 计数与每秒速率、延迟统计、直方图"""
+    with open(log_file, 'r') as f:
+        content = f.read()
+    summary = {}
+    for key, pattern in SUMMARY_PATTERNS.items():
+        match = re.search(pattern, content)
+        summary[key] = (int(match.group(1)), float(match.group(2))) if match else (0, 0.0)
+    latency_block = content.split('Latency (ms):', 1)[1] if 'Latency (ms):' in content else ''
+    summary['latency'] = {}
+    for key in LATENCY_KEYS:
+        match = re.search(rf'{re.escape(key)}:\s+(\d+\.?\d*)', latency_block)
+        if match:
+            summary['latency'][key] = float(match.group(1))
+    summary['histogram'] = parse_histogram(content)
+    return summary
+
+
+def merge_intervals(clients):
+    """按墙上时钟的秒合并各客户端的每秒结果，只保留所有客户端都有数据的秒"""
+    base_ms = min(client.marks['THREADS_STARTED'] for client in clients)
+    by_second = {}
+    for client in clients:
+        offset_ms = client.marks['THREADS_STARTED'] - base_ms
+        for row in parse_sysbench_intervals(client.log_file):
+            sec = int(round((offset_ms + row['sec'] * 1000) / 1000.0))
+            by_second.setdefault(sec, []).append(row)
+
+    merged = []
+    for sec in sorted(by_second):
+        rows = by_second[sec]
+        if len(rows) < len(clients):
+            continue
+        merged.append({
+            'sec': sec,
+            'threads': sum(r['threads'] for r in rows),
+            'lat_percentile': rows[0]['lat_percentile'],
+            'latency': max(r['latency'] for r in rows),
+            **{key: sum(r[key] for r in rows)
+               for key in ('tps', 'qps', 'reads', 'writes', 'others', 'err', 'reconn')}
+        })
+    return merged
+
+
+def merge_histograms(histograms):
+    counts = {}
+    for histogram in histograms:
+        for value, count in histogram:
+            counts[value] = counts.get(value, 0) + count
+    return sorted(counts.items())
+
+
+def write_aggregate(out, clients, summaries):
+    """以 sysbench 的输出格式写出汇总结果"""
+    out.write(f"Aggregated from {len(clients)} clients: "
+              f"{', '.join(f'{c.host}({c.threads})' for c in clients)}\n\n")
+    out.write("Threads started!\n\n")
+    for row in merge_intervals(clients):
+        out.write(f"[ {row['sec']}s ] thds: {row['threads']} tps: {row['tps']:.2f} qps: {row['qps']:.2f} "
+                  f"(r/w/o: {row['reads']:.2f}/{row['writes']:.2f}/{row['others']:.2f}) "
+                  f"lat (ms,{row['lat_percentile']}%): {row['latency']:.2f} "
+                  f"err/s: {row['err']:.2f} reconn/s: {row['reconn']:.2f}\n")
+
+    histogram = merge_histograms(s['histogram'] for s in summaries)
+    if histogram:
+        out.write("Latency histogram (values are in milliseconds)\n")
+        out.write("       value  ------------- distribution ------------- count\n")
+        peak = max(count for _, count in histogram)
+        for value, count in histogram:
+            out.write(f"{value:12.3f} |{'*' * max(1, count * 40 // peak):<40} {count}\n")
+        out.write(" \n")
+
+    def total(key):
+        return sum(s[key][0] for s in summaries), sum(s[key][1] for s in summaries)
+
+    out.write("SQL statistics:\n")
+    for label, key in (('queries', 'queries'), ('transactions', 'transactions'),
+                       ('ignored errors', 'ignored_errors'), ('reconnects', 'reconnects')):
+        count, rate = total(key)
+        # 计数超过 6 位时也要留出空格，解析方都以 \s+\( 匹配速率
+        out.write(f"    {label + ':':<37}{count:<6} ({rate:.2f} per sec.)\n")
+
+    events = [s['transactions'][0] for s in summaries]
+    latencies = [s['latency'] for s in summaries]
+    p95 = histogram_percentile(histogram, 95) if histogram else None
+    if p95 is None:
+        p95 = max(l.get('95th percentile', 0) for l in latencies)
+    out.write("\nLatency (ms):\n")
+    out.write(f"         min: {min(l.get('min', 0) for l in latencies):>40.2f}\n")
+    avg = (sum(l.get('avg', 0) * n for l, n in zip(latencies, events)) / sum(events)) if sum(events) else 0
+    out.write(f"         avg: {avg:>40.2f}\n")
+    out.write(f"         max: {max(l.get('max', 0) for l in latencies):>40.2f}\n")
+    out.write(f"         95th percentile: {p95:>28.2f}\n")
+    out.write(f"         sum: {sum(l.get('sum', 0) for l in latencies):>40.2f}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多客户端同时压测并按秒汇总结果')
+    parser.add_argument('--clients', required=True, help='客户端列表，空格分隔，local 表示本机进程，其他为 ssh 主机')
+    parser.add_argument('--threads', type=int, required=True, help='总线程数，平均分给各客户端')
+    parser.add_argument('--start-delay', type=float, default=START_DELAY, help='约定开始时刻距现在的秒数')
+    parser.add_argument('-o', '--output', required=True, help='汇总后的 sysbench 日志')
+    parser.add_argument('-t', '--time-file', required=True, help='时间文件 (追加)')
+    parser.add_argument('command', nargs=argparse.REMAINDER, help='-- sysbench ... run (不含 --threads)')
+    args = parser.parse_args()
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if not command:
+        parser.error('缺少 sysbench 命令')
+
+    base = args.output[:-4] if args.output.endswith('.log') else args.output
+    start_epoch = time.time() + args.start_delay
+    clients = []
+    for index, (host, threads) in enumerate(split_threads(args.threads, args.clients.split()), 1):
+        clients.append(Client(index, host, threads, client_command(host, command, threads, start_epoch),
+                              f"{base}_client{index}.log"))
+
+    with open(args.time_file, 'a') as times:
+        times.write(timestamp_lines('TEST_START'))
+        mono_offset = time.monotonic() * 1000 - time.time() * 1000
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+
+        failed = [c for c in clients if c.returncode != 0 or 'STATS_PRINTED' not in c.marks]
+        for client in clients:
+            print(f"客户端{client.index} {client.host} ({client.threads}线程): "
+                  f"{'失败 (退出码 %s)' % client.returncode if client in failed else '完成'}")
+        if failed:
+            sys.exit(1)
+
+        # 汇总结果的负载起止取最早开始与最晚结束的客户端 (换算到本机单调时钟)
+        for name, pick in (('THREADS_STARTED', min), ('STATS_PRINTED', max)):
+            epoch_ms = pick(c.marks[name] for c in clients)
+            times.write(f"{name}_EPOCH_MS: {int(epoch_ms)}\n{name}_MONO_MS: {int(epoch_ms + mono_offset)}\n")
+        times.write(f"CLIENTS: {len(clients)}\n")
+        times.write(timestamp_lines('TEST_END'))
+
+    summaries = [parse_summary(c.log_file) for c in clients]
+    with open(args.output, 'w') as out:
+        write_aggregate(out, clients, summaries)
+    with open(args.output, 'r') as f:
+        sys.stdout.write(f.read())
+
+
+if __name__ == "__main__":
+    main()
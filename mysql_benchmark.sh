@@ -22,13 +22,278 @@ load_config() {
         NEED_PREPARE="true"
         SCENARIOS="oltp_point_select oltp_read_only oltp_read_write oltp_write_only"
         THREADS="1 128"
+        MONITOR_TYPE="tsar"
+        COLLECT_MYSQL_STATUS="true"
+        COLLECT_PERF_SCHEMA="true"
     fi
+    
+    # 系统监控方式: tsar (服务器上已运行的tsar) 或 proc (内置 /proc 采样器)
+    MONITOR_TYPE="${MONITOR_TYPE:-tsar}"
+    PROC_SAMPLER_INTERVAL="${PROC_SAMPLER_INTERVAL:-1}"
+    PROC_SAMPLER_DISKS="${PROC_SAMPLER_DISKS:-}"
+    COLLECT_MYSQL_STATUS="${COLLECT_MYSQL_STATUS:-true}"
+    # 每个测试前后的 performance_schema 等待事件/语句摘要快照，及是否打开全部 wait/% 仪表
+    COLLECT_PERF_SCHEMA="${COLLECT_PERF_SCHEMA:-true}"
+    PERF_SCHEMA_ENABLE_WAITS="${PERF_SCHEMA_ENABLE_WAITS:-false}"
+    
+    # 并行准备数据的线程数 (sysbench 按表分配给各线程，超过表数量没有意义)
+    PREPARE_THREADS="${PREPARE_THREADS:-$TABLES}"
+    # 数据集清单: 准备数据后记录，复用数据前校验
+    DATASET_MANIFEST="${DATASET_MANIFEST:-dataset_manifest_${MYSQL_HOST}_${MYSQL_PORT}_${MYSQL_DB}.json}"
+    # 正式测试前的缓冲池预热: scan / bp_load / none
+    WARMUP_MODE="${WARMUP_MODE:-scan}"
+    WARMUP_MAX_TIME="${WARMUP_MAX_TIME:-600}"
+    # 单个测试失败后的最大重试次数
+    MAX_CELL_RETRIES="${MAX_CELL_RETRIES:-2}"
+    # 测试之间的冷却: adaptive (等待服务器安静) 或 fixed (固定 sleep 2)
+    COOLDOWN_MODE="${COOLDOWN_MODE:-adaptive}"
+    COOLDOWN_MAX_TIME="${COOLDOWN_MAX_TIME:-120}"
+    COOLDOWN_DIRTY_PCT="${COOLDOWN_DIRTY_PCT:-1}"
+    COOLDOWN_HISTORY="${COOLDOWN_HISTORY:-1000}"
+    COOLDOWN_IO_UTIL="${COOLDOWN_IO_UTIL:-10}"
+    # 开环固定速率扫描 (sysbench --rate)，在闭环矩阵之后执行
+    RATE_SWEEP="${RATE_SWEEP:-false}"
+    RATE_SWEEP_SCENARIOS="${RATE_SWEEP_SCENARIOS:-oltp_point_select}"
+    RATE_SWEEP_THREADS="${RATE_SWEEP_THREADS:-128}"
+    RATE_SWEEP_STEPS="${RATE_SWEEP_STEPS:-10 25 50 75 90 100 110}"
+    RATE_SWEEP_PEAK="${RATE_SWEEP_PEAK:-0}"
+    # 多客户端压测: 空表示单个本机 sysbench；"local local" 为两个本机进程，其余为 ssh 主机
+    CLIENT_HOSTS="${CLIENT_HOSTS:-}"
+    # 在压测客户端本机采集CPU/软中断/网卡与 sysbench 进程CPU，用于识别客户端瓶颈
+    CLIENT_MONITOR="${CLIENT_MONITOR:-true}"
+    # 每个场景最高并发数测试的 mysqld On-CPU 火焰图 (服务器需要 perf)，在运行中段采样
+    FLAME_GRAPH="${FLAME_GRAPH:-false}"
+    FLAME_GRAPH_FREQ="${FLAME_GRAPH_FREQ:-99}"
+    FLAME_GRAPH_DURATION="${FLAME_GRAPH_DURATION:-30}"
+    FLAME_GRAPH_CALL_GRAPH="${FLAME_GRAPH_CALL_GRAPH:-fp}"
+    ARCHIVE_RESULTS="${ARCHIVE_RESULTS:-none}"
+}
+
+# 数据集清单的记录/校验 (action: create 或 verify)
+dataset_manifest() {
+    local action="$1"
+    shift
+    if ! command -v python3 >/dev/null 2>&1; then
+        echo "未安装python3，跳过数据集清单 ($action)"
+        return 0
+    fi
+    MYSQL_PWD="$MYSQL_PASSWORD" python3 dataset_manifest.py "$action" \
+      -H $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER -D $MYSQL_DB \
+      --tables $TABLES --table-size $TABLE_SIZE "$@"
+}
+
+# 场景定义: 场景ID 对应的 sysbench 脚本 (内置脚本名或 .lua 路径) 与额外参数，
+# 由配置中的 SCENARIO_<ID>_SCRIPT / SCENARIO_<ID>_OPTS 指定，未定义时脚本即为场景ID
+scenario_script() {
+    local var="SCENARIO_${1}_SCRIPT"
+    echo "${!var:-$1}"
+}
+
+scenario_opts() {
+    local var="SCENARIO_${1}_OPTS"
+    echo "${!var:-}"
+}
+
+# 把场景定义写入测试的时间文件 (参数清单)，Lua 脚本同时记录 md5
+scenario_manifest() {
+    local scenario="$1"
+    local script
+    script=$(scenario_script $scenario)
+    echo "SCENARIO_ID: $scenario"
+    echo "SCENARIO_SCRIPT: $script"
+    echo "SCENARIO_OPTS: $(scenario_opts $scenario)"
+    if [ -f "$script" ]; then
+        echo "SCENARIO_SCRIPT_MD5: $(md5sum "$script" | awk '{print $1}')"
+    fi
+}
+
+# 一个场景的 sysbench 公共参数 (不含 --threads 与 run)，结果放在 SYSBENCH_ARGS 数组中
+sysbench_args() {
+    local scenario="$1"
+    SYSBENCH_ARGS=($(scenario_script $scenario)
+      --mysql-host=$MYSQL_HOST
+      --mysql-port=$MYSQL_PORT
+      --mysql-user=$MYSQL_USER
+      "--mysql-password=$MYSQL_PASSWORD"
+      --mysql-db=$MYSQL_DB
+      --tables=$TABLES
+      --table-size=$TABLE_SIZE
+      --report-interval=1
+      --time=$TEST_TIME
+      $(scenario_opts $scenario))
+}
+
+# 带时间戳的tee: 额外记录毫秒级起止时间及 "Threads started!"/"SQL statistics:" 的时刻
+timed_tee() {
+    local log_file="$1"
+    local time_file="$2"
+    if command -v python3 >/dev/null 2>&1; then
+        python3 sysbench_tee.py "$log_file" "$time_file"
+    else
+        tee "$log_file"
+    fi
+}
+
+# 开始测试前等待服务器安静 (脏页、undo历史链表、磁盘IO)，等待时长记录在 cooldown.log
+cooldown() {
+    local test_name="$1"
+    if [ "$COOLDOWN_MODE" != "adaptive" ] || ! command -v python3 >/dev/null 2>&1; then
+        sleep 2  # 间隔休息
+        return 0
+    fi
+    MYSQL_PWD="$MYSQL_PASSWORD" python3 cooldown.py \
+      -H $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER --label "$test_name" \
+      --diskstats-cmd "ssh root@$MYSQL_HOST cat /proc/diskstats" --disks "$PROC_SAMPLER_DISKS" \
+      --dirty-pct $COOLDOWN_DIRTY_PCT --history $COOLDOWN_HISTORY --io-util $COOLDOWN_IO_UTIL \
+      --max-time $COOLDOWN_MAX_TIME -o "$RESULT_DIR/cooldown.log" 2>&1 | tee -a "$RESULT_DIR/benchmark.log"
+}
+
+# 检查点: 已完成的测试记为 "DONE 场景 并发数"，失败的尝试记为 "FAILED 场景 并发数 第N次"
+cell_done() {
+    grep -qx "DONE $1 $2" "$CHECKPOINT_FILE" 2>/dev/null
+}
+
+cell_failures() {
+    grep -c "^FAILED $1 $2 " "$CHECKPOINT_FILE" 2>/dev/null || true
+}
+
+# performance_schema 快照 (begin/end/setup)，失败只记录警告，不影响测试
+perf_schema_snapshot() {
+    MYSQL_PWD="$MYSQL_PASSWORD" python3 perf_schema.py "$@" \
+      -H $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER 2>&1 | tee -a "$RESULT_DIR/benchmark.log" || true
+}
+
+# 在运行中段对 mysqld 执行 perf record，perf script 的输出压缩后传回，在本机折叠为调用栈计数
+capture_flame_graph() {
+    local output="$1"
+    local test_name="$2"
+    local duration=$FLAME_GRAPH_DURATION
+    if [ $((duration * 2)) -gt "$TEST_TIME" ]; then
+        duration=$((TEST_TIME / 2))
+    fi
+    if [ "$duration" -lt 1 ]; then
+        duration=1
+    fi
+    # 中段的延迟从负载开始 ("Threads started!") 算起，不含 sysbench 连接与多客户端约定开始的等待:
+    # 单客户端由 sysbench_tee.py 即时写入时间文件，多客户端看各客户端的日志；最多等待 120 秒
+    local polls=0
+    until grep -qs "^THREADS_STARTED_EPOCH_MS:" "$RESULT_DIR/${test_name}_time.log" || \
+          grep -qs "^Threads started!" "$RESULT_DIR/${test_name}"_client*.log; do
+        if [ $polls -ge 240 ]; then
+            echo "未等到负载开始，跳过火焰图: $test_name" >> "$RESULT_DIR/benchmark.log"
+            return 1
+        fi
+        sleep 0.5
+        polls=$((polls + 1))
+    done
+    sleep $(( (TEST_TIME - duration) / 2 ))
+    ssh root@$MYSQL_HOST "perf record -F $FLAME_GRAPH_FREQ --call-graph $FLAME_GRAPH_CALL_GRAPH -p \$(pidof -s mysqld) -o /tmp/mysqld_perf.data -- sleep $duration >/dev/null 2>&1 && perf script -i /tmp/mysqld_perf.data 2>/dev/null | gzip -1; rm -f /tmp/mysqld_perf.data" < /dev/null \
+      | gunzip 2>/dev/null | python3 flame_graph.py collapse -o "$output" >> "$RESULT_DIR/benchmark.log" 2>&1
+}
+
+# 执行一个测试 (场景 × 并发数)，sysbench 失败或没有输出统计结果时返回非0
+run_cell() {
+    local scenario="$1"
+    local thread="$2"
+    local test_name="${scenario}_${thread}threads"
+    
+    # 后台按秒采集 SHOW GLOBAL STATUS 增量 (一条持久连接)
+    local status_pid=""
+    if [ "$COLLECT_MYSQL_STATUS" = "true" ] && command -v python3 >/dev/null 2>&1; then
+        MYSQL_PWD="$MYSQL_PASSWORD" python3 mysql_status_collector.py \
+          -H $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER \
+          -o "$RESULT_DIR/${test_name}_mysql_status.log" &
+        status_pid=$!
+    fi
+    local perf_schema_enabled=""
+    if [ "$COLLECT_PERF_SCHEMA" = "true" ] && command -v python3 >/dev/null 2>&1; then
+        perf_schema_enabled="true"
+        perf_schema_snapshot begin -o "$RESULT_DIR/${test_name}_perf_schema.json"
+    fi
+    
+    # 记录测试开始时间
+    TEST_START_TIME=$(date '+%Y-%m-%d %H:%M:%S')
+    echo "测试开始时间: $TEST_START_TIME" | tee -a "$RESULT_DIR/benchmark.log"
+    echo "TEST_START_TIME: $TEST_START_TIME" > "$RESULT_DIR/${test_name}_time.log"
+    scenario_manifest $scenario >> "$RESULT_DIR/${test_name}_time.log"
+    
+    # 最高并发数的测试在后台采集火焰图
+    local flame_pid=""
+    if [ "$FLAME_GRAPH" = "true" ] && [ "$thread" = "$PEAK_THREAD" ] && command -v python3 >/dev/null 2>&1; then
+        echo "采集 mysqld 火焰图: -F $FLAME_GRAPH_FREQ，运行中段最多 ${FLAME_GRAPH_DURATION}s" | tee -a "$RESULT_DIR/benchmark.log"
+        # 清除上一次尝试留下的客户端日志，避免把旧的 "Threads started!" 当作本次负载开始
+        rm -f "$RESULT_DIR/${test_name}"_client*.log
+        capture_flame_graph "$RESULT_DIR/${test_name}_cpu_stacks.txt" "$test_name" &
+        flame_pid=$!
+    fi
+    
+    # 执行压测 (场景参数不加引号，按空格拆分为多个选项)
+    sysbench_args $scenario
+    local sysbench_status=0
+    if [ -n "$CLIENT_HOSTS" ]; then
+        # 多个客户端在约定时刻同时开始，线程数平均分配，结果按秒汇总为同样格式的日志
+        python3 multi_client.py --clients "$CLIENT_HOSTS" --threads $thread \
+          -o "$RESULT_DIR/${test_name}.log" -t "$RESULT_DIR/${test_name}_time.log" \
+          -- sysbench "${SYSBENCH_ARGS[@]}" --histogram=on run || sysbench_status=$?
+    else
+        sysbench "${SYSBENCH_ARGS[@]}" --threads=$thread run 2>&1 | \
+          timed_tee "$RESULT_DIR/${test_name}.log" "$RESULT_DIR/${test_name}_time.log"
+        sysbench_status=${PIPESTATUS[0]}
+    fi
+    
+    # 记录测试结束时间
+    TEST_END_TIME=$(date '+%Y-%m-%d %H:%M:%S')
+    echo "测试结束时间: $TEST_END_TIME" | tee -a "$RESULT_DIR/benchmark.log"
+    echo "TEST_END_TIME: $TEST_END_TIME" >> "$RESULT_DIR/${test_name}_time.log"
+    if [ -n "$flame_pid" ]; then
+        wait $flame_pid 2>/dev/null || echo "警告: 火焰图采集失败: $test_name" | tee -a "$RESULT_DIR/benchmark.log"
+    fi
+    if [ -n "$perf_schema_enabled" ]; then
+        perf_schema_snapshot end -o "$RESULT_DIR/${test_name}_perf_schema.json"
+    fi
+    
+    # 停止MySQL状态采集
+    if [ -n "$status_pid" ]; then
+        kill $status_pid 2>/dev/null || true
+        wait $status_pid 2>/dev/null || true
+    fi
+    
+    if [ "$sysbench_status" -ne 0 ] || ! grep -q "^SQL statistics:" "$RESULT_DIR/${test_name}.log"; then
+        echo "sysbench失败 (退出码 $sysbench_status): $test_name" | tee -a "$RESULT_DIR/benchmark.log"
+        return 1
+    fi
+    return 0
+}
+
+# 以固定到达速率执行一步扫描，--histogram 输出用于计算 p50/p95/p99/p99.9
+run_rate_step() {
+    local scenario="$1"
+    local percent="$2"
+    local rate="$3"
+    local step_name="rate_${scenario}_${percent}pct"
+    
+    echo "TARGET_RATE: $rate" > "$RESULT_DIR/${step_name}_time.log"
+    echo "TEST_START_TIME: $(date '+%Y-%m-%d %H:%M:%S')" >> "$RESULT_DIR/${step_name}_time.log"
+    scenario_manifest $scenario >> "$RESULT_DIR/${step_name}_time.log"
+    sysbench_args $scenario
+    sysbench "${SYSBENCH_ARGS[@]}" \
+      --threads=$RATE_SWEEP_THREADS \
+      --rate=$rate \
+      --histogram=on \
+      --percentile=99 \
+      run 2>&1 | timed_tee "$RESULT_DIR/${step_name}.log" "$RESULT_DIR/${step_name}_time.log"
+    local sysbench_status=${PIPESTATUS[0]}
+    echo "TEST_END_TIME: $(date '+%Y-%m-%d %H:%M:%S')" >> "$RESULT_DIR/${step_name}_time.log"
+    
+    [ "$sysbench_status" -eq 0 ] && grep -q "^SQL statistics:" "$RESULT_DIR/${step_name}.log"
 }
 
 # 解析参数
 CONFIG_FILE="${1:-benchmark_config.conf}"
 OVERRIDE_TEST_TIME="$2"
 OVERRIDE_NEED_PREPARE="$3"
+# 第4个参数为已有结果目录时续跑: 跳过已完成的测试，重试失败的测试
+RESUME_DIR="${4:-$RESUME_DIR}"
 
 # 加载配置
 load_config "$CONFIG_FILE"
@@ -45,12 +310,40 @@ fi
 # 转换为数组
 SCENARIOS_ARRAY=($SCENARIOS)
 THREADS_ARRAY=($THREADS)
+PEAK_THREAD=$(printf '%s\n' "${THREADS_ARRAY[@]}" | sort -n | tail -1)
+
+# 校验场景定义: 场景ID用于结果文件名与配置变量名，自定义 Lua 脚本必须存在
+for scenario in "${SCENARIOS_ARRAY[@]}" $RATE_SWEEP_SCENARIOS; do
+    if ! [[ "$scenario" =~ ^[A-Za-z][A-Za-z0-9_]*$ ]] || [[ "$scenario" == rate_* ]]; then
+        echo "无效的场景ID: $scenario (只能包含字母、数字和下划线，且不能以 rate_ 开头)"
+        exit 1
+    fi
+    script=$(scenario_script $scenario)
+    if [[ "$script" == *.lua ]] && [ ! -f "$script" ]; then
+        echo "场景 $scenario 的脚本不存在: $script"
+        exit 1
+    fi
+done
 
 # 结果目录
-RESULT_DIR="mysql_benchmark_$(date +%Y%m%d_%H%M%S)"
-mkdir -p "$RESULT_DIR"
+if [ -n "$RESUME_DIR" ]; then
+    if [ ! -d "$RESUME_DIR" ]; then
+        echo "续跑目录不存在: $RESUME_DIR"
+        exit 1
+    fi
+    RESULT_DIR="$RESUME_DIR"
+    # 续跑时数据集已经准备好，绝不能重建
+    NEED_PREPARE="false"
+    echo "=== MySQL 性能压测续跑 ===" | tee -a "$RESULT_DIR/benchmark.log"
+else
+    # 变量扫描 (variable_sweep.sh) 通过环境变量 RESULT_DIR 指定每组设置的结果目录
+    RESULT_DIR="${RESULT_DIR:-mysql_benchmark_$(date +%Y%m%d_%H%M%S)}"
+    mkdir -p "$RESULT_DIR"
+    echo "=== MySQL 性能压测开始 ===" | tee "$RESULT_DIR/benchmark.log"
+fi
+CHECKPOINT_FILE="$RESULT_DIR/checkpoint.log"
+touch "$CHECKPOINT_FILE"
 
-echo "=== MySQL 性能压测开始 ===" | tee "$RESULT_DIR/benchmark.log"
 echo "时间: $(date)" | tee -a "$RESULT_DIR/benchmark.log"
 echo "目标服务器: $MYSQL_HOST:$MYSQL_PORT" | tee -a "$RESULT_DIR/benchmark.log"
 echo "数据准备模式: $NEED_PREPARE" | tee -a "$RESULT_DIR/benchmark.log"
@@ -60,22 +353,52 @@ echo "表大小: ${TABLE_SIZE}行" | tee -a "$RESULT_DIR/benchmark.log"
 # 获取MySQL服务器配置
 echo "=== MySQL服务器配置 ===" | tee -a "$RESULT_DIR/benchmark.log"
 echo "=== CPU 信息 ===" > "$RESULT_DIR/server_config.txt"
-ssh root@$MYSQL_HOST "lscpu" >> "$RESULT_DIR/server_config.txt"
+ssh root@$MYSQL_HOST "lscpu" >> "$RESULT_DIR/server_config.txt" || echo "警告: 无法获取CPU信息" | tee -a "$RESULT_DIR/benchmark.log"
 echo >> "$RESULT_DIR/server_config.txt"
 echo "=== 内存信息 ===" >> "$RESULT_DIR/server_config.txt"
-ssh root@$MYSQL_HOST "free -h" >> "$RESULT_DIR/server_config.txt"
+ssh root@$MYSQL_HOST "free -h" >> "$RESULT_DIR/server_config.txt" || echo "警告: 无法获取内存信息" | tee -a "$RESULT_DIR/benchmark.log"
+
+# 系统设置快照 ("键 = 值"): 内核版本、sysctl、CPU调频策略、透明大页、IO调度器，用于跨环境比较配置差异
+ssh root@$MYSQL_HOST 'bash -s' > "$RESULT_DIR/system_config.txt" <<'EOF' || echo "警告: 无法获取系统设置" | tee -a "$RESULT_DIR/benchmark.log"
+echo "kernel.release = $(uname -r)"
+sysctl -a 2>/dev/null
+for f in enabled defrag; do
+    echo "thp.$f = $(cat /sys/kernel/mm/transparent_hugepage/$f 2>/dev/null)"
+done
+echo "cpu.governor = $(cat /sys/devices/system/cpu/cpu*/cpufreq/scaling_governor 2>/dev/null | sort -u | tr '\n' ' ')"
+for d in /sys/block/*; do
+    case "${d##*/}" in loop*|ram*|zram*) continue ;; esac
+    if [ -f "$d/queue/scheduler" ]; then
+        echo "block.${d##*/}.scheduler = $(cat $d/queue/scheduler)"
+    fi
+done
+EOF
 
 # 测试 MySQL 连接
 echo "=== 测试 MySQL 连接 ===" | tee -a "$RESULT_DIR/benchmark.log"
 mysql -h $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER -p"$MYSQL_PASSWORD" -e "SELECT VERSION();" > "$RESULT_DIR/mysql_version.txt" 2>&1
 
-# 检查tsar是否在运行（不启动新的tsar）
-echo "=== 检查tsar监控状态 ===" | tee -a "$RESULT_DIR/benchmark.log"
-ssh root@$MYSQL_HOST "ps aux | grep tsar | grep -v grep || echo 'tsar未运行'" | tee -a "$RESULT_DIR/benchmark.log"
+if [ "$MONITOR_TYPE" = "proc" ]; then
+    # 启动内置 /proc 采样器
+    echo "=== 启动proc_sampler监控 ===" | tee -a "$RESULT_DIR/benchmark.log"
+    scp proc_sampler.py root@$MYSQL_HOST:/tmp/proc_sampler.py
+    # 续跑时保留已有的采样数据，新的采样追加在后面
+    PROC_SAMPLER_RESET="rm -f /tmp/proc_sampler.log;"
+    if [ -n "$RESUME_DIR" ]; then
+        PROC_SAMPLER_RESET=""
+    fi
+    ssh root@$MYSQL_HOST "kill \$(cat /tmp/proc_sampler.pid 2>/dev/null) 2>/dev/null; $PROC_SAMPLER_RESET nohup python3 /tmp/proc_sampler.py -i $PROC_SAMPLER_INTERVAL -d '$PROC_SAMPLER_DISKS' -o /tmp/proc_sampler.log >/dev/null 2>&1 & echo \$! > /tmp/proc_sampler.pid"
+else
+    # 检查tsar是否在运行（不启动新的tsar）
+    echo "=== 检查tsar监控状态 ===" | tee -a "$RESULT_DIR/benchmark.log"
+    ssh root@$MYSQL_HOST "ps aux | grep tsar | grep -v grep || echo 'tsar未运行'" | tee -a "$RESULT_DIR/benchmark.log"
+fi
 
 # 获取MySQL配置参数
 echo "=== 获取MySQL配置参数 ===" | tee -a "$RESULT_DIR/benchmark.log"
 mysql -h $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER -p"$MYSQL_PASSWORD" -e "SHOW VARIABLES WHERE Variable_name IN ('innodb_buffer_pool_size', 'innodb_flush_log_at_trx_commit');" > "$RESULT_DIR/mysql_variables.txt" 2>&1
+# 完整的全局变量，合并报告据此列出各环境不同的设置
+mysql -h $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER -p"$MYSQL_PASSWORD" -N -B -e "SHOW GLOBAL VARIABLES;" > "$RESULT_DIR/mysql_global_variables.txt" 2>/dev/null || echo "警告: 无法获取MySQL全局变量" | tee -a "$RESULT_DIR/benchmark.log"
 
 # 记录测试配置信息
 echo "=== 测试配置信息 ===" > "$RESULT_DIR/test_config.txt"
@@ -84,6 +407,27 @@ echo "MYSQL_PORT: $MYSQL_PORT" >> "$RESULT_DIR/test_config.txt"
 echo "TABLES: $TABLES" >> "$RESULT_DIR/test_config.txt"
 echo "TABLE_SIZE: $TABLE_SIZE" >> "$RESULT_DIR/test_config.txt"
 echo "TEST_TIME: $TEST_TIME" >> "$RESULT_DIR/test_config.txt"
+echo "CLIENT_HOSTS: ${CLIENT_HOSTS:-local (单客户端)}" >> "$RESULT_DIR/test_config.txt"
+if [ -n "$VARIABLE_SETTINGS" ]; then
+    echo "VARIABLE_SETTINGS: $VARIABLE_SETTINGS" >> "$RESULT_DIR/test_config.txt"
+fi
+# 结果有效性检查的阈值覆盖，由报告生成器读取
+for var in $(compgen -v VALIDITY_); do
+    echo "$var: ${!var}" >> "$RESULT_DIR/test_config.txt"
+done
+# 火焰图的采集设置，报告中火焰图的采样频率与时长以此为准
+for var in $(compgen -v FLAME_GRAPH); do
+    echo "$var: ${!var}" >> "$RESULT_DIR/test_config.txt"
+done
+for scenario in "${SCENARIOS_ARRAY[@]}"; do
+    echo "SCENARIO: $scenario $(scenario_script $scenario) $(scenario_opts $scenario)" >> "$RESULT_DIR/test_config.txt"
+    # 自定义 Lua 脚本随结果一起保存，便于复现
+    script=$(scenario_script $scenario)
+    if [ -f "$script" ]; then
+        mkdir -p "$RESULT_DIR/scenario_scripts"
+        cp "$script" "$RESULT_DIR/scenario_scripts/"
+    fi
+done
 
 # 数据库准备
 if [ "$NEED_PREPARE" = "true" ]; then
@@ -92,8 +436,10 @@ if [ "$NEED_PREPARE" = "true" ]; then
     mysql -h $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER -p"$MYSQL_PASSWORD" -e "CREATE DATABASE $MYSQL_DB;" 2>&1 | tee -a "$RESULT_DIR/benchmark.log"
     
     echo "=== 准备测试数据 ===" | tee -a "$RESULT_DIR/benchmark.log"
-    echo "准备测试数据（${TABLES}表×${TABLE_SIZE}行）..." | tee -a "$RESULT_DIR/benchmark.log"
+    echo "准备测试数据（${TABLES}表×${TABLE_SIZE}行，${PREPARE_THREADS}线程并行）..." | tee -a "$RESULT_DIR/benchmark.log"
+    PREPARE_START=$(date +%s)
     sysbench oltp_common \
+      --threads=$PREPARE_THREADS \
       --mysql-host=$MYSQL_HOST \
       --mysql-port=$MYSQL_PORT \
       --mysql-user=$MYSQL_USER \
@@ -102,51 +448,134 @@ if [ "$NEED_PREPARE" = "true" ]; then
       --tables=$TABLES \
       --table-size=$TABLE_SIZE \
       prepare 2>&1 | tee "$RESULT_DIR/prepare.log"
+    PREPARE_SECONDS=$(( $(date +%s) - PREPARE_START ))
+    echo "数据准备耗时: ${PREPARE_SECONDS}秒" | tee -a "$RESULT_DIR/benchmark.log"
+    
+    echo "=== 记录数据集清单 ===" | tee -a "$RESULT_DIR/benchmark.log"
+    dataset_manifest create -o "$DATASET_MANIFEST" --prepare-seconds $PREPARE_SECONDS 2>&1 | tee -a "$RESULT_DIR/benchmark.log"
 else
     echo "=== 使用现有数据库 ===" | tee -a "$RESULT_DIR/benchmark.log"
     mysql -h $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER -p"$MYSQL_PASSWORD" -e "CREATE DATABASE IF NOT EXISTS $MYSQL_DB;" 2>&1 | tee -a "$RESULT_DIR/benchmark.log"
+    
+    # 校验已有数据集，避免在被截断或过期的数据上压测
+    echo "=== 校验数据集 ===" | tee -a "$RESULT_DIR/benchmark.log"
+    if ! dataset_manifest verify -m "$DATASET_MANIFEST" > "$RESULT_DIR/dataset_verify.log" 2>&1; then
+        cat "$RESULT_DIR/dataset_verify.log" | tee -a "$RESULT_DIR/benchmark.log"
+        echo "数据集与配置不符，请设置 NEED_PREPARE=true 重新准备数据" | tee -a "$RESULT_DIR/benchmark.log"
+        exit 1
+    fi
+    cat "$RESULT_DIR/dataset_verify.log" | tee -a "$RESULT_DIR/benchmark.log"
+fi
+
+# 打开 mutex/rwlock 等同步等待的仪表 (在全局变量快照之后，直到 MySQL 重启前有效)
+if [ "$COLLECT_PERF_SCHEMA" = "true" ] && [ "$PERF_SCHEMA_ENABLE_WAITS" = "true" ] && command -v python3 >/dev/null 2>&1; then
+    echo "=== 启用 performance_schema 等待事件仪表 ===" | tee -a "$RESULT_DIR/benchmark.log"
+    perf_schema_snapshot setup
+fi
+
+if [ -f "$DATASET_MANIFEST" ]; then
+    cp "$DATASET_MANIFEST" "$RESULT_DIR/dataset_manifest.json"
+fi
+
+# 缓冲池预热，避免第一个测试跑在冷缓存上
+if [ "$WARMUP_MODE" != "none" ] && command -v python3 >/dev/null 2>&1; then
+    echo "=== 缓冲池预热 ($WARMUP_MODE) ===" | tee -a "$RESULT_DIR/benchmark.log"
+    MYSQL_PWD="$MYSQL_PASSWORD" python3 warmup.py \
+      -H $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER -D $MYSQL_DB \
+      --tables $TABLES --mode $WARMUP_MODE --threads $PREPARE_THREADS --max-time $WARMUP_MAX_TIME \
+      -o "$RESULT_DIR/warmup.log" 2>&1 | tee -a "$RESULT_DIR/benchmark.log"
+    sleep 10  # 预热负载与第一个测试之间留出空闲，便于估计时钟偏差
 fi
 
-# 执行完整压测
+# 客户端本机资源采样 (续跑时追加到已有的 client_sampler.log)
+CLIENT_SAMPLER_PID=""
+if [ "$CLIENT_MONITOR" = "true" ] && command -v python3 >/dev/null 2>&1; then
+    echo "=== 启动压测客户端资源采样 ===" | tee -a "$RESULT_DIR/benchmark.log"
+    python3 proc_sampler.py -i 1 --procs sysbench -o "$RESULT_DIR/client_sampler.log" >/dev/null 2>&1 &
+    CLIENT_SAMPLER_PID=$!
+fi
+
+# 执行完整压测 (每个测试完成后写入检查点，失败的测试重试 MAX_CELL_RETRIES 次后跳过)
+FAILED_CELLS=""
 for scenario in "${SCENARIOS_ARRAY[@]}"; do
     echo "=== 压测场景: $scenario ===" | tee -a "$RESULT_DIR/benchmark.log"
     
     for thread in "${THREADS_ARRAY[@]}"; do
         test_name="${scenario}_${thread}threads"
+        if cell_done $scenario $thread; then
+            echo "--- 并发数: $thread (已完成，跳过) ---" | tee -a "$RESULT_DIR/benchmark.log"
+            continue
+        fi
         echo "--- 并发数: $thread ---" | tee -a "$RESULT_DIR/benchmark.log"
         
-        # 记录测试开始时间
-        TEST_START_TIME=$(date '+%Y-%m-%d %H:%M:%S')
-        echo "测试开始时间: $TEST_START_TIME" | tee -a "$RESULT_DIR/benchmark.log"
-        echo "TEST_START_TIME: $TEST_START_TIME" > "$RESULT_DIR/${test_name}_time.log"
-        
-        # 执行压测
-        sysbench $scenario \
-          --threads=$thread \
-          --mysql-host=$MYSQL_HOST \
-          --mysql-port=$MYSQL_PORT \
-          --mysql-user=$MYSQL_USER \
-          --mysql-password="$MYSQL_PASSWORD" \
-          --mysql-db=$MYSQL_DB \
-          --tables=$TABLES \
-          --table-size=$TABLE_SIZE \
-          --report-interval=1 \
-          --time=$TEST_TIME \
-          run 2>&1 | tee "$RESULT_DIR/${test_name}.log"
-        
-        # 记录测试结束时间
-        TEST_END_TIME=$(date '+%Y-%m-%d %H:%M:%S')
-        echo "测试结束时间: $TEST_END_TIME" | tee -a "$RESULT_DIR/benchmark.log"
-        echo "TEST_END_TIME: $TEST_END_TIME" >> "$RESULT_DIR/${test_name}_time.log"
-        
-        echo "完成: $test_name" | tee -a "$RESULT_DIR/benchmark.log"
-        sleep 2  # 间隔休息
+        attempt=$(cell_failures $scenario $thread)
+        while true; do
+            cooldown $test_name
+            if run_cell $scenario $thread; then
+                echo "DONE $scenario $thread" >> "$CHECKPOINT_FILE"
+                echo "完成: $test_name" | tee -a "$RESULT_DIR/benchmark.log"
+                break
+            fi
+            
+            # 保留失败尝试的输出，便于排查
+            attempt=$((attempt + 1))
+            echo "FAILED $scenario $thread $attempt" >> "$CHECKPOINT_FILE"
+            mv "$RESULT_DIR/${test_name}.log" "$RESULT_DIR/${test_name}_attempt${attempt}.log" 2>/dev/null || true
+            for client_log in "$RESULT_DIR/${test_name}"_client*.log; do
+                if [ -f "$client_log" ]; then
+                    mv "$client_log" "${client_log/_client/_attempt${attempt}_client}"
+                fi
+            done
+            if [ "$attempt" -gt "$MAX_CELL_RETRIES" ]; then
+                echo "放弃: $test_name (已失败 $attempt 次)" | tee -a "$RESULT_DIR/benchmark.log"
+                FAILED_CELLS="$FAILED_CELLS $test_name"
+                break
+            fi
+            echo "重试: $test_name (第 $attempt 次失败)" | tee -a "$RESULT_DIR/benchmark.log"
+        done
     done
 done
 
-# 下载tsar监控数据（不停止tsar进程）
-echo "=== 下载tsar监控数据 ===" | tee -a "$RESULT_DIR/benchmark.log"
-scp root@$MYSQL_HOST:/tmp/tsar.log "$RESULT_DIR/" 2>/dev/null || echo "无法从$MYSQL_HOST下载tsar.log" | tee -a "$RESULT_DIR/benchmark.log"
+# 开环固定速率扫描: 按闭环峰值TPS的百分比逐步施加固定到达速率
+if [ "$RATE_SWEEP" = "true" ] && command -v python3 >/dev/null 2>&1; then
+    for scenario in $RATE_SWEEP_SCENARIOS; do
+        echo "=== 固定速率扫描: $scenario ===" | tee -a "$RESULT_DIR/benchmark.log"
+        if ! RATE_PLAN=$(python3 rate_sweep.py plan "$RESULT_DIR" $scenario --steps "$RATE_SWEEP_STEPS" --peak $RATE_SWEEP_PEAK); then
+            echo "跳过 $scenario 的速率扫描" | tee -a "$RESULT_DIR/benchmark.log"
+            continue
+        fi
+        
+        while read -r percent rate; do
+            if cell_done rate_$scenario $percent; then
+                continue
+            fi
+            echo "--- 目标负载: ${percent}% (${rate} TPS) ---" | tee -a "$RESULT_DIR/benchmark.log"
+            cooldown rate_${scenario}_${percent}pct
+            if run_rate_step $scenario $percent $rate; then
+                echo "DONE rate_$scenario $percent" >> "$CHECKPOINT_FILE"
+            else
+                echo "FAILED rate_$scenario $percent 1" >> "$CHECKPOINT_FILE"
+                FAILED_CELLS="$FAILED_CELLS rate_${scenario}_${percent}pct"
+            fi
+        done <<< "$RATE_PLAN"
+    done
+fi
+
+if [ -n "$CLIENT_SAMPLER_PID" ]; then
+    kill $CLIENT_SAMPLER_PID 2>/dev/null || true
+    wait $CLIENT_SAMPLER_PID 2>/dev/null || true
+fi
+
+if [ "$MONITOR_TYPE" = "proc" ]; then
+    # 停止proc_sampler并下载监控数据
+    echo "=== 下载proc_sampler监控数据 ===" | tee -a "$RESULT_DIR/benchmark.log"
+    ssh root@$MYSQL_HOST "kill \$(cat /tmp/proc_sampler.pid) 2>/dev/null; sleep 1" || true
+    scp root@$MYSQL_HOST:/tmp/proc_sampler.log "$RESULT_DIR/" 2>/dev/null || echo "无法从$MYSQL_HOST下载proc_sampler.log" | tee -a "$RESULT_DIR/benchmark.log"
+else
+    # 下载tsar监控数据（不停止tsar进程）
+    echo "=== 下载tsar监控数据 ===" | tee -a "$RESULT_DIR/benchmark.log"
+    scp root@$MYSQL_HOST:/tmp/tsar.log "$RESULT_DIR/" 2>/dev/null || echo "无法从$MYSQL_HOST下载tsar.log" | tee -a "$RESULT_DIR/benchmark.log"
+fi
 
 echo "=== 压测完成 ===" | tee -a "$RESULT_DIR/benchmark.log"
 TOTAL_END_TIME=$(date '+%Y-%m-%d %H:%M:%S')
@@ -163,3 +592,14 @@ else
     echo "python3 generate_report.py $RESULT_DIR" | tee -a "$RESULT_DIR/benchmark.log"
     echo "python3 generate_markdown_report.py $RESULT_DIR" | tee -a "$RESULT_DIR/benchmark.log"
 fi
+
+if [ -n "$FAILED_CELLS" ]; then
+    echo "以下测试多次失败，未包含在报告中:$FAILED_CELLS" | tee -a "$RESULT_DIR/benchmark.log"
+    echo "排查后可续跑: $0 $CONFIG_FILE \"$TEST_TIME\" false $RESULT_DIR" | tee -a "$RESULT_DIR/benchmark.log"
+    exit 1
+fi
+
+# 报告生成后压缩日志归档 (之后不再写 benchmark.log，以免与压缩后的 benchmark.log.gz 并存)
+if [ "$ARCHIVE_RESULTS" != "none" ] && command -v python3 >/dev/null 2>&1; then
+    python3 compressed_logs.py archive "$RESULT_DIR" --format "$ARCHIVE_RESULTS" || echo "警告: 结果目录归档失败"
+fi
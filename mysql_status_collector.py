@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""压测期间按秒采集 MySQL SHOW GLOBAL STATUS 的增量
+
+通过一个常驻的 mysql 客户端进程 (一条持久连接) 每秒执行一次 SHOW GLOBAL STATUS，
+计数器写入与上一次的差值，Threads_running 等瞬时值写入当前值，每行一个 JSON 对象。
+
+用法: MYSQL_PWD=密码 python3 mysql_status_collector.py -H 主机 -P 端口 -u 用户 -o 输出文件 [-i 间隔秒]
+收到 SIGTERM/SIGINT 后结束。报告生成器用 parse_mysql_status_log/summarize_mysql_status 汇总；
+采集器在 perf_schema 快照、火焰图采集等前后步骤期间也在运行，汇总时只取负载窗口内的样本。
+"""
+import argparse
+import json
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from compressed_logs import log_exists, open_log
+
+END_MARKER = '__status_end__'
+
+# 计数器类: 记录两次采样之间的增量
+COUNTER_NAMES = [
+    'Innodb_buffer_pool_read_requests',
+    'Innodb_buffer_pool_reads',
+    'Innodb_buffer_pool_wait_free',
+    'Innodb_row_lock_waits',
+    'Innodb_row_lock_time',
+    'Innodb_log_writes',
+    'Innodb_log_write_requests',
+    'Innodb_log_waits',
+    'Innodb_os_log_fsyncs',
+    'Innodb_data_fsyncs',
+    'Innodb_data_reads',
+    'Innodb_data_writes',
+    'Questions',
+]
+COUNTER_PREFIXES = ('Com_',)
+
+# 瞬时值: 记录采样时刻的当前值
+GAUGE_NAMES = [
+    'Threads_running',
+    'Threads_connected',
+    'Innodb_buffer_pool_pages_dirty',
+    'Innodb_buffer_pool_pages_total',
+]
+
+# 报告中展示的列: (列名, 汇总键, 格式)
+MYSQL_STATUS_COLUMNS = [
+    ('BP命中率(%)', 'bp_hit_ratio', '{:.2f}'),
+    ('BP物理读/s', 'bp_reads', '{:,.0f}'),
+    ('行锁等待/s', 'row_lock_waits', '{:,.1f}'),
+    ('平均行锁等待(ms)', 'row_lock_wait_ms', '{:.2f}'),
+    ('日志写/s', 'log_writes', '{:,.0f}'),
+    ('数据fsync/s', 'data_fsyncs', '{:,.0f}'),
+    ('运行线程(平均)', 'threads_running_avg', '{:.1f}'),
+    ('运行线程(最大)', 'threads_running_max', '{:.0f}'),
+    ('Com_select/s', 'com_select', '{:,.0f}'),
+    ('Com_insert/s', 'com_insert', '{:,.0f}'),
+    ('Com_update/s', 'com_update', '{:,.0f}'),
+    ('Com_delete/s', 'com_delete', '{:,.0f}'),
+    ('Com_commit/s', 'com_commit', '{:,.0f}'),
+]
+
+
+class StatusConnection:
+    """常驻 mysql 客户端进程，通过标准输入输出反复执行 SHOW GLOBAL STATUS"""
+
+    def __init__(self, mysql_bin, host, port, user):
+        cmd = [mysql_bin, '-h', host, '-P', str(port), '-u', user, '-N', '-B', '-n']
+        # 密码通过 MYSQL_PWD 环境变量传递，避免出现在进程列表中
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     universal_newlines=True, bufsize=1)
+
+    def fetch(self):
+        """执行一次 SHOW GLOBAL STATUS，返回 {变量名: 数值}"""
+        self.proc.stdin.write(f"SHOW GLOBAL STATUS; SELECT '{END_MARKER}';\n")
+        self.proc.stdin.flush()
+
+        status = {}
+        for line in self.proc.stdout:
+            line = line.rstrip('\n')
+            if line == END_MARKER:
+                return status
+            name, _, value = line.partition('\t')
+            try:
+                status[name] = int(value)
+            except ValueError:
+                continue
+        raise EOFError("mysql客户端已退出")
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        self.proc.wait()
+
+
+def is_counter(name):
+    return name in COUNTER_NAMES or name.startswith(COUNTER_PREFIXES)
+
+
+def status_delta(prev, cur):
+    """计算两次采样之间的计数器增量，只保留非零项"""
+    deltas = {}
+    for name, value in cur.items():
+        if is_counter(name) and name in prev:
+            delta = value - prev[name]
+            if delta:
+                deltas[name] = delta
+    return deltas
+
+
+def run(conn, interval, output):
+    stop = []
+
+    def handle_stop(signum, frame):
+        stop.append(signum)
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    with open(output, 'w') as out:
+        prev = conn.fetch()
+        prev_mono = time.monotonic()
+        next_time = prev_mono + interval
+        while not stop:
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if stop:
+                break
+            next_time += interval
+
+            cur = conn.fetch()
+            cur_mono = time.monotonic()
+            record = {
+                'ts_ms': int(time.time() * 1000),
+                'elapsed': round(cur_mono - prev_mono, 3),
+                'deltas': status_delta(prev, cur),
+                'gauges': {name: cur[name] for name in GAUGE_NAMES if name in cur},
+            }
+            out.write(json.dumps(record, sort_keys=True) + '\n')
+            out.flush()
+            prev, prev_mono = cur, cur_mono
+
+
+def parse_mysql_status_log(log_file):
+    """解析采集结果，返回记录列表；文件不存在时返回空列表"""
+    records = []
+    if not log_exists(log_file):
+        return records
+
+    with open_log(log_file) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def load_window_ms(test_times):
+    """负载窗口 (起始毫秒, 结束毫秒)：优先取 "Threads started!" 与统计输出的毫秒时刻，
+    旧格式的时间文件退回秒级的 TEST_START_TIME/TEST_END_TIME，都没有时返回 None
+    """
+    start = test_times.get('threads_started_ms') or test_times.get('test_start_ms')
+    end = test_times.get('stats_printed_ms') or test_times.get('test_end_ms')
+    try:
+        if start is None and test_times.get('start'):
+            start = datetime.strptime(test_times['start'], '%Y-%m-%d %H:%M:%S').timestamp() * 1000
+        if end is None and test_times.get('end'):
+            end = datetime.strptime(test_times['end'], '%Y-%m-%d %H:%M:%S').timestamp() * 1000
+    except ValueError:
+        return None
+    if start is None or end is None or end <= start:
+        return None
+    return start, end
+
+
+def trim_to_load_window(records, test_times):
+    """只保留采样区间中点落在负载窗口内的记录 (ts_ms 是区间结束时刻)，没有窗口时原样返回"""
+    window = load_window_ms(test_times) if test_times else None
+    if window is None:
+        return records
+    start, end = window
+    return [r for r in records if start <= r['ts_ms'] - r['elapsed'] * 500 < end]
+
+
+def summarize_mysql_status(records, test_times=None):
+    """把每秒增量汇总为每秒平均值，结构见 MYSQL_STATUS_COLUMNS
+
+    给出 test_times (parse_test_time 的结果) 时先裁剪到负载窗口，
+    避免采集器在压测前后空闲的秒数拉低速率与 Threads_running 平均值。
+    """
+    records = trim_to_load_window(records, test_times)
+    elapsed = sum(r['elapsed'] for r in records)
+    if not records or elapsed <= 0:
+        return None
+
+    totals = {}
+    for record in records:
+        for name, delta in record['deltas'].items():
+            totals[name] = totals.get(name, 0) + delta
+
+    def rate(name):
+        return totals.get(name, 0) / elapsed
+
+    read_requests = totals.get('Innodb_buffer_pool_read_requests', 0)
+    lock_waits = totals.get('Innodb_row_lock_waits', 0)
+    running = [r['gauges']['Threads_running'] for r in records if 'Threads_running' in r['gauges']]
+
+    return {
+        'bp_hit_ratio': (1 - totals.get('Innodb_buffer_pool_reads', 0) / read_requests) * 100
+                        if read_requests else None,
+        'bp_reads': rate('Innodb_buffer_pool_reads'),
+        'row_lock_waits': rate('Innodb_row_lock_waits'),
+        'row_lock_wait_ms': totals.get('Innodb_row_lock_time', 0) / lock_waits if lock_waits else 0.0,
+        'log_writes': rate('Innodb_log_writes'),
+        'data_fsyncs': rate('Innodb_data_fsyncs'),
+        'threads_running_avg': sum(running) / len(running) if running else None,
+        'threads_running_max': max(running) if running else None,
+        'com_select': rate('Com_select'),
+        'com_insert': rate('Com_insert'),
+        'com_update': rate('Com_update'),
+        'com_delete': rate('Com_delete'),
+        'com_commit': rate('Com_commit'),
+        'sample_count': len(records),
+    }
+
+
+def format_mysql_status(summary):
+    """按 MYSQL_STATUS_COLUMNS 格式化一行汇总，没有数据的列显示 N/A"""
+    values = []
+    for _, key, fmt in MYSQL_STATUS_COLUMNS:
+        value = summary.get(key) if summary else None
+        values.append(fmt.format(value) if value is not None else "N/A")
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='压测期间按秒采集 SHOW GLOBAL STATUS 增量')
+    parser.add_argument('-H', '--host', default='127.0.0.1')
+    parser.add_argument('-P', '--port', default='3306')
+    parser.add_argument('-u', '--user', default='root')
+    parser.add_argument('-i', '--interval', type=float, default=1.0, help='采样间隔(秒)，默认1')
+    parser.add_argument('-o', '--output', required=True, help='输出文件')
+    parser.add_argument('--mysql-bin', default='mysql', help='mysql客户端命令')
+    args = parser.parse_args()
+
+    try:
+        conn = StatusConnection(args.mysql_bin, args.host, args.port, args.user)
+    except OSError as e:
+        print(f"错误: 无法启动mysql客户端: {e}")
+        sys.exit(1)
+
+    try:
+        run(conn, args.interval, args.output)
+    except (EOFError, BrokenPipeError) as e:
+        print(f"警告: MySQL状态采集中断: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""网络吞吐、包速率、TCP重传与上下文切换指标
+
+小包高并发的点查询常常先撞上云主机网卡的 PPS 上限，而不是 MySQL 本身。
+这里从按秒对齐后的监控样本中取出网络相关指标，并结合同一秒的 sysbench qps
+换算出每查询包数/字节数，便于在不同环境之间比较。
+
+支持两种数据来源 (字段名由 monitor_collectors 解析得到):
+    tsar --traffic --tcp --pcsw   traffic_pktin/pktout/bytin/bytout, tcp_outseg/retran(%), pcsw_cs
+    proc_sampler.py               net_rx_pkts/tx_pkts/rx_kb/tx_kb, tcp_out_segs/tcp_retrans, ctxsw
+"""
+
+# 报告中展示的列: (列名, 汇总键, 格式)
+NETWORK_COLUMNS = [
+    ('入包/s', 'pkts_in', '{:,.0f}'),
+    ('出包/s', 'pkts_out', '{:,.0f}'),
+    ('入流量(MB/s)', 'mb_in', '{:.2f}'),
+    ('出流量(MB/s)', 'mb_out', '{:.2f}'),
+    ('包/查询', 'pkts_per_query', '{:.2f}'),
+    ('字节/查询', 'bytes_per_query', '{:,.0f}'),
+    ('TCP重传/s', 'retrans', '{:,.1f}'),
+    ('重传率(%)', 'retrans_pct', '{:.3f}'),
+    ('上下文切换/s', 'ctxsw', '{:,.0f}'),
+]
+
+
+def network_sample(sample):
+    """把一条监控样本换算为统一的网络指标，缺少的指标为 None"""
+    metrics = dict.fromkeys(['pkts_in', 'pkts_out', 'bytes_in', 'bytes_out',
+                             'out_segs', 'retrans', 'ctxsw'])
+    if 'net_rx_pkts' in sample:
+        metrics['pkts_in'] = sample['net_rx_pkts']
+        metrics['pkts_out'] = sample['net_tx_pkts']
+        metrics['bytes_in'] = sample['net_rx_kb'] * 1024
+        metrics['bytes_out'] = sample['net_tx_kb'] * 1024
+    elif 'traffic_pktin' in sample:
+        metrics['pkts_in'] = sample['traffic_pktin']
+        metrics['pkts_out'] = sample['traffic_pktout']
+        metrics['bytes_in'] = sample.get('traffic_bytin')
+        metrics['bytes_out'] = sample.get('traffic_bytout')
+
+    if 'tcp_retrans' in sample:
+        metrics['out_segs'] = sample['tcp_out_segs']
+        metrics['retrans'] = sample['tcp_retrans']
+    elif 'tcp_retran' in sample and 'tcp_outseg' in sample:
+        # tsar 的 retran 列是重传报文占发出报文的百分比
+        metrics['out_segs'] = sample['tcp_outseg']
+        metrics['retrans'] = sample['tcp_outseg'] * sample['tcp_retran'] / 100
+
+    if 'ctxsw' in sample:
+        metrics['ctxsw'] = sample['ctxsw']
+    elif 'pcsw_cs' in sample:
+        metrics['ctxsw'] = sample['pcsw_cs']
+    return metrics
+
+
+def summarize_network(joined):
+    """汇总一个测试按秒对齐的结果 (time_align 的 joined 行)，没有任何网络指标时返回 None
+
+    各指标分别对有该指标的秒取平均，只有包计数器、没有网卡数据时也报告重传与上下文切换；
+    每查询包数/字节数 = (入 + 出) / qps，只用同时有包计数与 qps 的秒计算。
+    """
+    totals = {}
+    counts = {}
+    qps_total = 0.0
+    qps_count = 0
+    sample_count = 0
+    for row in joined:
+        if not row['tsar']:
+            continue
+        metrics = network_sample(row['tsar'])
+        if all(value is None for value in metrics.values()):
+            continue
+        sample_count += 1
+        for key, value in metrics.items():
+            if value is not None:
+                totals[key] = totals.get(key, 0.0) + value
+                counts[key] = counts.get(key, 0) + 1
+        if metrics['pkts_in'] is not None:
+            qps_total += row['interval']['qps']
+            qps_count += 1
+
+    if not sample_count:
+        return None
+
+    def mean(key):
+        return totals[key] / counts[key] if counts.get(key) else None
+
+    qps = qps_total / qps_count if qps_count else 0.0
+    pkts_in, pkts_out = mean('pkts_in'), mean('pkts_out')
+    bytes_in, bytes_out = mean('bytes_in'), mean('bytes_out')
+    out_segs, retrans = mean('out_segs'), mean('retrans')
+    return {
+        'pkts_in': pkts_in,
+        'pkts_out': pkts_out,
+        'mb_in': bytes_in / 1048576 if bytes_in is not None else None,
+        'mb_out': bytes_out / 1048576 if bytes_out is not None else None,
+        'pkts_per_query': (pkts_in + pkts_out) / qps
+                          if qps > 0 and pkts_in is not None and pkts_out is not None else None,
+        'bytes_per_query': (bytes_in + bytes_out) / qps
+                           if qps > 0 and bytes_in is not None and bytes_out is not None else None,
+        'retrans': retrans,
+        'retrans_pct': retrans * 100 / out_segs if out_segs and retrans is not None else None,
+        'ctxsw': mean('ctxsw'),
+        'sample_count': sample_count,
+    }
+
+
+def format_network(summary):
+    """按 NETWORK_COLUMNS 格式化一行汇总，没有数据的列显示 N/A"""
+    values = []
+    for _, key, fmt in NETWORK_COLUMNS:
+        value = summary.get(key) if summary else None
+        values.append(fmt.format(value) if value is not None else "N/A")
+    return values
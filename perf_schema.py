@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""performance_schema 等待事件与语句摘要: 每个测试前后各取一次快照，保存增量
+
+QPS 在 64 线程后不再增长时，只看 CPU/IO 无法判断瓶颈是 trx_sys_mutex、redo 日志写入还是
+binlog 组提交。每个测试开始前读取 events_waits_summary_global_by_event_name 与
+events_statements_summary_by_digest (begin)，结束后再读一次 (end)，把增量以紧凑的 JSON 写入
+<测试名>_perf_schema.json:
+    {"elapsed": 秒,
+     "waits": [[事件名, 次数, 等待时间ms], ...]            按等待时间降序，最多 MAX_WAITS 项
+     "statements": [[库, 摘要, 语句文本, 次数, 总时间ms, 锁时间ms, 扫描行数, 返回行数], ...]
+                                                         按总时间降序，最多 MAX_STATEMENTS 项}
+idle 事件 (连接空闲) 不计入。mutex/rwlock 等同步等待默认未启用，setup 动作打开所有 wait/% 仪表
+及其 consumer (直到 MySQL 重启前有效，会带来少量开销)。
+
+用法: MYSQL_PWD=密码 python3 perf_schema.py begin|end|setup -H 主机 -P 端口 -u 用户 [-o 输出文件]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from html import escape
+
+from dataset_manifest import run_query
+from compressed_logs import open_log
+
+MAX_WAITS = 50
+MAX_STATEMENTS = 30
+STATEMENT_TEXT_LENGTH = 200
+# 计时器单位为皮秒
+PS_PER_MS = 10 ** 9
+
+WAITS_QUERY = """
+    SELECT EVENT_NAME, COUNT_STAR, SUM_TIMER_WAIT
+    FROM performance_schema.events_waits_summary_global_by_event_name
+    WHERE COUNT_STAR > 0 AND EVENT_NAME <> 'idle'"""
+STATEMENTS_QUERY = f"""
+    SELECT IFNULL(SCHEMA_NAME, ''), IFNULL(DIGEST, ''), LEFT(IFNULL(DIGEST_TEXT, ''), {STATEMENT_TEXT_LENGTH}),
+           COUNT_STAR, SUM_TIMER_WAIT, SUM_LOCK_TIME, SUM_ROWS_EXAMINED, SUM_ROWS_SENT
+    FROM performance_schema.events_statements_summary_by_digest"""
+SETUP_QUERY = """
+    UPDATE performance_schema.setup_instruments SET ENABLED = 'YES', TIMED = 'YES' WHERE NAME LIKE 'wait/%';
+    UPDATE performance_schema.setup_consumers SET ENABLED = 'YES'
+    WHERE NAME IN ('events_waits_current', 'global_instrumentation', 'thread_instrumentation',
+                   'statements_digest')"""
+
+# 报告中每个场景展示的等待事件数与语句数
+REPORT_TOP_WAITS = 8
+REPORT_TOP_STATEMENTS = 5
+
+# 语句表的列: (列名, 键, 格式)
+STATEMENT_COLUMNS = [
+    ('语句', 'text', '{}'),
+    ('执行/s', 'rate', '{:,.0f}'),
+    ('平均延迟(ms)', 'avg_ms', '{:.3f}'),
+    ('总时间占比(%)', 'share', '{:.1f}'),
+    ('扫描行/次', 'rows_examined', '{:,.1f}'),
+]
+
+
+def take_snapshot(args):
+    """当前的累计值: {'waits': {事件: [次数, 皮秒]}, 'statements': {库\\t摘要: [文本, 次数, ...]}}"""
+    waits = {name: [int(count), int(timer)] for name, count, timer in run_query(args, WAITS_QUERY)}
+    statements = {}
+    for row in run_query(args, STATEMENTS_QUERY):
+        if len(row) == 8:
+            schema, digest, text = row[:3]
+            statements[f'{schema}\t{digest}'] = [text] + [int(v) for v in row[3:]]
+    return {'time': time.time(), 'waits': waits, 'statements': statements}
+
+
+def snapshot_delta(before, after):
+    """两次快照之间的增量 (紧凑格式，见模块说明)"""
+    waits = []
+    for name, (count, timer) in after['waits'].items():
+        prev_count, prev_timer = before['waits'].get(name, [0, 0])
+        if timer > prev_timer:
+            waits.append([name, count - prev_count, round((timer - prev_timer) / PS_PER_MS, 3)])
+    waits.sort(key=lambda w: -w[2])
+
+    statements = []
+    for key, (text, *values) in after['statements'].items():
+        prev = before['statements'].get(key, [text, 0, 0, 0, 0, 0])[1:]
+        count, timer, lock, examined, sent = (v - p for v, p in zip(values, prev))
+        # 摘要表满后被重置时增量为负，按新出现的语句处理
+        if count < 0:
+            count, timer, lock, examined, sent = values
+        if count > 0:
+            schema, digest = key.split('\t', 1)
+            statements.append([schema, digest, text, count, round(timer / PS_PER_MS, 3),
+                               round(lock / PS_PER_MS, 3), examined, sent])
+    statements.sort(key=lambda s: -s[4])
+
+    return {'elapsed': round(after['time'] - before['time'], 3),
+            'waits': waits[:MAX_WAITS], 'statements': statements[:MAX_STATEMENTS]}
+
+
+def load_perf_schema(path):
+    """读取一个测试的增量，文件不存在或不完整时返回 None"""
+    try:
+        with open_log(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if data.get('elapsed') else None
+
+
+def wait_profile(cells):
+    """一个场景各并发数的等待事件分布
+
+    cells: [(并发数, 增量)]，返回 (事件列表, {并发数: {事件: (每秒等待ms, 占比%)}})；
+    事件为各并发数下等待时间前 REPORT_TOP_WAITS 的并集，按最高并发数下的等待时间排序。
+    """
+    profile = {}
+    for threads, data in cells:
+        total = sum(w[2] for w in data['waits']) or 1
+        profile[threads] = {name: (time_ms / data['elapsed'], time_ms * 100 / total)
+                            for name, _, time_ms in data['waits']}
+    events = {w[0] for _, data in cells for w in data['waits'][:REPORT_TOP_WAITS]}
+    peak = profile[max(profile)] if profile else {}
+    return sorted(events, key=lambda name: -peak.get(name, (0, 0))[0]), profile
+
+
+def top_statements(data):
+    """一个测试中总时间最多的语句，按 STATEMENT_COLUMNS 汇总"""
+    total = sum(s[4] for s in data['statements']) or 1
+    rows = []
+    for schema, _, text, count, time_ms, _, examined, _ in data['statements'][:REPORT_TOP_STATEMENTS]:
+        rows.append({'text': text, 'rate': count / data['elapsed'], 'avg_ms': time_ms / count,
+                     'share': time_ms * 100 / total, 'rows_examined': examined / count})
+    return rows
+
+
+def scenario_profiles(results):
+    """报告用: 按场景汇总各测试的增量
+
+    返回 [(场景, [并发数], 事件列表, 分布, 最高并发数, 该并发数下的语句)]，没有增量的场景不列出。
+    """
+    cells_by_scenario = {}
+    for result in results:
+        if result.get('perf_schema'):
+            cells_by_scenario.setdefault(result['scenario'], []).append((result['threads'], result['perf_schema']))
+    profiles = []
+    for scenario, cells in cells_by_scenario.items():
+        cells.sort(key=lambda cell: cell[0])
+        events, profile = wait_profile(cells)
+        peak_threads, peak_data = cells[-1]
+        profiles.append((scenario, [threads for threads, _ in cells], events, profile,
+                         peak_threads, top_statements(peak_data)))
+    return profiles
+
+
+def format_wait(value):
+    """等待事件单元格: 每秒等待时间(ms) 与占全部等待时间的百分比"""
+    if value is None:
+        return '-'
+    return f"{value[0]:,.1f} ({value[1]:.0f}%)"
+
+
+def format_statement(row, html=False):
+    """语句表的一行；语句文本在 HTML 中转义，在 Markdown 中转义竖线"""
+    values = [fmt.format(row[key]) for _, key, fmt in STATEMENT_COLUMNS]
+    values[0] = escape(values[0]) if html else values[0].replace('|', '\\|')
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='performance_schema 等待事件与语句摘要的增量')
+    parser.add_argument('action', choices=['begin', 'end', 'setup'])
+    parser.add_argument('-H', '--host', default='127.0.0.1')
+    parser.add_argument('-P', '--port', default='3306')
+    parser.add_argument('-u', '--user', default='root')
+    parser.add_argument('-D', '--database', default='performance_schema')
+    parser.add_argument('-o', '--output', help='增量文件 (begin 时在旁边保存 .before 快照)')
+    parser.add_argument('--mysql-bin', default='mysql', help='mysql客户端命令')
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'setup':
+            run_query(args, SETUP_QUERY)
+            print("已启用 performance_schema 的等待事件仪表")
+            return
+        if not args.output:
+            parser.error('begin/end 需要 -o 输出文件')
+        before_file = args.output + '.before'
+        if args.action == 'begin':
+            with open(before_file, 'w') as f:
+                json.dump(take_snapshot(args), f)
+            return
+        with open(before_file, 'r') as f:
+            before = json.load(f)
+        with open(args.output, 'w') as f:
+            json.dump(snapshot_delta(before, take_snapshot(args)), f, separators=(',', ':'))
+        os.remove(before_file)
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"警告: performance_schema 快照失败 ({args.action}): {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""内置 /proc 采样器，作为 tsar 的替代
+
+在被压 MySQL 宿主机上运行，按固定间隔读取 /proc/stat、/proc/diskstats、
+/proc/net/dev、/proc/net/snmp 与 /proc/softirqs，把相邻两次采样的差值换算成每秒速率/百分比，
+以文本行写入日志 (首行 # fields 给出列名，时间戳为 epoch 微秒)。
+
+用法: python3 proc_sampler.py [-i 间隔秒] [-d 磁盘1,磁盘2] [-o 输出文件] [--no-percpu] [--procs sysbench]
+
+--procs 额外记录指定名称进程的 CPU 占用 (proc_cpu，单位为单核的百分比)，用于在压测客户端上
+观察 sysbench 自身的 CPU。
+
+为了把开销控制在单核 0.5% 以下: 文件句柄常驻、每次只 lseek 后整体读取，
+解析只做 split，按绝对时间调度避免漂移，不引入任何第三方依赖。
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+
+FIELDS = [
+    'ts_us',
+    'cpu_user', 'cpu_sys', 'cpu_wait', 'cpu_hirq', 'cpu_sirq', 'cpu_steal', 'cpu_util',
+    'io_rs', 'io_ws', 'io_rkb', 'io_wkb', 'io_await', 'io_util',
+    'io_rs_total', 'io_ws_total', 'io_rkb_total', 'io_wkb_total',
+    'net_rx_pkts', 'net_tx_pkts', 'net_rx_kb', 'net_tx_kb',
+    'tcp_out_segs', 'tcp_retrans',
+    'sirq_net_rx', 'sirq_net_tx',
+    'ctxsw', 'procs_running',
+]
+
+# 每个CPU核的字段: 利用率、软中断占比、NET_RX/NET_TX 软中断次数/秒
+PERCPU_FIELDS = ['util', 'sirq', 'net_rx', 'net_tx']
+
+# 不参与统计的块设备前缀 (虚拟设备)
+SKIP_DISK_PREFIXES = ('loop', 'ram', 'zram', 'sr', 'fd', 'dm-', 'md')
+
+
+class ProcFile:
+    """常驻打开的 /proc 文件，每次采样从头重新读取"""
+
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def read(self):
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        chunks = []
+        while True:
+            chunk = os.read(self.fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks).decode('ascii', 'replace')
+
+    def close(self):
+        os.close(self.fd)
+
+
+def default_disks():
+    """默认统计所有物理整盘 (不含分区与虚拟设备)"""
+    disks = []
+    for name in sorted(os.listdir('/sys/block')):
+        if not name.startswith(SKIP_DISK_PREFIXES):
+            disks.append(name)
+    return disks
+
+
+def read_stat(text):
+    """解析 /proc/stat: 总体及每核 CPU 时间片 (jiffies)、上下文切换次数、运行队列"""
+    stat = {'cpu': None, 'percpu': {}, 'ctxt': 0, 'procs_running': 0}
+    for line in text.splitlines():
+        if line.startswith('cpu '):
+            stat['cpu'] = [int(v) for v in line.split()[1:]]
+        elif line.startswith('cpu'):
+            parts = line.split()
+            stat['percpu'][parts[0]] = [int(v) for v in parts[1:]]
+        elif line.startswith('ctxt '):
+            stat['ctxt'] = int(line.split()[1])
+        elif line.startswith('procs_running '):
+            stat['procs_running'] = int(line.split()[1])
+    return stat
+
+
+def read_diskstats(text, disks):
+    """解析 /proc/diskstats，返回 {设备: (读次数, 读扇区, 读耗时ms, 写次数, 写扇区, 写耗时ms, IO耗时ms)}"""
+    stats = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 14 or parts[2] not in disks:
+            continue
+        stats[parts[2]] = (int(parts[3]), int(parts[5]), int(parts[6]),
+                           int(parts[7]), int(parts[9]), int(parts[10]), int(parts[12]))
+    return stats
+
+
+def read_net_dev(text):
+    """解析 /proc/net/dev，返回除 lo 以外所有网卡的 (收字节, 收包, 发字节, 发包) 合计"""
+    rx_bytes = rx_pkts = tx_bytes = tx_pkts = 0
+    for line in text.splitlines()[2:]:
+        name, _, data = line.partition(':')
+        if name.strip() == 'lo':
+            continue
+        parts = data.split()
+        if len(parts) < 10:
+            continue
+        rx_bytes += int(parts[0])
+        rx_pkts += int(parts[1])
+        tx_bytes += int(parts[8])
+        tx_pkts += int(parts[9])
+    return rx_bytes, rx_pkts, tx_bytes, tx_pkts
+
+
+def read_tcp_snmp(text):
+    """解析 /proc/net/snmp 的 Tcp 段，返回 (发出报文段数, 重传报文段数)"""
+    names = None
+    for line in text.splitlines():
+        if not line.startswith('Tcp:'):
+            continue
+        if names is None:
+            names = line.split()[1:]
+            continue
+        values = dict(zip(names, line.split()[1:]))
+        return int(values.get('OutSegs', 0)), int(values.get('RetransSegs', 0))
+    return 0, 0
+
+
+def read_proc_cpu(names):
+    """名称 (comm) 在 names 中的进程已用的 CPU 时间，返回 {pid: utime+stime (jiffies)}"""
+    ticks = {}
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                text = f.read()
+        except OSError:
+            continue
+        # comm 可能包含空格，以最后一个 ')' 为界
+        end = text.rfind(')')
+        if text[text.find('(') + 1:end] not in names:
+            continue
+        fields = text[end + 2:].split()
+        ticks[pid] = int(fields[11]) + int(fields[12])
+    return ticks
+
+
+def read_softirqs(text):
+    """解析 /proc/softirqs，返回 {类型: 各CPU计数列表}"""
+    softirqs = {}
+    for line in text.splitlines()[1:]:
+        name, _, data = line.partition(':')
+        softirqs[name.strip()] = [int(v) for v in data.split()]
+    return softirqs
+
+
+class ProcSampler:
+    """读取一次 /proc 快照，并与上一次快照求差得到一行采样数据"""
+
+    def __init__(self, disks, percpu=True, procs=()):
+        self.disks = set(disks)
+        self.procs = set(procs)
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.files = {
+            'stat': ProcFile('/proc/stat'),
+            'diskstats': ProcFile('/proc/diskstats'),
+            'net_dev': ProcFile('/proc/net/dev'),
+            'snmp': ProcFile('/proc/net/snmp'),
+            'softirqs': ProcFile('/proc/softirqs'),
+        }
+        self.prev = None
+
+        # 字段列表在启动时固定: 基础字段 + 每核字段 (cpu0_util, cpu0_sirq, ...)
+        self.cpus = []
+        if percpu:
+            percpu_stat = read_stat(self.files['stat'].read())['percpu']
+            self.cpus = sorted(percpu_stat, key=lambda name: int(name[3:]))
+        self.fields = list(FIELDS)
+        for cpu in self.cpus:
+            self.fields.extend(f'{cpu}_{field}' for field in PERCPU_FIELDS)
+        if self.procs:
+            self.fields.append('proc_cpu')
+
+    def snapshot(self):
+        return {
+            'time': time.time(),
+            'stat': read_stat(self.files['stat'].read()),
+            'disk': read_diskstats(self.files['diskstats'].read(), self.disks),
+            'net': read_net_dev(self.files['net_dev'].read()),
+            'tcp': read_tcp_snmp(self.files['snmp'].read()),
+            'softirqs': read_softirqs(self.files['softirqs'].read()),
+            'procs': read_proc_cpu(self.procs) if self.procs else {},
+        }
+
+    def sample(self):
+        """返回 {字段: 值}，第一次调用只建立基线，返回 None"""
+        cur = self.snapshot()
+        prev, self.prev = self.prev, cur
+        if prev is None:
+            return None
+
+        elapsed = cur['time'] - prev['time']
+        if elapsed <= 0:
+            return None
+
+        row = {'ts_us': int(cur['time'] * 1000000)}
+        row.update(cpu_fields(prev['stat']['cpu'], cur['stat']['cpu']))
+        row.update(disk_fields(prev['disk'], cur['disk'], elapsed))
+        row.update(net_fields(prev['net'], cur['net'], elapsed))
+        row['tcp_out_segs'] = (cur['tcp'][0] - prev['tcp'][0]) / elapsed
+        row['tcp_retrans'] = (cur['tcp'][1] - prev['tcp'][1]) / elapsed
+
+        for name, field in (('NET_RX', 'sirq_net_rx'), ('NET_TX', 'sirq_net_tx')):
+            row[field] = (sum(cur['softirqs'].get(name, [])) -
+                          sum(prev['softirqs'].get(name, []))) / elapsed
+
+        row['ctxsw'] = (cur['stat']['ctxt'] - prev['stat']['ctxt']) / elapsed
+        row['procs_running'] = cur['stat']['procs_running']
+        if self.procs:
+            # 只统计两次采样中都存在的进程
+            ticks = sum(cur['procs'][pid] - prev['procs'][pid] for pid in cur['procs'] if pid in prev['procs'])
+            row['proc_cpu'] = ticks * 100.0 / self.clock_ticks / elapsed
+
+        for index, cpu in enumerate(self.cpus):
+            prev_cpu = prev['stat']['percpu'].get(cpu)
+            cur_cpu = cur['stat']['percpu'].get(cpu)
+            # 核被下线时 /proc/stat 中没有对应行，记为 0
+            fields = cpu_fields(prev_cpu, cur_cpu) if prev_cpu and cur_cpu else {}
+            row[f'{cpu}_util'] = fields.get('cpu_util', 0.0)
+            row[f'{cpu}_sirq'] = fields.get('cpu_sirq', 0.0)
+            for name, field in (('NET_RX', 'net_rx'), ('NET_TX', 'net_tx')):
+                cur_count = cur['softirqs'].get(name, [])
+                prev_count = prev['softirqs'].get(name, [])
+                if index < len(cur_count) and index < len(prev_count):
+                    row[f'{cpu}_{field}'] = (cur_count[index] - prev_count[index]) / elapsed
+                else:
+                    row[f'{cpu}_{field}'] = 0.0
+        return row
+
+    def close(self):
+        for proc_file in self.files.values():
+            proc_file.close()
+
+
+def cpu_fields(prev, cur):
+    """CPU 各状态占比 (%)，含义与 tsar --cpu 一致，util 为非空闲时间占比"""
+    # user nice system idle iowait irq softirq steal guest guest_nice
+    delta = [c - p for p, c in zip(prev, cur)]
+    delta += [0] * (8 - len(delta))
+    total = sum(delta[:8]) or 1
+    return {
+        'cpu_user': (delta[0] + delta[1]) * 100.0 / total,
+        'cpu_sys': delta[2] * 100.0 / total,
+        'cpu_wait': delta[4] * 100.0 / total,
+        'cpu_hirq': delta[5] * 100.0 / total,
+        'cpu_sirq': delta[6] * 100.0 / total,
+        'cpu_steal': delta[7] * 100.0 / total,
+        'cpu_util': (total - delta[3]) * 100.0 / total,
+    }
+
+
+def disk_fields(prev, cur, elapsed):
+    """磁盘IO速率
+
+    与 tsar 的解析 (monitor_collectors._tsar_sample) 相同，多块盘时 io_* 全部取自 util 最高的盘，
+    各盘合计的速率另记为 io_*_total。
+    """
+    fields = {'io_rs': 0.0, 'io_ws': 0.0, 'io_rkb': 0.0, 'io_wkb': 0.0, 'io_await': 0.0, 'io_util': 0.0,
+              'io_rs_total': 0.0, 'io_ws_total': 0.0, 'io_rkb_total': 0.0, 'io_wkb_total': 0.0}
+    busiest = None
+    for name, c in cur.items():
+        p = prev.get(name)
+        if p is None:
+            continue
+        reads, rsect, rticks, writes, wsect, wticks, io_ticks = [b - a for a, b in zip(p, c)]
+        disk = {
+            'io_rs': reads / elapsed,
+            'io_ws': writes / elapsed,
+            'io_rkb': rsect / 2.0 / elapsed,
+            'io_wkb': wsect / 2.0 / elapsed,
+            'io_await': (rticks + wticks) / float(reads + writes) if reads + writes else 0.0,
+            'io_util': min(io_ticks / (elapsed * 10.0), 100.0),
+        }
+        for key in ('io_rs', 'io_ws', 'io_rkb', 'io_wkb'):
+            fields[f'{key}_total'] += disk[key]
+        if busiest is None or disk['io_util'] >= busiest['io_util']:
+            busiest = disk
+    if busiest:
+        fields.update(busiest)
+    return fields
+
+
+def net_fields(prev, cur, elapsed):
+    """网卡每秒收发包数与吞吐 (KB/s)"""
+    rx_bytes, rx_pkts, tx_bytes, tx_pkts = [(c - p) / elapsed for p, c in zip(prev, cur)]
+    return {
+        'net_rx_pkts': rx_pkts,
+        'net_tx_pkts': tx_pkts,
+        'net_rx_kb': rx_bytes / 1024.0,
+        'net_tx_kb': tx_bytes / 1024.0,
+    }
+
+
+def format_row(fields, row):
+    values = [str(row['ts_us'])]
+    for field in fields[1:]:
+        values.append(f"{row[field]:.2f}")
+    return ' '.join(values) + '\n'
+
+
+def run(interval, disks, output, percpu=True, procs=()):
+    sampler = ProcSampler(disks, percpu, procs)
+    stop = []
+
+    def handle_stop(signum, frame):
+        stop.append(signum)
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+
+    start_wall = time.monotonic()
+    start_cpu = time.process_time()
+
+    with open(output, 'a') as out:
+        out.write(f"# proc_sampler interval={interval} disks={','.join(disks)}\n")
+        out.write(f"# fields: {' '.join(sampler.fields)}\n")
+        out.flush()
+
+        sampler.sample()
+        next_time = time.monotonic() + interval
+        while not stop:
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if stop:
+                break
+            # 按绝对时间调度，处理耗时不会累积成漂移；落后超过一个周期时直接跳过
+            next_time += interval
+            if next_time < time.monotonic():
+                next_time = time.monotonic() + interval
+
+            row = sampler.sample()
+            if row:
+                out.write(format_row(sampler.fields, row))
+                out.flush()
+
+        wall = time.monotonic() - start_wall
+        cpu = time.process_time() - start_cpu
+        if wall > 0:
+            out.write(f"# overhead: cpu={cpu:.3f}s wall={wall:.1f}s ({cpu * 100.0 / wall:.3f}% of one core)\n")
+
+    sampler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按固定间隔采集 /proc 中的 CPU/IO/网络指标')
+    parser.add_argument('-i', '--interval', type=float, default=1.0, help='采样间隔(秒)，默认1')
+    parser.add_argument('-d', '--disks', default='', help='统计的磁盘设备，逗号分隔，默认全部物理盘')
+    parser.add_argument('-o', '--output', default='/tmp/proc_sampler.log', help='输出文件')
+    parser.add_argument('--no-percpu', action='store_true', help='不采集每核CPU与软中断')
+    parser.add_argument('--procs', default='', help='额外记录CPU占用的进程名，逗号分隔 (例如 sysbench)')
+    args = parser.parse_args()
+
+    if args.interval <= 0:
+        print("错误: 采样间隔必须大于0")
+        sys.exit(1)
+
+    disks = [d for d in args.disks.split(',') if d] or default_disks()
+    procs = [p for p in args.procs.split(',') if p]
+    run(args.interval, disks, args.output, not args.no_percpu, procs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""报告生成与合并工具的分阶段耗时统计 (--profile)
+
+大结果目录上生成报告很慢时，不改代码就能看出时间花在哪个阶段 (tsar解析、按秒对齐、日志正则、渲染)。
+各入口脚本在阶段之间调用 phase('阶段名')，上一个阶段随之结束；没有 --profile 时 phase() 直接返回。
+每个阶段记录墙钟时间、CPU时间与阶段内新分配内存的峰值 (tracemalloc，会使程序整体变慢，
+各阶段之间的相对比例仍然可信)；同名阶段累加。
+
+    python3 generate_report.py --profile 结果目录
+    python3 merge_reports_v2.py --profile=merge.prof env1,env2    同时用 cProfile 保存函数级统计
+"""
+import cProfile
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+
+# cProfile 统计中打印的函数数 (按累计时间)
+CPROFILE_TOP = 15
+
+_profiler = None
+
+
+class PhaseProfiler:
+    """按阶段累计耗时与内存峰值，阶段不嵌套"""
+
+    def __init__(self, cprofile_output=None, trace_memory=True):
+        self.phases = {}
+        self.trace_memory = trace_memory
+        self.current = None
+        self.started = None
+        self.cprofile_output = cprofile_output
+        self.cprofile = cProfile.Profile() if cprofile_output else None
+        if self.cprofile:
+            self.cprofile.enable()
+
+    def start(self, name):
+        self.stop()
+        # 重新开始跟踪，峰值只反映本阶段的分配
+        if self.trace_memory:
+            tracemalloc.stop()
+            tracemalloc.start()
+        self.current = name
+        self.started = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        if self.current is None:
+            return
+        wall = time.perf_counter() - self.started[0]
+        cpu = time.process_time() - self.started[1]
+        peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+        totals = self.phases.setdefault(self.current, [0.0, 0.0, 0])
+        totals[0] += wall
+        totals[1] += cpu
+        totals[2] = max(totals[2], peak)
+        self.current = None
+
+    def summary(self):
+        """阶段耗时表 (文本)"""
+        self.stop()
+        lines = ["阶段耗时 (--profile):",
+                 # 中文字符占两列宽
+                 f"{'墙钟(s)':>7} {'CPU(s)':>9} {'峰值内存(MB)':>8}  阶段"]
+        for name, (wall, cpu, peak) in self.phases.items():
+            lines.append(f"{wall:>9.3f} {cpu:>9.3f} {peak / 1024 / 1024:>12.1f}  {name}")
+        wall = sum(p[0] for p in self.phases.values())
+        cpu = sum(p[1] for p in self.phases.values())
+        lines.append(f"{wall:>9.3f} {cpu:>9.3f} {'':>12}  合计")
+        # Linux 上 ru_maxrss 的单位为 KB
+        lines.append(f"进程峰值RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+        return '\n'.join(lines)
+
+
+def enable_profile(cprofile_output=None, trace_memory=True):
+    """开启分阶段统计 (之前的统计被丢弃)"""
+    global _profiler
+    _profiler = PhaseProfiler(cprofile_output, trace_memory)
+
+
+def profile_from_argv(argv):
+    """从命令行参数中取出 --profile[=cProfile输出文件] 并开启统计，返回其余参数"""
+    rest = []
+    for arg in argv:
+        if arg == '--profile' or arg.startswith('--profile='):
+            enable_profile(arg.partition('=')[2] or None)
+        else:
+            rest.append(arg)
+    return rest
+
+
+def phase(name):
+    """结束上一个阶段并开始新阶段；未开启 --profile 时不做任何事"""
+    if _profiler:
+        _profiler.start(name)
+
+
+def phase_timings():
+    """结束统计并返回 {阶段: (墙钟秒, CPU秒, 峰值内存字节)}，未开启时返回空字典"""
+    global _profiler
+    if not _profiler:
+        return {}
+    _profiler.stop()
+    timings = {name: tuple(values) for name, values in _profiler.phases.items()}
+    _profiler = None
+    return timings
+
+
+def report_profile():
+    """打印阶段耗时表，开启了 cProfile 时保存统计并打印累计时间最多的函数"""
+    if not _profiler:
+        return
+    print(_profiler.summary())
+    tracemalloc.stop()
+    if _profiler.cprofile:
+        _profiler.cprofile.disable()
+        _profiler.cprofile.dump_stats(_profiler.cprofile_output)
+        print(f"cProfile 统计已保存: {_profiler.cprofile_output} (python3 -m pstats 查看)")
+        pstats.Stats(_profiler.cprofile, stream=sys.stdout).sort_stats('cumulative').print_stats(CPROFILE_TOP)
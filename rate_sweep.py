@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""开环固定速率扫描: 延迟 - 负载曲线
+
+普通测试是闭环的 (N 个线程尽力压)，存在协调遗漏问题，也回答不了 "4万 QPS 时 p99 是多少"。
+扫描模式用 sysbench --rate 按峰值吞吐的一系列百分比 (例如 10%~110%) 施加固定的到达速率，
+每一步记录实际达到的速率、事件队列长度与延迟分位数 (来自 --histogram 输出)。
+
+结果文件: rate_<场景>_<百分比>pct.log 与 rate_<场景>_<百分比>pct_time.log (含 TARGET_RATE)。
+
+用法:
+    python3 rate_sweep.py plan <结果目录> <场景> --steps "10 25 50 75 90 100 110" [--peak TPS]
+        按闭环测试中该场景的最高 TPS 计算每一步的目标速率，每行输出 "百分比 目标TPS"
+"""
+import argparse
+import os
+import re
+import sys
+
+from scenarios import find_result_logs
+from compressed_logs import glob_logs, log_exists, open_log
+
+RATE_LOG_PATTERN = re.compile(r'rate_(\w+?)_(\d+)pct\.log$')
+TPS_PATTERN = re.compile(r'transactions:\s+\d+\s+\((\d+\.?\d*)\s+per sec\.\)')
+QPS_PATTERN = re.compile(r'queries:\s+\d+\s+\((\d+\.?\d*)\s+per sec\.\)')
+AVG_PATTERN = re.compile(r'avg:\s+(\d+\.?\d*)')
+ERRORS_PATTERN = re.compile(r'ignored errors:\s+\d+\s+\((\d+\.?\d*)\s+per sec\.\)')
+# [ 1s ] queue length: 0, concurrency: 3
+QUEUE_PATTERN = re.compile(r'^\[\s*\d+s\s*\]\s+queue length:\s+(\d+),\s+concurrency:\s+(\d+)')
+#        1.759 |****                                     1
+HISTOGRAM_ROW = re.compile(r'^\s*(\d+(?:\.\d+)?)\s+\|[*\s]*?(\d+)\s*$')
+
+PERCENTILES = [('p50', 50), ('p95', 95), ('p99', 99), ('p999', 99.9)]
+
+# 报告中展示的列: (列名, 键, 格式)
+RATE_SWEEP_COLUMNS = [
+    ('目标负载(%)', 'percent', '{:d}'),
+    ('目标TPS', 'target_rate', '{:,.0f}'),
+    ('实际TPS', 'tps', '{:,.0f}'),
+    ('实际QPS', 'qps', '{:,.0f}'),
+    ('达成率(%)', 'achieved_pct', '{:.1f}'),
+    ('平均队列', 'avg_queue', '{:.1f}'),
+    ('最大队列', 'max_queue', '{:d}'),
+    ('p50(ms)', 'p50', '{:.2f}'),
+    ('p95(ms)', 'p95', '{:.2f}'),
+    ('p99(ms)', 'p99', '{:.2f}'),
+    ('p99.9(ms)', 'p999', '{:.2f}'),
+]
+
+
+def parse_histogram(content):
+    """解析 --histogram 输出，返回 [(延迟ms, 次数)]"""
+    histogram = []
+    in_histogram = False
+    for line in content.splitlines():
+        if line.startswith('Latency histogram'):
+            in_histogram = True
+            continue
+        if not in_histogram:
+            continue
+        match = HISTOGRAM_ROW.match(line)
+        if match:
+            histogram.append((float(match.group(1)), int(match.group(2))))
+        elif histogram and not line.strip():
+            break
+    return histogram
+
+
+def histogram_percentile(histogram, percentile):
+    """直方图中累计次数达到该百分比的桶值"""
+    total = sum(count for _, count in histogram)
+    if not total:
+        return None
+    threshold = total * percentile / 100.0
+    cumulative = 0
+    for value, count in histogram:
+        cumulative += count
+        if cumulative >= threshold:
+            return value
+    return histogram[-1][0]
+
+
+def parse_rate_log(log_file):
+    """解析一步固定速率测试，返回该步的指标字典"""
+    with open_log(log_file) as f:
+        content = f.read()
+
+    step = {}
+    for key, pattern in (('tps', TPS_PATTERN), ('qps', QPS_PATTERN),
+                         ('avg_latency', AVG_PATTERN), ('errors', ERRORS_PATTERN)):
+        match = pattern.search(content)
+        step[key] = float(match.group(1)) if match else None
+
+    histogram = parse_histogram(content)
+    for key, percentile in PERCENTILES:
+        step[key] = histogram_percentile(histogram, percentile)
+
+    queues = [int(m.group(1)) for m in map(QUEUE_PATTERN.match, content.splitlines()) if m]
+    step['avg_queue'] = sum(queues) / len(queues) if queues else None
+    step['max_queue'] = max(queues) if queues else None
+
+    step['target_rate'] = None
+    time_file = log_file.replace('.log', '_time.log')
+    if log_exists(time_file):
+        with open_log(time_file) as f:
+            for line in f:
+                if line.startswith('TARGET_RATE:'):
+                    step['target_rate'] = float(line.split(':', 1)[1])
+    if step['target_rate'] and step['tps'] is not None:
+        step['achieved_pct'] = step['tps'] * 100 / step['target_rate']
+    else:
+        step['achieved_pct'] = None
+    return step
+
+
+def load_rate_sweeps(result_dir):
+    """读取结果目录中的所有扫描结果，返回 {场景: [按百分比排序的步骤]}"""
+    sweeps = {}
+    for log_file in glob_logs(os.path.join(result_dir, 'rate_*_*pct.log')):
+        match = RATE_LOG_PATTERN.search(os.path.basename(log_file))
+        if not match:
+            continue
+        step = parse_rate_log(log_file)
+        step['percent'] = int(match.group(2))
+        sweeps.setdefault(match.group(1), []).append(step)
+
+    for steps in sweeps.values():
+        steps.sort(key=lambda s: s['percent'])
+    return sweeps
+
+
+def format_rate_step(step):
+    """按 RATE_SWEEP_COLUMNS 格式化一步，没有数据的列显示 N/A"""
+    values = []
+    for _, key, fmt in RATE_SWEEP_COLUMNS:
+        value = step.get(key)
+        values.append(fmt.format(value) if value is not None else "N/A")
+    return values
+
+
+def render_latency_svg(series, title, width=640, height=360):
+    """延迟 - 负载曲线 (内联SVG，无外部依赖)
+
+    series: [(名称, [(负载, 延迟ms), ...])]，负载为横轴，延迟为纵轴。
+    """
+    colors = ['#2196F3', '#FF9800', '#4CAF50', '#E91E63', '#9C27B0', '#795548', '#607D8B']
+    left, right, top, bottom = 70, 20, 30, 50
+    points = [p for _, data in series for p in data if p[1] is not None]
+    if not points:
+        return ''
+
+    max_x = max(x for x, _ in points) * 1.05 or 1
+    max_y = max(y for _, y in points) * 1.1 or 1
+    plot_w = width - left - right
+    plot_h = height - top - bottom
+
+    def sx(x):
+        return left + x / max_x * plot_w
+
+    def sy(y):
+        return top + plot_h - y / max_y * plot_h
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'font-family="sans-serif" font-size="11">',
+             f'<rect width="{width}" height="{height}" fill="white"/>',
+             f'<text x="{width / 2}" y="18" text-anchor="middle" font-size="13">{title}</text>']
+    for i in range(5):
+        y = max_y * i / 4
+        x = max_x * i / 4
+        parts.append(f'<line x1="{left}" y1="{sy(y):.1f}" x2="{width - right}" y2="{sy(y):.1f}" stroke="#eee"/>')
+        parts.append(f'<text x="{left - 5}" y="{sy(y) + 4:.1f}" text-anchor="end">{y:.1f}</text>')
+        parts.append(f'<text x="{sx(x):.1f}" y="{top + plot_h + 15}" text-anchor="middle">{x:,.0f}</text>')
+    parts.append(f'<line x1="{left}" y1="{top + plot_h}" x2="{width - right}" y2="{top + plot_h}" stroke="#333"/>')
+    parts.append(f'<line x1="{left}" y1="{top}" x2="{left}" y2="{top + plot_h}" stroke="#333"/>')
+    parts.append(f'<text x="{left + plot_w / 2}" y="{height - 10}" text-anchor="middle">目标负载 (TPS)</text>')
+    parts.append(f'<text x="15" y="{top + plot_h / 2}" text-anchor="middle" '
+                 f'transform="rotate(-90 15 {top + plot_h / 2})">延迟 (ms)</text>')
+
+    for index, (name, data) in enumerate(series):
+        color = colors[index % len(colors)]
+        data = [(x, y) for x, y in data if y is not None]
+        if not data:
+            continue
+        path = ' '.join(f'{sx(x):.1f},{sy(y):.1f}' for x, y in data)
+        parts.append(f'<polyline points="{path}" fill="none" stroke="{color}" stroke-width="2"/>')
+        for x, y in data:
+            parts.append(f'<circle cx="{sx(x):.1f}" cy="{sy(y):.1f}" r="3" fill="{color}"/>')
+        legend_y = top + 5 + index * 15
+        parts.append(f'<rect x="{left + 10}" y="{legend_y}" width="10" height="10" fill="{color}"/>')
+        parts.append(f'<text x="{left + 25}" y="{legend_y + 9}">{name}</text>')
+
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+def sweep_series(steps, load_key='target_rate'):
+    """一个场景扫描结果的 p50/p95/p99 曲线，横轴为施加的目标负载"""
+    return [(name, [(s[load_key] or 0, s[key]) for s in steps])
+            for name, key in (('p50', 'p50'), ('p95', 'p95'), ('p99', 'p99'))]
+
+
+def peak_tps(result_dir, scenario):
+    """闭环测试中该场景的最高 TPS"""
+    peak = 0.0
+    for log_file, log_scenario, _ in find_result_logs(result_dir):
+        if log_scenario != scenario:
+            continue
+        with open_log(log_file) as f:
+            match = TPS_PATTERN.search(f.read())
+        if match:
+            peak = max(peak, float(match.group(1)))
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='固定速率扫描的目标速率计算')
+    parser.add_argument('action', choices=['plan'])
+    parser.add_argument('result_dir')
+    parser.add_argument('scenario')
+    parser.add_argument('--steps', default='10 25 50 75 90 100 110', help='峰值的百分比，空格分隔')
+    parser.add_argument('--peak', type=float, default=0, help='指定峰值TPS，默认取闭环测试的最高TPS')
+    args = parser.parse_args()
+
+    peak = args.peak or peak_tps(args.result_dir, args.scenario)
+    if peak <= 0:
+        print(f"错误: 找不到 {args.scenario} 的闭环测试结果，请通过 --peak 指定峰值TPS", file=sys.stderr)
+        sys.exit(1)
+
+    for percent in args.steps.split():
+        print(f"{int(percent)} {max(1, int(round(peak * int(percent) / 100.0)))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""结果包: 把一个结果目录打包为单个带索引的文件 (<目录名>.sbpack)
+
+一个结果目录有几十个小文件 (每个测试的日志与时间文件、配置快照、tsar.log)，在 NFS 上批量读取几百次历史结果
+做趋势分析时，开销主要是小文件的打开。结果包把整个目录放进一个文件:
+    SBPACK1\\n
+    <索引字节数>\\n
+    <索引 JSON>
+    <各文件的 zlib 压缩数据，依次排列>
+索引是未压缩的 JSON，只读索引就能得到:
+    members: {文件名: [分区, 偏移, 压缩后字节数, 原始字节数]}   偏移相对于数据区开头
+    cells:   每个测试的汇总 (QPS/TPS/延迟/起止时间) 与对齐窗口内的监控平均值 (monitor)
+分区 (SECTIONS): cells (每个测试的时间文件等附属记录)、series (每秒输出的日志)、monitor (tsar 等监控数据)、
+config (配置快照与场景脚本)、reports (报告与图表)、other。读取一个文件只解压它自己的数据。
+
+报告生成与合并脚本把结果包当作结果目录: 参数可以是 x.sbpack，也可以是已不存在的目录名 x (旁边有 x.sbpack)；
+结果包内文件的读取经由 compressed_logs 完成。结果包只读，报告写入旁边的 <名称>_report/ 目录。
+
+    python3 result_pack.py pack 结果目录... [-o 输出文件] [--remove]
+    python3 result_pack.py list|summary 结果包
+    python3 result_pack.py extract 结果包 [-o 目录]
+"""
+import argparse
+import fnmatch
+import io
+import json
+import os
+import shutil
+import sys
+import zlib
+from datetime import datetime
+
+PACK_SUFFIX = '.sbpack'
+PACK_MAGIC = b'SBPACK1\n'
+COMPRESS_LEVEL = 6
+CHUNK_SIZE = 256 * 1024
+
+# 文件所属分区: 按顺序取第一个匹配的 (fnmatch 模式，匹配包内文件名)
+SECTIONS = [
+    ('reports', ['performance_report.*', '*.svg']),
+    ('monitor', ['tsar.log', 'proc_sampler.log', 'client_sampler.log']),
+    ('cells', ['*_time.log', '*_perf_schema.json', '*_cpu_stacks.txt']),
+    ('series', ['*threads*.log', 'rate_*.log']),
+    ('config', ['*.txt', '*.conf', '*.json', 'scenario_scripts/*']),
+]
+# 打包时跳过的临时文件
+SKIP_PATTERNS = ['*.tmp', '*.before']
+
+# 测试汇总中保留的字段
+CELL_SUMMARY_KEYS = ['scenario', 'threads', 'qps', 'tps', 'avg_latency', 'p95_latency', 'start_time', 'end_time']
+
+# 索引缓存 {结果包路径: (修改时间, 数据区偏移, 索引)}
+_index_cache = {}
+
+
+def member_section(name):
+    for section, patterns in SECTIONS:
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            return section
+    return 'other'
+
+
+def read_index(pack):
+    """读取结果包的索引 (按修改时间缓存)，返回 (数据区偏移, 索引)；不是结果包时抛出 ValueError"""
+    mtime = os.path.getmtime(pack)
+    cached = _index_cache.get(pack)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+    with open(pack, 'rb') as f:
+        if f.readline() != PACK_MAGIC:
+            raise ValueError(f"不是结果包: {pack}")
+        length = int(f.readline())
+        index = json.loads(f.read(length).decode('utf-8'))
+        data_offset = f.tell()
+    _index_cache[pack] = (mtime, data_offset, index)
+    return data_offset, index
+
+
+def pack_path(result_dir):
+    """结果目录对应的结果包: result_dir 本身是结果包，或目录不存在而 <目录>.sbpack 存在；否则返回 None"""
+    if result_dir.endswith(PACK_SUFFIX) and os.path.isfile(result_dir):
+        return result_dir
+    candidate = result_dir.rstrip('/') + PACK_SUFFIX
+    if result_dir and not os.path.isdir(result_dir) and os.path.isfile(candidate):
+        return candidate
+    return None
+
+
+def locate_in_pack(path):
+    """结果包内的文件: 返回 (结果包, 包内文件名)，路径不在结果包中时返回 None"""
+    head, parts = path, []
+    while True:
+        head, tail = os.path.split(head)
+        if not tail:
+            return None
+        parts.insert(0, tail)
+        if not head or os.path.isdir(head):
+            return None
+        pack = pack_path(head)
+        if pack:
+            return pack, '/'.join(parts)
+
+
+def pack_member_exists(path):
+    located = locate_in_pack(path)
+    if not located:
+        return False
+    try:
+        return located[1] in read_index(located[0])[1]['members']
+    except (OSError, ValueError):
+        return False
+
+
+def glob_pack(pattern):
+    """结果包内与 pattern (目录部分为结果包或其目录名) 匹配的文件，返回与 pattern 同一目录前缀的路径"""
+    directory, name_pattern = os.path.split(pattern)
+    pack = pack_path(directory)
+    if not pack:
+        return []
+    try:
+        members = read_index(pack)[1]['members']
+    except (OSError, ValueError):
+        return []
+    return [os.path.join(directory, name) for name in members if fnmatch.fnmatch(name, name_pattern)]
+
+
+class _MemberReader(io.RawIOBase):
+    """流式解压结果包中的一个文件"""
+
+    def __init__(self, pack, offset, length):
+        self.file = open(pack, 'rb')
+        self.file.seek(offset)
+        self.remaining = length
+        self.decompressor = zlib.decompressobj()
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending:
+            if self.remaining <= 0:
+                self.pending = self.decompressor.flush()
+                if not self.pending:
+                    return 0
+                break
+            chunk = self.file.read(min(self.remaining, CHUNK_SIZE))
+            if not chunk:
+                raise OSError("结果包数据不完整")
+            self.remaining -= len(chunk)
+            self.pending = self.decompressor.decompress(chunk)
+        count = min(len(buffer), len(self.pending))
+        buffer[:count] = self.pending[:count]
+        self.pending = self.pending[count:]
+        return count
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def open_member(pack, name):
+    """以二进制方式打开结果包中的一个文件，不存在时抛出 FileNotFoundError"""
+    data_offset, index = read_index(pack)
+    if name not in index['members']:
+        raise FileNotFoundError(f"{pack}: {name}")
+    _, offset, length, _ = index['members'][name]
+    return io.BufferedReader(_MemberReader(pack, data_offset + offset, length), CHUNK_SIZE)
+
+
+def summarize_cells(result_dir):
+    """打包时写入索引的测试汇总 (与报告相同的解析与按秒对齐)"""
+    # 解析器经由 compressed_logs 依赖本模块，打包时才导入
+    from generate_report import parse_sysbench_result, parse_test_time, get_tsar_avg_for_period
+    from monitor_collectors import load_monitor_data
+    from scenarios import find_result_logs
+    from time_align import parse_sysbench_intervals, align_results
+
+    tsar_data, _ = load_monitor_data(result_dir)
+    results = []
+    for log_file, scenario, threads in find_result_logs(result_dir):
+        summary = parse_sysbench_result(log_file)
+        test_times = parse_test_time(log_file.replace('.log', '_time.log'))
+        results.append({'test': os.path.basename(log_file)[:-len('.log')], 'scenario': scenario, 'threads': threads,
+                        'qps': summary.get('qps', 0), 'tps': summary.get('tps', 0),
+                        'avg_latency': summary.get('avg_latency', 0), 'p95_latency': summary.get('p95_latency', 0),
+                        'start_time': test_times.get('start', ''), 'end_time': test_times.get('end', ''),
+                        'tsar_data': None, 'intervals': parse_sysbench_intervals(log_file),
+                        'test_times': test_times})
+    skew_info = align_results(results, tsar_data)
+
+    cells = []
+    for result in sorted(results, key=lambda r: r['start_time']):
+        monitor = result['tsar_data']
+        if not result['joined'] and result['start_time'] and result['end_time']:
+            monitor = get_tsar_avg_for_period(tsar_data, result['start_time'], result['end_time'], skew_info['skew'])
+        cell = {key: result[key] for key in ['test'] + CELL_SUMMARY_KEYS}
+        cell['monitor'] = ({key: round(value, 3) for key, value in monitor.items() if isinstance(value, (int, float))}
+                           if monitor else None)
+        cells.append(cell)
+    return cells
+
+
+def _logical_files(result_dir):
+    """结果目录中的文件 {包内文件名: 路径}；压缩的文件 (.gz/.xz/.zst) 以未压缩的文件名打包"""
+    from compressed_logs import COMPRESSED_SUFFIXES
+    files = {}
+    for root, _, names in os.walk(result_dir):
+        for name in sorted(names):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in SKIP_PATTERNS):
+                continue
+            relative = os.path.relpath(os.path.join(root, name), result_dir).replace(os.sep, '/')
+            for suffix in COMPRESSED_SUFFIXES:
+                if relative.endswith(suffix):
+                    relative = relative[:-len(suffix)]
+                    break
+            files.setdefault(relative, os.path.join(result_dir, relative))
+    return files
+
+
+def pack_result_dir(result_dir, output=None, level=COMPRESS_LEVEL):
+    """把结果目录打包为结果包，返回 (结果包路径, 文件数, 原始字节数, 结果包字节数)"""
+    from compressed_logs import open_log_bytes
+    output = output or result_dir.rstrip('/') + PACK_SUFFIX
+    cells = summarize_cells(result_dir)
+    members = {}
+    data_file = output + '.data.tmp'
+    with open(data_file, 'wb') as data:
+        for name, path in sorted(_logical_files(result_dir).items()):
+            offset = data.tell()
+            size = 0
+            compressor = zlib.compressobj(level)
+            with open_log_bytes(path) as source:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    data.write(compressor.compress(chunk))
+            data.write(compressor.flush())
+            members[name] = [member_section(name), offset, data.tell() - offset, size]
+
+    index = json.dumps({'format': 1, 'source': os.path.basename(result_dir.rstrip('/')),
+                        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        'members': members, 'cells': cells}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    temp = output + '.tmp'
+    with open(temp, 'wb') as out, open(data_file, 'rb') as data:
+        out.write(PACK_MAGIC)
+        out.write(f"{len(index)}\n".encode())
+        out.write(index)
+        shutil.copyfileobj(data, out, CHUNK_SIZE)
+    os.remove(data_file)
+    os.replace(temp, output)
+    return output, len(members), sum(m[3] for m in members.values()), os.path.getsize(output)
+
+
+def verify_pack(pack):
+    """逐个解压结果包中的文件并核对原始字节数，返回不一致的文件名列表"""
+    bad = []
+    for name, (_, _, _, size) in read_index(pack)[1]['members'].items():
+        try:
+            with open_member(pack, name) as f:
+                if sum(len(chunk) for chunk in iter(lambda: f.read(CHUNK_SIZE), b'')) != size:
+                    bad.append(name)
+        except (OSError, zlib.error):
+            bad.append(name)
+    return bad
+
+
+def extract_pack(pack, output_dir):
+    """把结果包还原为结果目录"""
+    for name in read_index(pack)[1]['members']:
+        target = os.path.join(output_dir, *name.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open_member(pack, name) as source, open(target, 'wb') as out:
+            shutil.copyfileobj(source, out, CHUNK_SIZE)
+
+
+def report_dir(result_dir):
+    """报告的输出目录: 结果目录本身；结果包为旁边的 <名称>_report/ (不存在时创建)"""
+    pack = pack_path(result_dir)
+    if not pack:
+        return result_dir
+    output = pack[:-len(PACK_SUFFIX)] + '_report'
+    os.makedirs(output, exist_ok=True)
+    return output
+
+
+def report_path(result_dir, name):
+    """读取报告文件的路径: 结果包优先取 <名称>_report/ 中生成的报告，没有时取包内的同名文件 (打包前生成的报告)"""
+    pack = pack_path(result_dir)
+    if pack:
+        generated = os.path.join(pack[:-len(PACK_SUFFIX)] + '_report', name)
+        if os.path.exists(generated):
+            return generated
+    return os.path.join(result_dir, name)
+
+
+def print_summary(pack):
+    _, index = read_index(pack)
+    print(f"{pack}: 来自 {index['source']}，打包于 {index['created']}，{len(index['members'])} 个文件")
+    print(f"{'测试':<36} {'QPS':>12} {'TPS':>10} {'p95(ms)':>8} {'CPU用户%':>8} {'IO利用率%':>8}  开始时间")
+    for cell in index['cells']:
+        monitor = cell['monitor'] or {}
+        cpu = f"{monitor['cpu_user']:.1f}" if 'cpu_user' in monitor else '-'
+        io_util = f"{monitor['io_util']:.1f}" if 'io_util' in monitor else '-'
+        print(f"{cell['test']:<36} {cell['qps']:>12,.0f} {cell['tps']:>10,.0f} {cell['p95_latency']:>8.2f} "
+              f"{cpu:>10} {io_util:>11}  {cell['start_time']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='结果目录的单文件结果包')
+    parser.add_argument('action', choices=['pack', 'list', 'summary', 'extract'])
+    parser.add_argument('paths', nargs='+', help='结果目录 (pack) 或结果包')
+    parser.add_argument('-o', '--output', help='输出文件 (pack，只能有一个结果目录) 或目录 (extract)')
+    parser.add_argument('--remove', action='store_true', help='打包并校验成功后删除结果目录')
+    args = parser.parse_args()
+    if args.output and len(args.paths) > 1:
+        parser.error('指定 -o 时只能有一个结果目录或结果包')
+
+    for path in args.paths:
+        try:
+            if args.action == 'pack':
+                if not os.path.isdir(path):
+                    print(f"错误: 结果目录不存在: {path}")
+                    sys.exit(1)
+                pack, count, raw, packed = pack_result_dir(path, args.output)
+                bad = verify_pack(pack)
+                if bad:
+                    print(f"错误: {pack} 校验失败: {', '.join(bad)}")
+                    sys.exit(1)
+                print(f"{pack}: {count} 个文件，{raw / 1024 / 1024:.1f} MB -> {packed / 1024 / 1024:.1f} MB")
+                if args.remove:
+                    shutil.rmtree(path)
+            elif args.action == 'list':
+                for name, (section, _, length, size) in read_index(path)[1]['members'].items():
+                    print(f"{section:<8} {size:>12,} {length:>12,}  {name}")
+            elif args.action == 'summary':
+                print_summary(path)
+            else:
+                output = args.output or (path[:-len(PACK_SUFFIX)] if path.endswith(PACK_SUFFIX) else None)
+                if not output or os.path.exists(output):
+                    print("错误: 需要一个不存在的输出目录 (-o)")
+                    sys.exit(1)
+                extract_pack(path, output)
+                print(f"已还原: {output}")
+        except (OSError, ValueError) as e:
+            print(f"错误: {path}: {e}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
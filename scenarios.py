@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""压测场景定义: 场景ID、sysbench 脚本与参数
+
+配置中的 SCENARIOS 列出场景ID。内置场景 (oltp_point_select 等) 不需要额外定义；
+自定义场景可以指向任意 Lua 脚本并带上各自的参数:
+    SCENARIO_<ID>_SCRIPT=oltp_read_only 或 /path/to/order_mix.lua   (默认与场景ID相同)
+    SCENARIO_<ID>_OPTS="--range_size=1000 --skip_trx=on --rand-type=uniform"
+
+结果文件名为 <场景ID>_<并发数>threads.log，对应的 _time.log 中记录参数清单:
+    SCENARIO_ID / SCENARIO_SCRIPT / SCENARIO_OPTS / SCENARIO_SCRIPT_MD5 (Lua 文件)
+旧的结果没有参数清单，按内置场景处理。
+"""
+import os
+import re
+
+from compressed_logs import glob_logs, log_exists, open_log
+
+# <场景ID>_<并发数>threads.log；_attemptN.log、_mysql_status.log 等附属文件不匹配
+RESULT_LOG_PATTERN = re.compile(r'^(\w+?)_(\d+)threads\.log$')
+
+# 报告中展示的列: (列名, 键)
+SCENARIO_COLUMNS = [
+    ('场景ID', 'id'),
+    ('脚本', 'script'),
+    ('参数', 'opts'),
+    ('脚本MD5', 'script_md5'),
+]
+
+
+def find_result_logs(result_dir):
+    """结果目录中的所有测试日志，返回 [(日志路径, 场景ID, 并发数)]"""
+    logs = []
+    for log_file in glob_logs(os.path.join(result_dir, '*_*threads.log')):
+        match = RESULT_LOG_PATTERN.match(os.path.basename(log_file))
+        if match:
+            logs.append((log_file, match.group(1), int(match.group(2))))
+    return sorted(logs)
+
+
+def parse_scenario_manifest(time_file):
+    """读取测试时间文件中的参数清单，没有清单 (旧格式) 时返回 None"""
+    keys = {'SCENARIO_ID': 'id', 'SCENARIO_SCRIPT': 'script',
+            'SCENARIO_OPTS': 'opts', 'SCENARIO_SCRIPT_MD5': 'script_md5'}
+    manifest = {}
+    if log_exists(time_file):
+        with open_log(time_file) as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key.strip() in keys:
+                    manifest[keys[key.strip()]] = value.strip()
+    return manifest if 'id' in manifest else None
+
+
+def collect_scenario_definitions(results):
+    """按场景ID汇总参数清单 (取每个场景第一个带清单的测试)，返回按场景ID排序的列表"""
+    definitions = {}
+    for result in results:
+        manifest = result.get('scenario_manifest')
+        if manifest and result['scenario'] not in definitions:
+            definitions[result['scenario']] = manifest
+    return [definitions[scenario] for scenario in sorted(definitions)]
+
+
+def format_scenario(definition):
+    """按 SCENARIO_COLUMNS 格式化一个场景定义，没有的值显示 -"""
+    values = []
+    for _, key in SCENARIO_COLUMNS:
+        value = definition.get(key) or '-'
+        if key == 'script_md5' and value != '-':
+            value = value[:12]
+        values.append(value)
+    return values
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""服务器配置快照与跨环境配置差异
+
+压测开始前 mysql_benchmark.sh 在结果目录中保存:
+    mysql_global_variables.txt  完整的 SHOW GLOBAL VARIABLES (mysql -N -B 输出，制表符分隔)
+    system_config.txt           服务器的 "键 = 值" 列表: 内核版本、sysctl -a、CPU调频策略、
+                                透明大页 (THP) 与各块设备的IO调度器
+合并报告读取各环境的这两个文件，只列出各环境取值不同的设置，按 PERFORMANCE_SETTINGS 中与性能
+相关的顺序排在前面，其余不同的设置按名称排序；主机名、UUID、随机数等每台机器必然不同的设置不参与比较。
+"""
+import fnmatch
+import os
+import re
+
+from compressed_logs import log_exists, open_log
+
+MYSQL_VARIABLES_FILE = 'mysql_global_variables.txt'
+SYSTEM_CONFIG_FILE = 'system_config.txt'
+
+# 与性能相关的设置，按影响程度大致排序；合并报告中优先展示，即使某个环境缺少该设置
+PERFORMANCE_SETTINGS = {
+    'mysql': [
+        'version', 'innodb_buffer_pool_size', 'innodb_buffer_pool_instances',
+        'innodb_flush_log_at_trx_commit', 'sync_binlog', 'log_bin', 'binlog_format', 'binlog_row_image',
+        'innodb_flush_method', 'innodb_io_capacity', 'innodb_io_capacity_max', 'innodb_doublewrite',
+        'innodb_redo_log_capacity', 'innodb_log_file_size', 'innodb_log_files_in_group',
+        'innodb_log_buffer_size', 'innodb_flush_neighbors', 'innodb_page_cleaners', 'innodb_lru_scan_depth',
+        'innodb_read_io_threads', 'innodb_write_io_threads', 'innodb_purge_threads',
+        'innodb_thread_concurrency', 'innodb_spin_wait_delay', 'innodb_adaptive_hash_index',
+        'innodb_change_buffering', 'transaction_isolation', 'tx_isolation', 'performance_schema',
+        'max_connections', 'thread_handling', 'thread_cache_size', 'table_open_cache',
+        'table_open_cache_instances', 'query_cache_type', 'query_cache_size',
+    ],
+    'system': [
+        'kernel.release', 'cpu.governor', 'thp.enabled', 'thp.defrag', 'disk.scheduler',
+        'kernel.numa_balancing', 'vm.zone_reclaim_mode', 'vm.swappiness', 'vm.dirty_ratio',
+        'vm.dirty_background_ratio', 'vm.dirty_expire_centisecs', 'vm.dirty_writeback_centisecs',
+        'kernel.sched_migration_cost_ns', 'kernel.sched_autogroup_enabled',
+        'net.core.somaxconn', 'net.core.netdev_max_backlog', 'net.ipv4.tcp_max_syn_backlog',
+        'net.core.rmem_max', 'net.core.wmem_max', 'net.ipv4.tcp_tw_reuse', 'fs.aio-max-nr', 'fs.file-max',
+    ],
+}
+
+# 每台机器必然不同、与性能无关的设置 (fnmatch 模式)
+IGNORED_SETTINGS = {
+    'mysql': [
+        'hostname', 'server_uuid', 'server_id', 'report_host', 'pid_file', 'socket', 'mysqlx_socket',
+        'log_error', 'general_log_file', 'slow_query_log_file', 'relay_log*', 'log_bin_basename',
+        'log_bin_index', 'gtid_executed', 'gtid_purged', 'timestamp', 'ssl_*',
+    ],
+    'system': [
+        'kernel.hostname', 'kernel.domainname', 'kernel.random.*', 'kernel.ns_last_pid', 'kernel.pty.nr',
+        'kernel.tainted', 'kernel.perf_event_max_sample_rate', 'kernel.sched_domain.*',
+        'fs.dentry-state', 'fs.inode-nr', 'fs.inode-state', 'fs.file-nr', 'fs.quota.*', 'fs.binfmt_misc.*',
+        'net.*.conf.*', 'net.*.neigh.*', 'dev.*', 'block.*',
+    ],
+}
+# 合并报告中 "其他设置" 最多列出的行数
+MAX_OTHER_DIFFS = 30
+# 单元格中取值的最大长度 (sql_mode、optimizer_switch 等很长)
+MAX_VALUE_LENGTH = 60
+
+
+def _selected(value):
+    """取值形如 "always [madvise] never" 时只保留方括号中选中的项"""
+    match = re.search(r'\[([^\]]+)\]', value)
+    return match.group(1) if match else value.strip()
+
+
+def parse_mysql_variables(path):
+    """SHOW GLOBAL VARIABLES 的输出 {变量: 值}；文件不存在时返回空字典"""
+    variables = {}
+    if log_exists(path):
+        with open_log(path, errors='replace') as f:
+            for line in f:
+                name, sep, value = line.rstrip('\n').partition('\t')
+                if sep and name != 'Variable_name':
+                    variables[name] = value
+    return variables
+
+
+def parse_system_config(path):
+    """系统快照 {键: 值}；各块设备的调度器合并为 disk.scheduler"""
+    settings = {}
+    if log_exists(path):
+        with open_log(path, errors='replace') as f:
+            for line in f:
+                key, sep, value = line.rstrip('\n').partition(' = ')
+                if sep:
+                    settings[key.strip()] = value.strip()
+    for key in ('thp.enabled', 'thp.defrag'):
+        if key in settings:
+            settings[key] = _selected(settings[key])
+    schedulers = sorted(f"{key.split('.')[1]}: {_selected(value)}"
+                        for key, value in settings.items() if key.startswith('block.'))
+    if schedulers:
+        settings['disk.scheduler'] = ', '.join(schedulers)
+    return settings
+
+
+def load_server_settings(result_dir):
+    """一个结果目录的配置快照 {'mysql': {...}, 'system': {...}}"""
+    return {'mysql': parse_mysql_variables(os.path.join(result_dir, MYSQL_VARIABLES_FILE)),
+            'system': parse_system_config(os.path.join(result_dir, SYSTEM_CONFIG_FILE))}
+
+
+def config_diff(settings_by_env, kind):
+    """各环境取值不同的设置，返回 (性能相关的行, 其他行)，每行为 (设置, [各环境的值或 None])
+
+    性能相关的设置按 PERFORMANCE_SETTINGS 的顺序，只要有一个环境的值不同 (包括缺少) 就列出；
+    其他设置只比较所有环境都有的，按名称排序。
+    """
+    values = [settings[kind] for settings in settings_by_env]
+    # 没有快照文件的环境 (旧的结果) 不参与比较
+    envs = [env for env in values if env]
+    if len(envs) < 2:
+        return [], []
+
+    def differs(name):
+        return len({env.get(name) for env in envs}) > 1
+
+    curated = [name for name in PERFORMANCE_SETTINGS[kind]
+               if any(name in env for env in envs) and differs(name)]
+    common = set.intersection(*(set(env) for env in envs))
+    others = sorted(name for name in common
+                    if name not in PERFORMANCE_SETTINGS[kind] and differs(name)
+                    and not any(fnmatch.fnmatch(name, pattern) for pattern in IGNORED_SETTINGS[kind]))
+    return ([(name, [env.get(name) for env in values]) for name in curated],
+            [(name, [env.get(name) for env in values]) for name in others])
+
+
+def _cell(value):
+    if value is None:
+        return '-'
+    value = value.replace('|', '\\|') or '(空)'
+    return value if len(value) <= MAX_VALUE_LENGTH else value[:MAX_VALUE_LENGTH - 1] + '…'
+
+
+def config_diff_markdown(env_names, settings_by_env):
+    """合并报告中的配置差异表格 (Markdown)，没有任何环境的快照时返回空字符串"""
+    if sum(1 for settings in settings_by_env if settings['mysql'] or settings['system']) < 2:
+        return ''
+    output = "\n### 配置差异\n\n只列出各环境取值不同的设置，与性能相关的设置排在前面 (加粗)；"
+    output += f"完整配置见各环境结果目录的 {MYSQL_VARIABLES_FILE} 与 {SYSTEM_CONFIG_FILE}\n"
+    for kind, title in (('mysql', 'MySQL 全局变量'), ('system', '操作系统')):
+        curated, others = config_diff(settings_by_env, kind)
+        output += f"\n#### {title}\n\n"
+        if not curated and not others:
+            output += "各环境相同 (或缺少快照)\n"
+            continue
+        output += "| 设置 |" + "".join(f" {env} |" for env in env_names) + "\n"
+        output += "|------|" + "".join("------|" for _ in env_names) + "\n"
+        for name, values in curated:
+            output += f"| **{name}** |" + "".join(f" {_cell(v)} |" for v in values) + "\n"
+        for name, values in others[:MAX_OTHER_DIFFS]:
+            output += f"| {name} |" + "".join(f" {_cell(v)} |" for v in values) + "\n"
+        if len(others) > MAX_OTHER_DIFFS:
+            output += f"\n另有 {len(others) - MAX_OTHER_DIFFS} 项不同的设置未列出\n"
+    return output
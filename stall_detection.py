@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""吞吐停顿与下跌检测
+
+长时间的 write_only 测试中常有几秒 tps 接近 0 (checkpoint 集中刷脏、redo 日志写满等待)，
+整轮平均值看不出来。这里在每秒结果上维护滚动基线 (前 BASELINE_SECONDS 个正常秒 tps 的中位数)，
+tps 低于基线 DIP_RATIO 的连续秒数合并为一个事件，最低点低于基线 STALL_RATIO 时记为停顿，否则为下跌。
+每个事件与按秒对齐的同一时刻的 tsar 样本对照 (IO利用率、CPU等待、软中断、CPU繁忙)，
+按 time_align.WINDOW_METRICS 的饱和阈值推断可能饱和的资源。
+"""
+from collections import deque
+
+from time_align import WINDOW_METRICS
+
+# 滚动基线的秒数 (中位数对短于一半窗口的停顿不敏感)
+BASELINE_SECONDS = 30
+# 基线至少需要的秒数；开头的爬升阶段不检测
+MIN_BASELINE_SECONDS = 5
+# tps 低于基线该比例视为下跌，事件最低点低于基线该比例视为停顿
+DIP_RATIO = 0.5
+STALL_RATIO = 0.1
+# 相隔不超过该秒数的异常秒合并为一个事件
+MERGE_GAP = 1
+# 基线 tps 低于该值时不检测 (空闲或极低负载)
+MIN_BASELINE_TPS = 1.0
+# 报告中每个测试最多列出的事件数 (按持续时间取最长的)
+MAX_REPORTED_EVENTS = 20
+
+SATURATION = {metric: threshold for metric, _, threshold in WINDOW_METRICS}
+
+# 报告中展示的列: (列名, 事件键, 格式)
+STALL_COLUMNS = [
+    ('开始时间', 'start', '{}'),
+    ('持续(s)', 'duration', '{:d}'),
+    ('类型', 'kind', '{}'),
+    ('基线TPS', 'baseline_tps', '{:,.0f}'),
+    ('最低TPS', 'min_tps', '{:,.0f}'),
+    ('最低/基线(%)', 'min_ratio', '{:.0f}'),
+    ('IO利用率峰值(%)', 'io_util', '{:.1f}'),
+    ('CPU等待峰值(%)', 'cpu_wait', '{:.1f}'),
+    ('软中断峰值(%)', 'cpu_sirq', '{:.1f}'),
+    ('CPU繁忙峰值(%)', 'cpu_busy', '{:.1f}'),
+    ('可能的瓶颈', 'resource', '{}'),
+]
+
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def _rows(result):
+    """按秒对齐的行；没有对齐结果时用每秒结果 (没有时间戳与监控样本)"""
+    if result.get('joined'):
+        return result['joined']
+    return [{'sec': iv['sec'], 'client_ts': None, 'interval': iv, 'tsar': None}
+            for iv in result.get('intervals') or []]
+
+
+def find_dips(rows):
+    """tps 低于滚动基线 DIP_RATIO 的秒，返回 [(行, 基线tps)]
+
+    异常秒不进入基线窗口，否则长停顿会把中位数拉向 0，停顿未结束就不再被识别。
+    """
+    window = deque(maxlen=BASELINE_SECONDS)
+    dips = []
+    for row in rows:
+        tps = row['interval']['tps']
+        if len(window) >= MIN_BASELINE_SECONDS:
+            baseline = _median(window)
+            if baseline >= MIN_BASELINE_TPS and tps < baseline * DIP_RATIO:
+                dips.append((row, baseline))
+                continue
+        window.append(tps)
+    return dips
+
+
+def likely_resource(peaks):
+    """事件期间监控峰值 -> 可能饱和的资源"""
+    if not peaks:
+        return '无监控数据'
+    if peaks['io_util'] >= SATURATION['io_util']:
+        return '磁盘IO饱和'
+    if peaks['cpu_wait'] >= SATURATION['cpu_wait']:
+        return 'IO等待'
+    if peaks['cpu_busy'] >= SATURATION['cpu_busy']:
+        return 'CPU饱和'
+    if peaks['cpu_sirq'] >= SATURATION['cpu_sirq']:
+        return '软中断 (网络)'
+    return '系统资源未饱和 (锁、刷脏或redo等MySQL内部等待)'
+
+
+def _event(group):
+    """一组连续的异常秒 -> 事件"""
+    rows = [row for row, _ in group]
+    baseline = group[0][1]
+    min_tps = min(row['interval']['tps'] for row in rows)
+    samples = [row['tsar'] for row in rows if row['tsar']]
+    peaks = None
+    if samples:
+        peaks = {'io_util': max(s['io_util'] for s in samples),
+                 'cpu_wait': max(s['cpu_wait'] for s in samples),
+                 'cpu_sirq': max(s['cpu_sirq'] for s in samples),
+                 'cpu_busy': max(s['cpu_user'] + s['cpu_sys'] + s['cpu_sirq'] for s in samples)}
+    first = rows[0]
+    return {
+        'sec': first['sec'],
+        'start': first['client_ts'].strftime('%H:%M:%S') if first['client_ts'] else f"第{first['sec']}秒",
+        'duration': rows[-1]['sec'] - first['sec'] + 1,
+        'kind': '停顿' if min_tps < baseline * STALL_RATIO else '下跌',
+        'baseline_tps': baseline,
+        'min_tps': min_tps,
+        'min_ratio': min_tps * 100 / baseline,
+        'io_util': peaks and peaks['io_util'],
+        'cpu_wait': peaks and peaks['cpu_wait'],
+        'cpu_sirq': peaks and peaks['cpu_sirq'],
+        'cpu_busy': peaks and peaks['cpu_busy'],
+        'resource': likely_resource(peaks),
+    }
+
+
+def detect_stalls(result):
+    """一个测试的停顿与下跌事件，按开始时间排序"""
+    groups = []
+    for row, baseline in find_dips(_rows(result)):
+        if groups and row['sec'] - groups[-1][-1][0]['sec'] <= MERGE_GAP + 1:
+            groups[-1].append((row, baseline))
+        else:
+            groups.append([(row, baseline)])
+    return [_event(group) for group in groups]
+
+
+def reported_stalls(events):
+    """报告中列出的事件: 持续时间最长的 MAX_REPORTED_EVENTS 个，按开始时间排序"""
+    longest = sorted(events, key=lambda event: -event['duration'])[:MAX_REPORTED_EVENTS]
+    return sorted(longest, key=lambda event: event['sec'])
+
+
+def format_stall(event):
+    """停顿表的一行；没有监控数据的列显示 '-'"""
+    return ['-' if event[key] is None else fmt.format(event[key]) for _, key, fmt in STALL_COLUMNS]
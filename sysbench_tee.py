@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""带时间戳的 tee: 转发 sysbench 输出，并记录毫秒级的运行时间点
+
+用法: sysbench ... run 2>&1 | python3 sysbench_tee.py <日志文件> <时间文件>
+
+时间文件中追加以下记录 (epoch 毫秒 + 单调时钟毫秒):
+    TEST_START_*        开始读取输出 (与 sysbench 进程同时启动)
+    THREADS_STARTED_*   输出 "Threads started!" 的时刻，即负载真正开始
+    STATS_PRINTED_*     输出 "SQL statistics:" 的时刻，即负载结束
+    TEST_END_*          输出结束 (sysbench 退出)
+单调时钟不受 NTP 调整影响，解析时以 TEST_START 的 epoch 为锚点换算其余时间点。
+"""
+import sys
+import time
+
+MARKERS = [
+    ('Threads started!', 'THREADS_STARTED'),
+    ('SQL statistics:', 'STATS_PRINTED'),
+]
+
+
+def timestamp_lines(name):
+    """返回某个时间点的 epoch 毫秒与单调时钟毫秒记录"""
+    epoch_ms = int(time.time() * 1000)
+    mono_ms = int(time.monotonic() * 1000)
+    return f"{name}_EPOCH_MS: {epoch_ms}\n{name}_MONO_MS: {mono_ms}\n"
+
+
+def main(log_file, time_file):
+    with open(time_file, 'a') as times, open(log_file, 'w') as log:
+        times.write(timestamp_lines('TEST_START'))
+        times.flush()
+
+        seen = set()
+        for line in sys.stdin:
+            stamp = None
+            for marker, name in MARKERS:
+                if name not in seen and line.startswith(marker):
+                    seen.add(name)
+                    stamp = timestamp_lines(name)
+                    break
+
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            log.write(line)
+            if stamp:
+                times.write(stamp)
+                times.flush()
+
+        times.write(timestamp_lines('TEST_END'))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("用法: sysbench ... 2>&1 | python3 sysbench_tee.py <日志文件> <时间文件>")
+        sys.exit(1)
+
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""sysbench 每秒结果与 tsar 监控数据的按秒对齐
+
+客户端 (sysbench) 与服务端 (tsar) 使用各自的时钟。这里先用每秒 tps 序列与
+tsar CPU 利用率估计两端的时钟偏差，再把每个测试的每秒结果与同一秒的
+tsar 样本逐秒拼接，CPU/IO 指标只取负载真正运行的那些秒。
+每个测试窗口除平均值外还给出各指标的中位数、p95、最大值、标准差与达到饱和阈值的秒数占比，
+平均值相同的两次测试可能一次平稳、一次在 20% 与 100% 之间摆动。
+"""
+import bisect
+import math
+import re
+from datetime import datetime, timedelta
+
+from compressed_logs import open_log
+
+# [ 1s ] thds: 8 tps: 2846.23 qps: 56994.47 (r/w/o: 39909.11/11384.91/5700.45) lat (ms,95%): 4.10 err/s: 0.00 reconn/s: 0.00
+INTERVAL_PATTERN = re.compile(
+    r'^\[\s*(\d+)s\s*\]\s+thds:\s+(\d+)\s+tps:\s+(\d+\.?\d*)\s+qps:\s+(\d+\.?\d*)\s+'
+    r'\(r/w/o:\s+(\d+\.?\d*)/(\d+\.?\d*)/(\d+\.?\d*)\)\s+'
+    r'lat\s+\(ms,(\d+)%\):\s+(\d+\.?\d*)\s+'
+    r'err/s:\s+(\d+\.?\d*)\s+reconn/s:\s+(\d+\.?\d*)'
+)
+
+# 时钟偏差搜索范围 (秒)，与原先最宽松的 ±5 分钟匹配窗口一致
+MAX_CLOCK_SKEW = 300
+# 整轮压测前后参与拟合的空闲秒数；压测前后常有其他负载，不宜取得太长
+IDLE_MARGIN = 10
+# 拟合度低于该值时认为估计不可靠，按 0 秒偏差对齐
+MIN_SKEW_CORRELATION = 0.3
+# 参与拟合的最少重叠秒数
+MIN_SKEW_SAMPLES = 10
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 监控窗口分布统计的指标: (键, 名称, 饱和阈值%)；cpu_busy = 用户 + 系统 + 软中断
+WINDOW_METRICS = [
+    ('cpu_user', 'CPU用户', 80),
+    ('cpu_sys', 'CPU系统', 30),
+    ('cpu_wait', 'CPU等待', 20),
+    ('cpu_sirq', 'CPU软中断', 10),
+    ('cpu_busy', 'CPU繁忙', 90),
+    ('io_util', 'IO利用率', 90),
+]
+
+# 监控指标分布表的列: (列名, 键, 格式)
+WINDOW_STAT_COLUMNS = [
+    ('平均', 'mean', '{:.1f}'),
+    ('中位数', 'p50', '{:.1f}'),
+    ('p95', 'p95', '{:.1f}'),
+    ('最大', 'max', '{:.1f}'),
+    ('标准差', 'std', '{:.1f}'),
+    ('饱和秒数占比(%)', 'saturated', '{:.1f}'),
+]
+
+
+def parse_sysbench_intervals(log_file):
+    """解析sysbench每秒输出 (--report-interval=1)，返回按秒排序的列表"""
+    intervals = {}
+
+    with open_log(log_file) as f:
+        for line in f:
+            match = INTERVAL_PATTERN.match(line.strip())
+            if not match:
+                continue
+
+            sec = int(match.group(1))
+            # 同一秒重复出现时保留第一次的记录
+            if sec in intervals:
+                continue
+
+            intervals[sec] = {
+                'sec': sec,
+                'threads': int(match.group(2)),
+                'tps': float(match.group(3)),
+                'qps': float(match.group(4)),
+                'reads': float(match.group(5)),
+                'writes': float(match.group(6)),
+                'others': float(match.group(7)),
+                'lat_percentile': int(match.group(8)),
+                'latency': float(match.group(9)),
+                'err': float(match.group(10)),
+                'reconn': float(match.group(11))
+            }
+
+    return [intervals[sec] for sec in sorted(intervals)]
+
+
+def get_load_start(test_times):
+    """返回负载起始时刻 (客户端时钟)，即每秒结果 [ 0s ] 对应的时间点
+
+    有毫秒级的 "Threads started!" 时刻时优先使用，否则退回秒级的 TEST_START_TIME。
+    """
+    if test_times.get('threads_started_ms'):
+        return datetime.fromtimestamp(test_times['threads_started_ms'] / 1000.0)
+    if not test_times.get('start'):
+        return None
+    try:
+        return datetime.strptime(test_times['start'], TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def _cpu_util(sample):
+    """tsar样本的CPU总利用率"""
+    if 'cpu_util' in sample:
+        return sample['cpu_util']
+    return sample['cpu_user'] + sample['cpu_sys'] + sample['cpu_wait'] + sample['cpu_sirq']
+
+
+def _round_second(ts):
+    """取与 (ts-1, ts] 重叠最多的整秒，即tsar样本的时间戳"""
+    return (ts + timedelta(microseconds=500000)).replace(microsecond=0)
+
+
+def _client_activity(results):
+    """按客户端时间索引的负载序列: 有吞吐量的秒标记为所属测试的序号"""
+    activity = {}
+    for index, result in enumerate(results):
+        start_dt = get_load_start(result.get('test_times', {}))
+        intervals = result.get('intervals')
+        if start_dt is None or not intervals:
+            continue
+
+        for iv in intervals:
+            if iv['tps'] > 0 or iv['qps'] > 0:
+                activity[_round_second(start_dt + timedelta(seconds=iv['sec']))] = index
+
+    return activity
+
+
+def _correlation_ratio(groups, values):
+    """相关比 eta²: 分组均值能解释的方差比例"""
+    totals = {}
+    for group, value in zip(groups, values):
+        acc = totals.setdefault(group, [0, 0.0])
+        acc[0] += 1
+        acc[1] += value
+
+    mean = sum(values) / len(values)
+    ss_total = sum((value - mean) ** 2 for value in values)
+    if ss_total <= 0:
+        return 0.0
+    ss_between = sum(n * (total / n - mean) ** 2 for n, total in totals.values())
+    return ss_between / ss_total
+
+
+def estimate_clock_skew(results, tsar_data, max_skew=MAX_CLOCK_SKEW):
+    """估计时钟偏差: 服务端时间 = 客户端时间 + skew 秒
+
+    各测试的吞吐量与CPU水平并不成固定比例，直接对 tps 与 CPU 做线性互相关
+    容易在周期相同的测试之间错位。这里把每秒 tps 序列看作按测试分段的负载
+    信号 (空闲秒单独成组)，对每个候选偏差计算 CPU 利用率在这些分段上的
+    相关比，再乘以tsar对客户端秒的覆盖率 (对不上样本的秒视为无法解释)，
+    取拟合最好的偏差，负载的起止边沿决定峰值位置。
+    """
+    skew_info = {'skew': 0, 'corr': None, 'samples': 0, 'reliable': False}
+
+    activity = _client_activity(results)
+    if not activity or not tsar_data:
+        return skew_info
+
+    # 前后各留出一段空闲时间，让整轮压测的起止边沿参与拟合
+    first = min(activity) - timedelta(seconds=IDLE_MARGIN)
+    seconds = int((max(activity) - first).total_seconds()) + 1 + IDLE_MARGIN
+    client_series = [activity.get(first + timedelta(seconds=i), -1) for i in range(seconds)]
+
+    # 以客户端序列起点为原点的整数秒索引，避免在搜索循环里反复构造时间对象
+    server_util = {}
+    for ts, sample in tsar_data.items():
+        offset = int((ts - first).total_seconds())
+        if -max_skew <= offset < seconds + max_skew:
+            server_util[offset] = _cpu_util(sample)
+
+    best = None
+    # 按偏差绝对值从小到大搜索，拟合度相同时优先选择较小的偏差
+    for skew in sorted(range(-max_skew, max_skew + 1), key=abs):
+        groups = []
+        values = []
+        for i, group in enumerate(client_series):
+            util = server_util.get(i + skew)
+            if util is not None:
+                groups.append(group)
+                values.append(util)
+        # 重叠部分必须同时包含负载秒和空闲秒
+        if len(values) < MIN_SKEW_SAMPLES or -1 not in groups or len(set(groups)) < 2:
+            continue
+
+        corr = _correlation_ratio(groups, values) * len(values) / seconds
+        if best is None or corr > best['corr'] + 1e-9:
+            best = {'skew': skew, 'corr': corr, 'samples': len(values)}
+
+    if best is None:
+        return skew_info
+
+    skew_info.update(best)
+    skew_info['reliable'] = best['corr'] >= MIN_SKEW_CORRELATION
+    if not skew_info['reliable']:
+        skew_info['skew'] = 0
+    return skew_info
+
+
+def join_per_second(intervals, start_dt, tsar_data, skew=0):
+    """把每秒sysbench结果与同一秒的tsar样本拼接
+
+    [ Ns ] 覆盖客户端时间 (start+N-1, start+N]，tsar 在 T 时刻的样本覆盖 (T-1, T]，
+    因此对应的服务端时刻为 start + N + skew (取整到重叠最多的那一秒)。
+    """
+    rows = []
+    for iv in intervals:
+        client_ts = start_dt + timedelta(seconds=iv['sec'])
+        server_ts = _round_second(client_ts + timedelta(seconds=skew))
+        rows.append({
+            'sec': iv['sec'],
+            'client_ts': client_ts,
+            'server_ts': server_ts,
+            'interval': iv,
+            'tsar': tsar_data.get(server_ts)
+        })
+    return rows
+
+
+def _percentile(values, percentile):
+    """已排序序列的百分位数 (线性插值)"""
+    position = (len(values) - 1) * percentile / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def window_stats(samples):
+    """窗口内每个指标的分布: {指标: {'mean','p50','p95','max','std','saturated'}}
+
+    saturated 为达到饱和阈值 (WINDOW_METRICS) 的秒数占比 (%)。每个指标排序一次，
+    分位数、最大值与饱和秒数都从排序后的序列得到。
+    """
+    count = len(samples)
+    stats = {}
+    for metric, _, threshold in WINDOW_METRICS:
+        if metric == 'cpu_busy':
+            values = sorted(s['cpu_user'] + s['cpu_sys'] + s['cpu_sirq'] for s in samples)
+        else:
+            values = sorted(s[metric] for s in samples)
+        mean = sum(values) / count
+        stats[metric] = {
+            'mean': mean,
+            'p50': _percentile(values, 50),
+            'p95': _percentile(values, 95),
+            'max': values[-1],
+            'std': math.sqrt(sum((v - mean) ** 2 for v in values) / count),
+            'saturated': (count - bisect.bisect_left(values, threshold)) * 100 / count,
+        }
+    return stats
+
+
+def average_samples(samples):
+    """计算tsar样本平均值，返回结构与 get_tsar_avg_for_period 相同 (stats 为各指标的窗口分布)"""
+    if not samples:
+        return None
+
+    stats = window_stats(samples)
+    return {
+        'cpu_user': stats['cpu_user']['mean'],
+        'cpu_sys': stats['cpu_sys']['mean'],
+        'cpu_wait': stats['cpu_wait']['mean'],
+        'cpu_sirq': stats['cpu_sirq']['mean'],
+        'io_util': stats['io_util']['mean'],
+        'sample_count': len(samples),
+        'stats': stats
+    }
+
+
+def saturated_metrics(tsar_data):
+    """有秒数达到饱和阈值的指标，返回 [(指标, 名称, 阈值, 分布)]"""
+    if not tsar_data or 'stats' not in tsar_data:
+        return []
+    return [(metric, label, threshold, tsar_data['stats'][metric])
+            for metric, label, threshold in WINDOW_METRICS if tsar_data['stats'][metric]['saturated'] > 0]
+
+
+def format_window_stat(stat):
+    """监控指标分布表中一个指标的各列"""
+    return [fmt.format(stat[key]) for _, key, fmt in WINDOW_STAT_COLUMNS]
+
+
+def align_results(results, tsar_data):
+    """估计时钟偏差并为每个测试生成按秒对齐的监控数据
+
+    每个 result 需要包含 'intervals' 与 'test_times'，对齐成功时写入
+    'joined' (逐秒拼接结果) 与 'tsar_data' (对齐秒的平均值)。
+    """
+    skew_info = estimate_clock_skew(results, tsar_data)
+
+    for result in results:
+        result['joined'] = []
+        start_dt = get_load_start(result.get('test_times', {}))
+        if start_dt is None or not result.get('intervals'):
+            continue
+
+        rows = join_per_second(result['intervals'], start_dt, tsar_data, skew_info['skew'])
+        result['joined'] = rows
+        result['tsar_data'] = average_samples([row['tsar'] for row in rows if row['tsar']])
+
+    return skew_info
+
+
+def format_clock_skew(skew_info):
+    """时钟偏差的报告文字"""
+    if skew_info['corr'] is None:
+        return "无法估计 (缺少每秒结果或tsar数据)，按 0 秒对齐"
+    if not skew_info['reliable']:
+        return f"无法可靠估计 (最大拟合度 {skew_info['corr']:.2f})，按 0 秒对齐"
+    return (f"服务端时钟相对客户端 {skew_info['skew']:+d} 秒 "
+            f"(拟合度 {skew_info['corr']:.2f}，{skew_info['samples']} 秒重叠样本)")
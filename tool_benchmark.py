@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""报告工具自身的性能基准: 用合成数据测量解析、时间窗口匹配与报告渲染的耗时
+
+生成与 report.example/ 格式相同的结果目录:
+    tsar.log        tsar --cpu --io -I 设备... 每秒一行、每20行重复表头，覆盖 1 小时到 30 天
+    <场景>_<N>threads.log / _time.log
+                    几十到几千个测试，每秒结果 + 统计汇总，时间文件带 sysbench_tee 的毫秒时间点
+在若干规模上分别计时 parse_tsar_log、parse_sysbench_result、parse_sysbench_intervals、
+get_tsar_avg_for_period，以及完整的 HTML/Markdown 报告 (按 --profile 的阶段拆分) 与合并报告，
+每个阶段重复 --repeat 次取最小值。结果追加到 tool_benchmark_results.jsonl (每次运行一行)，
+并与同一规模的上一次记录对比，便于跨版本跟踪工具性能。
+
+用法:
+    python3 tool_benchmark.py run [--scales 1:24 24:240 720:2400] [--devices 2] [--repeat 3] [--label v1.2]
+    python3 tool_benchmark.py generate -o 目录 [--hours 24] [--cells 240] [--devices 2]
+    python3 tool_benchmark.py check
+check 是独立的正确性检查，不参与计时: 多客户端汇总日志的大计数能被 parse_sysbench_result 读回、长停顿按完整长度报告。
+规模写作 "tsar小时数:测试数"，720:2400 (30天、2400个测试) 生成约 1GB 的 tsar.log，需要数分钟。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from monitor_collectors import parse_tsar_log
+from time_align import parse_sysbench_intervals
+from scenarios import find_result_logs
+from profiling import enable_profile, phase_timings
+import generate_report
+import generate_markdown_report
+import merge_reports_v2
+import multi_client
+import stall_detection
+
+DEFAULT_SCALES = ['1:24', '24:240']
+RESULTS_FILE = 'tool_benchmark_results.jsonl'
+BASE_TIME = datetime(2025, 11, 1, 0, 0, 0)
+
+# 合成结果目录的测试矩阵: 前四个为内置场景，超出的测试数用自定义场景补足
+THREAD_LEVELS = [1, 8, 16, 32, 64, 128]
+STANDARD_SCENARIOS = ['oltp_point_select', 'oltp_read_only', 'oltp_read_write', 'oltp_write_only']
+TEST_SECONDS = 30
+# 测试之间的冷却时间 (秒，随机，与自适应冷却相同不等长；等间隔的测试会让时钟偏差估计错位)，
+# 测试从 tsar 开始 10 分钟后依次执行
+CELL_GAP_SECONDS = (2, 20)
+FIRST_CELL_OFFSET = timedelta(minutes=10)
+
+TSAR_CPU_COLUMNS = ['user', 'sys', 'wait', 'hirq', 'sirq', 'util']
+TSAR_IO_COLUMNS = ['rrqms', 'wrqms', '%rrqm', '%wrqm', 'rs', 'ws', 'rsecs', 'wsecs', 'rqsize', 'rarqsz',
+                   'warqsz', 'qusize', 'await', 'rawait', 'wawait', 'svctm', 'util']
+TSAR_HEADER_EVERY = 20
+COLUMN_WIDTH = 8
+
+
+def _group_label(name, columns):
+    """tsar 第一行表头中一个模块的 "----名称----" 区间，宽度与其列相同"""
+    width = len(columns) * COLUMN_WIDTH
+    return name.center(width - 1, '-') + ' '
+
+
+def _tsar_value(value):
+    """与 tsar 相同的数值格式: 右对齐，较大的数值用 K/M 后缀"""
+    if value >= 1e6:
+        text = f"{value / 1e6:.1f}M"
+    elif value >= 1e4:
+        text = f"{value / 1e3:.1f}K"
+    else:
+        text = f"{value:.2f}"
+    return ' ' + text.rjust(COLUMN_WIDTH - 1)
+
+
+def write_tsar_log(path, hours, devices, busy_seconds, rng):
+    """合成 tsar.log: busy_seconds 为 {秒: 该秒的tps}，负载随 tps 变化，其余秒空闲；返回行数"""
+    peak_tps = max(busy_seconds.values(), default=1)
+    device_names = [f'nvme{i}n1' for i in range(devices)]
+    group_line = 'Time'.ljust(18) + _group_label('cpu', TSAR_CPU_COLUMNS) + \
+        ''.join(_group_label(name, TSAR_IO_COLUMNS) for name in device_names)
+    field_line = 'Time'.ljust(18) + ''.join(c.rjust(COLUMN_WIDTH) for c in TSAR_CPU_COLUMNS) + \
+        ''.join(c.rjust(COLUMN_WIDTH) for _ in device_names for c in TSAR_IO_COLUMNS)
+    lines = 0
+    with open(path, 'w') as f:
+        f.write('nohup: 忽略输入\n')
+        for second in range(int(hours * 3600)):
+            if second % TSAR_HEADER_EVERY == 0:
+                f.write(f"{group_line}\n{field_line}\n")
+            ts = BASE_TIME + timedelta(seconds=second)
+            load = 0.1 + 0.9 * busy_seconds[second] / peak_tps if second in busy_seconds else 0.02
+            user = 40 * load * rng.uniform(0.8, 1.2)
+            sys_cpu = 15 * load * rng.uniform(0.8, 1.2)
+            wait = 3 * load * rng.random()
+            sirq = 5 * load * rng.uniform(0.5, 1.5)
+            cpu = [user, sys_cpu, wait, 0.0, sirq, user + sys_cpu + wait + sirq]
+            disks = []
+            for _ in device_names:
+                util = min(100.0, 60 * load * rng.uniform(0.3, 1.6))
+                disks += [0.0, 120 * load, 0.0, 50.0, 800 * load, 2400 * load, 6400 * load, 38000 * load,
+                          8.0, 8.0, 16.0, 2 * load, 0.3, 0.2, 0.4, 0.05, util]
+            f.write(ts.strftime('%d/%m/%y-%H:%M:%S').ljust(17) +
+                    ''.join(_tsar_value(v) for v in cpu + disks) + '\n')
+            lines += 1
+    return lines
+
+
+def cell_matrix(cells):
+    """测试数 -> [(场景, 并发数)]，按测试执行顺序"""
+    matrix = []
+    scenario_index = 0
+    while len(matrix) < cells:
+        scenario = (STANDARD_SCENARIOS[scenario_index] if scenario_index < len(STANDARD_SCENARIOS)
+                    else f'custom_{scenario_index}')
+        for threads in THREAD_LEVELS[:cells - len(matrix)]:
+            matrix.append((scenario, threads))
+        scenario_index += 1
+    return matrix
+
+
+def write_cell(result_dir, scenario, threads, start, rng):
+    """一个测试的 sysbench 日志与时间文件 (与 mysql_benchmark.sh + sysbench_tee.py 的输出相同)
+
+    返回 (结束时间, 每秒tps)。
+    """
+    test_name = f"{scenario}_{threads}threads"
+    base_tps = 200 * threads ** 0.8 * rng.uniform(0.9, 1.1)
+    lines = ["sysbench 1.0.20 (using bundled LuaJIT 2.1.0-beta2)", "",
+             "Running the test with following options:", f"Number of threads: {threads}",
+             "Report intermediate results every 1 second(s)", "Initializing random number generator from current time",
+             "", "", "Initializing worker threads...", "", "Threads started!", ""]
+    per_second = []
+    for second in range(1, TEST_SECONDS + 1):
+        tps = base_tps * rng.uniform(0.95, 1.05)
+        per_second.append(tps)
+        lines.append(f"[ {second}s ] thds: {threads} tps: {tps:.2f} qps: {tps * 20:.2f} "
+                     f"(r/w/o: {tps * 14:.2f}/{tps * 4:.2f}/{tps * 2:.2f}) lat (ms,95%): "
+                     f"{rng.uniform(5, 9):.2f} err/s: 0.00 reconn/s: 0.00")
+    tps = sum(per_second) / TEST_SECONDS
+    events = int(tps * TEST_SECONDS)
+    lines += ["SQL statistics:", "    queries performed:",
+              f"        read:                            {events * 14}",
+              f"        write:                           {events * 4}",
+              f"        other:                           {events * 2}",
+              f"        total:                           {events * 20}",
+              f"    transactions:                        {events} ({tps:.2f} per sec.)",
+              f"    queries:                             {events * 20} ({tps * 20:.2f} per sec.)",
+              "    ignored errors:                      0      (0.00 per sec.)",
+              "    reconnects:                          0      (0.00 per sec.)", "",
+              "General statistics:", f"    total time:                          {TEST_SECONDS}.0055s",
+              f"    total number of events:              {events}", "", "Latency (ms):",
+              "         min:                                    1.58",
+              f"         avg:                                    {threads * 1000 / tps:.2f}",
+              "         max:                                   21.55",
+              "         95th percentile:                        7.43",
+              f"         sum:                               {threads * TEST_SECONDS * 1000:.2f}", "",
+              "Threads fairness:",
+              f"    events (avg/stddev):           {events / threads:.4f}/{events / threads * 0.02:.2f}",
+              f"    execution time (avg/stddev):   {TEST_SECONDS - 0.0012:.4f}/0.00", ""]
+    with open(os.path.join(result_dir, f"{test_name}.log"), 'w') as f:
+        f.write('\n'.join(lines))
+
+    end = start + timedelta(seconds=TEST_SECONDS)
+    start_ms = int(start.timestamp() * 1000)
+    with open(os.path.join(result_dir, f"{test_name}_time.log"), 'w') as f:
+        f.write(f"TEST_START_TIME: {start:%Y-%m-%d %H:%M:%S}\n")
+        f.write(f"SCENARIO_ID: {scenario}\nSCENARIO_SCRIPT: {scenario}\nSCENARIO_OPTS: \n")
+        for name, offset_ms in (('TEST_START', 0), ('THREADS_STARTED', 20),
+                                ('STATS_PRINTED', TEST_SECONDS * 1000 + 20), ('TEST_END', TEST_SECONDS * 1000 + 30)):
+            f.write(f"{name}_EPOCH_MS: {start_ms + offset_ms}\n{name}_MONO_MS: {offset_ms + 1000000}\n")
+        f.write(f"TEST_END_TIME: {end:%Y-%m-%d %H:%M:%S}\n")
+    return end, per_second
+
+
+def generate_result_dir(result_dir, hours, cells, devices, seed=1):
+    """合成一个完整的结果目录，返回 tsar.log 的行数"""
+    rng = random.Random(seed)
+    os.makedirs(result_dir, exist_ok=True)
+    start = BASE_TIME + FIRST_CELL_OFFSET
+    busy_seconds = {}
+    for scenario, threads in cell_matrix(cells):
+        end, per_second = write_cell(result_dir, scenario, threads, start, rng)
+        first = int((start - BASE_TIME).total_seconds())
+        # [ Ns ] 的吞吐量对应服务端 start+N 时刻的 tsar 样本
+        busy_seconds.update(zip(range(first + 1, first + TEST_SECONDS + 1), per_second))
+        start = end + timedelta(seconds=rng.randint(*CELL_GAP_SECONDS))
+    with open(os.path.join(result_dir, 'test_config.txt'), 'w') as f:
+        f.write(f"=== 测试配置信息 ===\nMYSQL_HOST: 127.0.0.1\nTEST_TIME: {TEST_SECONDS}\n")
+    with open(os.path.join(result_dir, 'mysql_variables.txt'), 'w') as f:
+        f.write("Variable_name\tValue\ninnodb_buffer_pool_size\t17179869184\ninnodb_flush_log_at_trx_commit\t1\n")
+    return write_tsar_log(os.path.join(result_dir, 'tsar.log'), hours, devices, busy_seconds, rng)
+
+
+def check_multi_client_roundtrip(work_dir):
+    """多客户端汇总日志能被报告解析: 两个高并发客户端的汇总计数超过 7 位，QPS/TPS 应原样读回
+
+    返回错误信息列表，全部通过时为空。
+    """
+    rng = random.Random(1)
+    clients = []
+    for index in (1, 2):
+        client_dir = os.path.join(work_dir, f"client{index}")
+        os.makedirs(client_dir, exist_ok=True)
+        write_cell(client_dir, 'oltp_read_write', 1024, BASE_TIME, rng)
+        client = multi_client.Client(index, 'local', 1024, [], os.path.join(client_dir, 'oltp_read_write_1024threads.log'))
+        client.marks = {'THREADS_STARTED': 0, 'STATS_PRINTED': TEST_SECONDS * 1000}
+        clients.append(client)
+    summaries = [multi_client.parse_summary(c.log_file) for c in clients]
+    aggregate = os.path.join(work_dir, 'aggregate.log')
+    with open(aggregate, 'w') as out:
+        multi_client.write_aggregate(out, clients, summaries)
+
+    parsed = generate_report.parse_sysbench_result(aggregate)
+    errors = []
+    for name, key in (('qps', 'queries'), ('tps', 'transactions')):
+        count = sum(s[key][0] for s in summaries)
+        expected = round(sum(s[key][1] for s in summaries), 2)
+        if parsed.get(name) != expected:
+            errors.append(f"多客户端汇总 {name}: 汇总计数 {count} 时解析得到 {parsed.get(name)}，应为 {expected}")
+    return errors
+
+
+def check_long_stall():
+    """长于基线窗口一半的停顿按完整长度报告: 1000 tps 中间插入 30 秒与 60 秒的 0 tps
+
+    返回错误信息列表，全部通过时为空。
+    """
+    errors = []
+    for stall_seconds in (30, 60):
+        stall = range(60, 60 + stall_seconds)
+        intervals = [{'sec': sec, 'tps': 0.0 if sec in stall else 1000.0} for sec in range(1, 181)]
+        events = stall_detection.detect_stalls({'intervals': intervals})
+        found = [(event['sec'], event['duration'], event['kind']) for event in events]
+        if found != [(stall.start, stall_seconds, '停顿')]:
+            errors.append(f"停顿检测: {stall_seconds} 秒的停顿检测为 {found}")
+    return errors
+
+
+def run_checks():
+    """解析与检测的正确性检查，失败时退出"""
+    work_dir = tempfile.mkdtemp(prefix='tool_benchmark_check_')
+    try:
+        errors = check_multi_client_roundtrip(work_dir) + check_long_stall()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    for error in errors:
+        print(f"检查失败: {error}")
+    if errors:
+        raise SystemExit(1)
+    print("检查通过: 多客户端汇总日志可被报告解析，长停顿按完整长度报告")
+
+
+def best_time(func, repeat):
+    """重复执行取最短墙钟时间 (秒)；被测函数的输出被丢弃"""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def best_phases(func, repeat):
+    """重复执行完整的报告生成，返回总耗时最短一次的各阶段墙钟时间 {阶段: 秒}"""
+    best = None
+    for _ in range(repeat):
+        enable_profile(trace_memory=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        timings = {name: values[0] for name, values in phase_timings().items()}
+        if best is None or sum(timings.values()) < sum(best.values()):
+            best = timings
+    return best
+
+
+def benchmark_scale(work_dir, hours, cells, devices, repeat):
+    """在一个规模上计时各阶段，返回结果记录"""
+    result_dir = os.path.join(work_dir, 'envA')
+    started = time.perf_counter()
+    tsar_lines = generate_result_dir(result_dir, hours, cells, devices)
+    record = {'tsar_hours': hours, 'cells': cells, 'devices': devices, 'tsar_lines': tsar_lines,
+              'generate_seconds': round(time.perf_counter() - started, 3), 'stages': {}}
+    stages = record['stages']
+
+    tsar_file = os.path.join(result_dir, 'tsar.log')
+    logs = [log_file for log_file, _, _ in find_result_logs(result_dir)]
+    stages['parse_tsar_log'] = best_time(lambda: parse_tsar_log(tsar_file), repeat)
+    stages['parse_sysbench_result'] = best_time(
+        lambda: [generate_report.parse_sysbench_result(log) for log in logs], repeat)
+    stages['parse_sysbench_intervals'] = best_time(lambda: [parse_sysbench_intervals(log) for log in logs], repeat)
+
+    tsar_data = parse_tsar_log(tsar_file)
+    periods = [generate_report.parse_test_time(log.replace('.log', '_time.log')) for log in logs]
+    stages['get_tsar_avg_for_period'] = best_time(
+        lambda: [generate_report.get_tsar_avg_for_period(tsar_data, p['start'], p['end']) for p in periods], repeat)
+
+    for name, func in (('generate_html_report', generate_report.generate_html_report),
+                       ('generate_markdown_report', generate_markdown_report.generate_markdown_report)):
+        phases = best_phases(lambda: func(result_dir), repeat)
+        stages[name] = sum(phases.values())
+        for phase_name, seconds in phases.items():
+            stages[f"{name}/{phase_name}"] = seconds
+
+    # 合并报告: 同一份报告作为两个环境
+    os.makedirs(os.path.join(work_dir, 'envB'), exist_ok=True)
+    shutil.copy(os.path.join(result_dir, 'performance_report.md'), os.path.join(work_dir, 'envB'))
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        stages['merge_reports_v2'] = best_time(lambda: merge_reports_v2.merge_reports(['envA', 'envB']), repeat)
+    finally:
+        os.chdir(cwd)
+
+    record['stages'] = {name: round(seconds, 4) for name, seconds in stages.items()}
+    return record
+
+
+def tool_version():
+    """当前代码版本 (git 提交)，不在 git 仓库中时返回 unknown"""
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], universal_newlines=True,
+                                       stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_record(results_file, scale):
+    """结果文件中同一规模的上一次记录"""
+    previous = None
+    if os.path.exists(results_file):
+        with open(results_file, 'r') as f:
+            for line in f:
+                try:
+                    run = json.loads(line)
+                except ValueError:
+                    continue
+                for record in run.get('scales', []):
+                    if all(record.get(key) == scale[key] for key in ('tsar_hours', 'cells', 'devices')):
+                        previous = (run, record)
+    return previous
+
+
+def format_scale(record, previous):
+    """一个规模的结果表，带与上一次记录的比值"""
+    lines = [f"\n规模: tsar {record['tsar_hours']:g} 小时 ({record['tsar_lines']:,} 行, {record['devices']} 块盘), "
+             f"{record['cells']} 个测试 (生成数据 {record['generate_seconds']:.1f}s)"]
+    if previous:
+        lines.append(f"对比上一次: {previous[0]['label']} ({previous[0]['time']})")
+    for name, seconds in record['stages'].items():
+        ratio = ''
+        if previous and previous[1]['stages'].get(name):
+            ratio = f"  x{seconds / previous[1]['stages'][name]:.2f}"
+        indent = '    ' if '/' in name else '  '
+        lines.append(f"{indent}{seconds:>10.4f}s  {name.split('/')[-1]}{ratio}")
+    return '\n'.join(lines)
+
+
+def parse_scale(text):
+    hours, _, cells = text.partition(':')
+    return float(hours), int(cells)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报告工具的合成数据性能基准')
+    parser.add_argument('action', choices=['run', 'generate', 'check'])
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES, help='tsar小时数:测试数')
+    parser.add_argument('--devices', type=int, default=2, help='tsar 中的磁盘数')
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段重复次数 (取最小值)')
+    parser.add_argument('--label', help='本次记录的标签 (默认为 git 版本)')
+    parser.add_argument('--results', default=RESULTS_FILE, help='结果记录文件 (JSON lines)')
+    parser.add_argument('--keep', action='store_true', help='保留合成的结果目录')
+    parser.add_argument('-o', '--output', help='generate: 输出目录')
+    parser.add_argument('--hours', type=float, default=24, help='generate: tsar 小时数')
+    parser.add_argument('--cells', type=int, default=240, help='generate: 测试数')
+    args = parser.parse_args()
+
+    if args.action == 'generate':
+        if not args.output:
+            parser.error('generate 需要 -o 输出目录')
+        lines = generate_result_dir(args.output, args.hours, args.cells, args.devices)
+        print(f"已生成 {args.output}: {args.cells} 个测试, tsar.log {lines:,} 行")
+        return
+
+    if args.action == 'check':
+        run_checks()
+        return
+
+    version = tool_version()
+    run = {'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'label': args.label or version,
+           'version': version, 'python': platform.python_version(), 'host': platform.node(),
+           'repeat': args.repeat, 'scales': []}
+    for text in args.scales:
+        hours, cells = parse_scale(text)
+        work_dir = tempfile.mkdtemp(prefix='tool_benchmark_')
+        try:
+            record = benchmark_scale(work_dir, hours, cells, args.devices, args.repeat)
+        finally:
+            if args.keep:
+                print(f"合成数据保留在: {work_dir}")
+            else:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        print(format_scale(record, previous_record(args.results, record)))
+        run['scales'].append(record)
+
+    with open(args.results, 'a') as f:
+        f.write(json.dumps(run, ensure_ascii=False) + '\n')
+    print(f"\n结果已追加到: {args.results}")
+
+
+if __name__ == "__main__":
+    main()
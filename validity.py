@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""结果有效性检查: 按可配置的规则标记不可信的测试
+
+报告中的 QPS 只看 sysbench 的汇总值，出错重试、连接重建、线程饥饿、监控缺失、
+提前结束的测试混在正常结果里很难发现。这里对每个测试逐条检查:
+    - error_rate        忽略的错误数 / (事务数 + 忽略的错误数)
+    - reconnects        重连次数
+    - fairness          各线程事件数的标准差 / 平均值 (单线程不检查)
+    - monitor_coverage  对齐到监控样本的秒数 / 运行秒数 (本次运行没有监控数据时不检查)
+    - short_run         实际运行时间 / 配置的 TEST_TIME
+    - interval_gaps     缺失的每秒结果 / 运行秒数
+    - client_bound      受压测客户端限制 (见 client_monitor.py)
+每条规则有 "警告" 与 "无效" 两个阈值，超过无效阈值的测试在合并报告中不参与排名。
+阈值可在配置文件中用 VALIDITY_<规则>_WARN / VALIDITY_<规则>_INVALID 覆盖 (写入 test_config.txt)，
+设为空值表示不使用该级别。
+"""
+import os
+import re
+
+from multi_client import SUMMARY_PATTERNS
+from compressed_logs import log_exists, open_log
+
+# 规则: (名称, 报告中的名称, 方向, 警告阈值, 无效阈值)
+# 方向 above 表示指标超过阈值时触发，below 表示低于阈值时触发；阈值为 None 表示不使用该级别
+VALIDITY_RULES = [
+    ('error_rate', '错误率', 'above', 0.001, 0.01),
+    ('reconnects', '重连次数', 'above', 0, 10),
+    ('fairness', '线程不均衡', 'above', 0.25, 0.50),
+    ('monitor_coverage', '监控覆盖率', 'below', 0.80, None),
+    ('short_run', '运行时长', 'below', 0.95, 0.80),
+    ('interval_gaps', '每秒结果缺失', 'above', 0, 0.10),
+    ('client_bound', '客户端瓶颈', 'above', 0, None),
+]
+
+SEVERITY_ORDER = {'ok': 0, 'warn': 1, 'invalid': 2}
+SEVERITY_LABELS = {'ok': '✅ 有效', 'warn': '⚠️ 警告', 'invalid': '❌ 无效'}
+
+FAIRNESS_PATTERN = re.compile(r'events \(avg/stddev\):\s+(\d+\.?\d*)/(\d+\.?\d*)')
+TOTAL_TIME_PATTERN = re.compile(r'total time:\s+(\d+\.?\d*)s')
+
+# 报告中展示的列: (列名, 键)
+VALIDITY_COLUMNS = [
+    ('级别', 'severity'),
+    ('规则', 'label'),
+    ('检查值', 'value'),
+    ('阈值', 'threshold'),
+]
+
+
+def load_validity_config(result_dir):
+    """读取 test_config.txt 中的 TEST_TIME 与阈值覆盖，返回 (配置的测试时间, 规则列表)"""
+    settings = {}
+    config_file = os.path.join(result_dir, 'test_config.txt')
+    if log_exists(config_file):
+        with open_log(config_file) as f:
+            for line in f:
+                key, sep, value = line.partition(':')
+                if sep:
+                    settings[key.strip()] = value.strip()
+
+    def number(value):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    rules = []
+    for name, label, direction, warn, invalid in VALIDITY_RULES:
+        prefix = f'VALIDITY_{name.upper()}'
+        if f'{prefix}_WARN' in settings:
+            warn = number(settings[f'{prefix}_WARN'])
+        if f'{prefix}_INVALID' in settings:
+            invalid = number(settings[f'{prefix}_INVALID'])
+        rules.append((name, label, direction, warn, invalid))
+    return number(settings.get('TEST_TIME', '')), rules
+
+
+def parse_validity_stats(log_file):
+    """sysbench 日志中与有效性相关的汇总值；多客户端汇总日志没有线程公平性与总时间"""
+    with open_log(log_file) as f:
+        content = f.read()
+    stats = {}
+    for key in ('transactions', 'ignored_errors', 'reconnects'):
+        match = re.search(SUMMARY_PATTERNS[key], content)
+        stats[key] = int(match.group(1)) if match else None
+    match = FAIRNESS_PATTERN.search(content)
+    stats['events_avg'], stats['events_stddev'] = (float(match.group(1)), float(match.group(2))) \
+        if match else (None, None)
+    match = TOTAL_TIME_PATTERN.search(content)
+    stats['total_time'] = float(match.group(1)) if match else None
+    return stats
+
+
+def cell_metrics(result, stats, test_time, has_monitor):
+    """计算各规则的指标值，无法计算的规则不出现在返回的字典中"""
+    metrics = {}
+    intervals = result['intervals']
+
+    if stats['transactions'] is not None and stats['ignored_errors'] is not None:
+        total = stats['transactions'] + stats['ignored_errors']
+        metrics['error_rate'] = stats['ignored_errors'] / total if total else 0.0
+    elif intervals:
+        errors = sum(row['err'] for row in intervals)
+        total = sum(row['tps'] for row in intervals) + errors
+        metrics['error_rate'] = errors / total if total else 0.0
+
+    if stats['reconnects'] is not None:
+        metrics['reconnects'] = stats['reconnects']
+    elif intervals:
+        metrics['reconnects'] = sum(row['reconn'] for row in intervals)
+
+    if result['threads'] > 1 and stats['events_avg']:
+        metrics['fairness'] = stats['events_stddev'] / stats['events_avg']
+
+    run_seconds = stats['total_time'] or (max(row['sec'] for row in intervals) if intervals else None)
+    if has_monitor and run_seconds:
+        samples = result['tsar_data']['sample_count'] if result['tsar_data'] else 0
+        metrics['monitor_coverage'] = min(1.0, samples / run_seconds)
+
+    if test_time and run_seconds:
+        metrics['short_run'] = run_seconds / test_time
+
+    if intervals:
+        # 第一行的秒数即输出间隔 (--report-interval)
+        step = min(row['sec'] for row in intervals) or 1
+        expected = max(row['sec'] for row in intervals) / step
+        reported = len({row['sec'] for row in intervals})
+        metrics['interval_gaps'] = max(0.0, (expected - reported) / expected) if expected else 0.0
+
+    if result.get('client'):
+        metrics['client_bound'] = 1 if result['client']['client_bound'] else 0
+    return metrics
+
+
+def _triggered(value, direction, threshold):
+    if threshold is None:
+        return False
+    return value > threshold if direction == 'above' else value < threshold
+
+
+def _format_value(name, value):
+    if name == 'reconnects':
+        return f'{value:,.0f}'
+    if name == 'client_bound':
+        return '是' if value else '否'
+    if name == 'fairness':
+        return f'{value:.2f}'
+    return f'{value * 100:.1f}%'
+
+
+def _format_threshold(name, direction, threshold):
+    if name == 'client_bound':
+        return '-'
+    op = '>' if direction == 'above' else '<'
+    return f'{op} {_format_value(name, threshold)}'
+
+
+def evaluate_cell(metrics, rules):
+    """按规则检查一个测试，返回 {'severity': 级别, 'findings': [发现的问题]}"""
+    findings = []
+    for name, label, direction, warn, invalid in rules:
+        if name not in metrics:
+            continue
+        value = metrics[name]
+        if _triggered(value, direction, invalid):
+            severity, threshold = 'invalid', invalid
+        elif _triggered(value, direction, warn):
+            severity, threshold = 'warn', warn
+        else:
+            continue
+        findings.append({'severity': severity, 'name': name, 'label': label,
+                         'value': _format_value(name, value),
+                         'threshold': _format_threshold(name, direction, threshold)})
+    severity = max((f['severity'] for f in findings), key=SEVERITY_ORDER.get, default='ok')
+    return {'severity': severity, 'findings': findings}
+
+
+def validate_results(result_dir, results, has_monitor):
+    """检查所有测试，结果写入 result['validity']"""
+    test_time, rules = load_validity_config(result_dir)
+    for result in results:
+        log_file = os.path.join(result_dir, f"{result['scenario']}_{result['threads']}threads.log")
+        metrics = cell_metrics(result, parse_validity_stats(log_file), test_time, has_monitor)
+        result['validity'] = evaluate_cell(metrics, rules)
+
+
+def validity_badge(validity, html=False):
+    """有效性级别的标记，HTML 中带颜色"""
+    severity = validity['severity'] if validity else 'ok'
+    if html:
+        return f'<span class="badge badge-{severity}">{SEVERITY_LABELS[severity]}</span>'
+    return SEVERITY_LABELS[severity]
+
+
+def format_finding(finding):
+    """按 VALIDITY_COLUMNS 格式化一条问题"""
+    values = []
+    for _, key in VALIDITY_COLUMNS:
+        value = finding[key]
+        values.append(SEVERITY_LABELS[value] if key == 'severity' else value)
+    return values
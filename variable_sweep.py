@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""MySQL 动态变量扫描: 用 SET GLOBAL 切换参数，逐组运行完整测试矩阵并对比
+
+调参时常见的问题是 innodb_flush_log_at_trx_commit 1 与 2、sync_binlog、innodb_io_capacity、
+缓冲池大小各自对性能的影响。variable_sweep.sh 按配置中的 VARIABLE_SWEEP 逐组设置变量，
+每组设置在扫描目录下的 run_<N>/ 中运行一次 mysql_benchmark.sh，最后恢复原始值并生成对比报告。
+
+扫描定义: "变量=值1,值2 变量=值1,值2"，大小可以带 K/M/G 后缀 (换算为字节后设置)
+    each  每次只改变一个变量，其他变量保持原始值 (默认)
+    grid  所有变量取值的组合
+
+用法:
+    python3 variable_sweep.py plan --vars "sync_binlog=0,1" [--mode each|grid]   每行输出一组设置
+    python3 variable_sweep.py save --vars "..." -o 原始值文件                      记录当前值
+    python3 variable_sweep.py apply 变量=值 ... [--base 原始值文件] [-o 设置记录]   设置并确认生效
+    python3 variable_sweep.py restore -i 原始值文件                                恢复原始值
+    python3 variable_sweep.py report 扫描目录                                      生成对比报告
+(连接参数 -H/-P/-u 与 MYSQL_PWD 环境变量同 cooldown.py)
+"""
+import argparse
+import glob
+import itertools
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from dataset_manifest import run_query
+from merge_reports_v2 import extract_all_performance_data
+from compressed_logs import log_exists, open_log
+from result_pack import PACK_SUFFIX, report_path
+
+NAME_PATTERN = re.compile(r'^[a-z][a-z0-9_]*$')
+SIZE_PATTERN = re.compile(r'^(\d+)([KMG])$', re.IGNORECASE)
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+BOOLEANS = {'ON': '1', 'TRUE': '1', 'OFF': '0', 'FALSE': '0'}
+
+SETTINGS_FILE = 'variable_settings.txt'
+ORIGINAL_FILE = 'original_variables.txt'
+REPORT_FILE = 'variable_sweep_report.md'
+
+
+def parse_sweep_spec(spec):
+    """解析扫描定义，返回 [(变量, [取值])]"""
+    variables = []
+    for item in spec.split():
+        name, sep, values = item.partition('=')
+        values = [v for v in values.split(',') if v]
+        if not sep or not NAME_PATTERN.match(name) or not values:
+            raise ValueError(f"无效的扫描定义: {item} (格式: 变量=值1,值2)")
+        variables.append((name, values))
+    return variables
+
+
+def plan_settings(variables, mode):
+    """按扫描模式生成各组设置，每组为 [(变量, 值)]"""
+    if mode == 'grid':
+        names = [name for name, _ in variables]
+        return [list(zip(names, combo)) for combo in itertools.product(*(values for _, values in variables))]
+    return [[(name, value)] for name, values in variables for value in values]
+
+
+def sql_value(value):
+    """SET GLOBAL 中的取值: 大小后缀换算为字节，数字与 ON/OFF 不加引号，其余按字符串"""
+    match = SIZE_PATTERN.match(value)
+    if match:
+        return str(int(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+    if re.match(r'^-?\d+(\.\d+)?$', value) or value.upper() in BOOLEANS:
+        return value
+    return "'" + value.replace("'", "''") + "'"
+
+
+def normalize(value):
+    """用于比较的取值: 去掉引号、换算大小后缀、布尔值统一为 1/0"""
+    value = sql_value(value.strip()).strip("'")
+    return BOOLEANS.get(value.upper(), value.upper())
+
+
+def read_globals(args, names):
+    """当前的全局变量值 {变量: 值}"""
+    rows = run_query(args, 'SELECT ' + ', '.join(f'@@GLOBAL.{name}' for name in names))
+    return dict(zip(names, rows[0])) if rows else {}
+
+
+def apply_settings(args, settings):
+    """设置变量并等待生效 (缓冲池大小等在后台调整)，返回 [(变量, 目标值, 实际值, 是否生效)]"""
+    for name, value in settings:
+        run_query(args, f'SET GLOBAL {name} = {sql_value(value)}')
+
+    names = [name for name, _ in settings]
+    deadline = time.monotonic() + args.wait
+    while True:
+        actual = read_globals(args, names)
+        results = [(name, value, actual.get(name, ''), normalize(actual.get(name, '')) == normalize(value))
+                   for name, value in settings]
+        if all(ok for *_, ok in results) or time.monotonic() >= deadline:
+            return results
+        time.sleep(1)
+
+
+def write_settings(path, results):
+    with open(path, 'w') as f:
+        for name, requested, actual, ok in results:
+            f.write(f"{name}\t{requested}\t{actual}\t{'OK' if ok else 'MISMATCH'}\n")
+
+
+def read_settings(path):
+    """读取设置记录，返回 [(变量, 目标值, 实际值, 是否生效)]"""
+    results = []
+    if log_exists(path):
+        with open_log(path) as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) == 4:
+                    results.append((parts[0], parts[1], parts[2], parts[3] == 'OK'))
+    return results
+
+
+def print_results(results):
+    for name, requested, actual, ok in results:
+        print(f"  {name} = {requested}: {'已生效' if ok else f'未生效 (当前值 {actual})'}")
+
+
+def _number(text):
+    try:
+        return float(text.replace(',', ''))
+    except (AttributeError, ValueError):
+        return None
+
+
+def peak_cell(cells):
+    """一个场景的有效结果中 QPS 最高的测试，返回 (并发数, 指标) 或 None"""
+    candidates = [(threads, cell) for threads, cell in cells.items()
+                  if not cell.get('invalid') and _number(cell['qps']) is not None]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda item: _number(item[1]['qps']))
+
+
+def load_runs(sweep_dir):
+    """扫描目录中的各次运行: [{'name', 'settings', 'performance'}]，按运行序号排序"""
+    runs = []
+    for run_dir in glob.glob(os.path.join(sweep_dir, 'run_*')):
+        # 打包后的运行 (run_N.sbpack) 按运行目录处理
+        match = re.search(rf'run_(\d+)(?:{re.escape(PACK_SUFFIX)})?$', run_dir)
+        if not match:
+            continue
+        if run_dir.endswith(PACK_SUFFIX):
+            run_dir = run_dir[:-len(PACK_SUFFIX)]
+            if os.path.isdir(run_dir):
+                continue
+        report_file = report_path(run_dir, 'performance_report.md')
+        performance = {}
+        if log_exists(report_file):
+            with open_log(report_file, encoding='utf-8') as f:
+                performance = extract_all_performance_data(f.read())
+        runs.append({'index': int(match.group(1)), 'name': os.path.basename(run_dir),
+                     'settings': read_settings(os.path.join(run_dir, SETTINGS_FILE)),
+                     'performance': performance})
+    return sorted(runs, key=lambda run: run['index'])
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def _fmt(value, fmt):
+    return fmt.format(value) if value is not None else 'N/A'
+
+
+def settings_label(run):
+    return ', '.join(f'{name}={requested}' for name, requested, _, _ in run['settings']) or '-'
+
+
+def variable_effects(runs, name, scenario):
+    """一个变量的各取值在某场景下的平均峰值表现 (grid 模式下对其他变量的各组合取平均)"""
+    groups = {}
+    for run in runs:
+        value = next((requested for n, requested, _, ok in run['settings'] if n == name and ok), None)
+        peak = peak_cell(run['performance'].get(scenario, {}))
+        if value is None or peak is None:
+            continue
+        threads, cell = peak
+        groups.setdefault(value, []).append({'qps': _number(cell['qps']), 'threads': int(threads),
+                                             'p95': _number(cell['p95_latency']),
+                                             'io_util': _number(cell['io_util'])})
+    return [(value, {'runs': len(points),
+                     'qps': _mean(p['qps'] for p in points),
+                     'threads': sorted({p['threads'] for p in points}),
+                     'p95': _mean(p['p95'] for p in points),
+                     'io_util': _mean(p['io_util'] for p in points)})
+            for value, points in groups.items()]
+
+
+def generate_report(sweep_dir):
+    runs = load_runs(sweep_dir)
+    original = read_settings(os.path.join(sweep_dir, ORIGINAL_FILE))
+    names = []
+    for run in runs:
+        for name, *_ in run['settings']:
+            if name not in names:
+                names.append(name)
+    scenarios = []
+    for run in runs:
+        for scenario in run['performance']:
+            if scenario not in scenarios:
+                scenarios.append(scenario)
+
+    output = "# MySQL 变量扫描对比报告\n\n"
+    output += f"扫描目录: `{sweep_dir}`，共 {len(runs)} 组设置\n\n"
+    if original:
+        output += "### 原始值 (扫描结束后已恢复)\n\n| 变量 | 原始值 | 恢复后 |\n|------|--------|--------|\n"
+        for name, value, actual, ok in original:
+            output += f"| {name} | {value} | {actual if ok else f'⚠️ {actual}'} |\n"
+
+    output += "\n## 扫描运行\n\n| 运行 | 设置 | 状态 |\n|------|------|------|\n"
+    for run in runs:
+        if not all(ok for *_, ok in run['settings']):
+            status = '⚠️ 设置未生效，未测试: ' + ', '.join(
+                f'{name} 当前值 {actual}' for name, _, actual, ok in run['settings'] if not ok)
+        elif not run['performance']:
+            status = '❌ 没有测试结果'
+        else:
+            status = '完成'
+        output += f"| {run['name']} | {settings_label(run)} | {status} |\n"
+
+    # 每个变量: 各取值在各场景下的峰值QPS、峰值处的p95与IO利用率，相对第一个取值的变化
+    for name in names:
+        output += f"\n## 变量影响: {name}\n"
+        for scenario in scenarios:
+            effects = variable_effects(runs, name, scenario)
+            if not effects:
+                continue
+            base_qps = effects[0][1]['qps']
+            output += f"\n### {scenario}\n\n"
+            output += "| 取值 | 运行数 | 峰值QPS | 相对第一个取值 | 峰值并发 | p95(ms) | IO利用率(%) |\n"
+            output += "|------|--------|---------|----------------|----------|---------|-------------|\n"
+            for value, effect in effects:
+                change = (f"{(effect['qps'] / base_qps - 1) * 100:+.1f}%"
+                          if base_qps and effect['qps'] is not None else 'N/A')
+                output += (f"| {value} | {effect['runs']} | {_fmt(effect['qps'], '{:,.0f}')} | {change} | "
+                           f"{'/'.join(str(t) for t in effect['threads'])} | {_fmt(effect['p95'], '{:.2f}')} | "
+                           f"{_fmt(effect['io_util'], '{:.1f}')} |\n")
+
+    # 明细: 每组设置在各并发数下的 QPS / p95 / IO利用率
+    output += "\n## 明细 (QPS / p95(ms) / IO利用率(%))\n"
+    for scenario in scenarios:
+        thread_counts = sorted({threads for run in runs for threads in run['performance'].get(scenario, {})},
+                               key=int)
+        output += f"\n### {scenario}\n\n"
+        output += "| 设置 |" + "".join(f" {threads}线程 |" for threads in thread_counts) + "\n"
+        output += "|------|" + "".join("------|" for _ in thread_counts) + "\n"
+        for run in runs:
+            cells = run['performance'].get(scenario)
+            if not cells:
+                continue
+            row = f"| {settings_label(run)} |"
+            for threads in thread_counts:
+                cell = cells.get(threads)
+                if cell:
+                    row += f" {cell['qps']} / {cell['p95_latency']} / {cell['io_util']}{' ❌' if cell.get('invalid') else ''} |"
+                else:
+                    row += " - |"
+            output += row + "\n"
+
+    output += "\n## 说明\n\n"
+    output += "- 每组设置通过 SET GLOBAL 生效后运行一次完整测试矩阵，结果目录为扫描目录下的 run_<N>/\n"
+    output += "- 峰值QPS取该场景各并发数中QPS最高的有效测试，p95与IO利用率取同一测试；未通过结果有效性检查 (❌) 的测试不参与\n"
+    output += "- grid 模式下，同一取值的各组合取平均，运行数为参与平均的组合数\n"
+    output += "- 设置读回的值与目标值不一致 (例如缓冲池大小被取整为 chunk 的倍数) 时该组不测试\n"
+    output += f"\n---\n*报告生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n"
+
+    report_file = os.path.join(sweep_dir, REPORT_FILE)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write(output)
+    return report_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MySQL 动态变量扫描')
+    parser.add_argument('action', choices=['plan', 'save', 'apply', 'restore', 'report'])
+    parser.add_argument('items', nargs='*', help='apply: 变量=值；report: 扫描目录')
+    parser.add_argument('--vars', default='', help='扫描定义 "变量=值1,值2 ..."')
+    parser.add_argument('--mode', choices=['each', 'grid'], default='each')
+    parser.add_argument('-i', '--input', help='restore: 原始值文件')
+    parser.add_argument('--base', help='apply: 原始值文件，其中未指定的变量先恢复为原始值')
+    parser.add_argument('-o', '--output', help='save: 原始值文件；apply: 设置记录')
+    parser.add_argument('--wait', type=float, default=60, help='等待设置生效的最长时间(秒)')
+    parser.add_argument('-H', '--host', default='127.0.0.1')
+    parser.add_argument('-P', '--port', default='3306')
+    parser.add_argument('-u', '--user', default='root')
+    parser.add_argument('-D', '--database', default='information_schema')
+    parser.add_argument('--mysql-bin', default='mysql', help='mysql客户端命令')
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'plan':
+            for settings in plan_settings(parse_sweep_spec(args.vars), args.mode):
+                print(' '.join(f'{name}={value}' for name, value in settings))
+        elif args.action == 'save':
+            names = [name for name, _ in parse_sweep_spec(args.vars)]
+            current = read_globals(args, names)
+            write_settings(args.output, [(name, current[name], current[name], True) for name in names])
+            print(f"原始值已保存: {args.output}")
+        elif args.action in ('apply', 'restore'):
+            if args.action == 'apply':
+                settings = [(name, value) for item in args.items
+                            for name, values in parse_sweep_spec(item) for value in values[:1]]
+            else:
+                settings = [(name, value) for name, value, _, _ in read_settings(args.input)]
+            # 未指定的扫描变量恢复为原始值 (each 模式下其他变量保持原始值)，只记录指定的变量
+            requested = {name for name, _ in settings}
+            base = [(name, value) for name, value, _, _ in read_settings(args.base or '')
+                    if name not in requested]
+            results = apply_settings(args, base + settings)
+            if not all(ok for *_, ok in results[:len(base)]):
+                print_results(results[:len(base)])
+                sys.exit(1)
+            results = results[len(base):]
+            print("恢复原始值:" if args.action == 'restore' else "设置变量:")
+            print_results(results)
+            if args.output or args.action == 'restore':
+                write_settings(args.output or args.input, results)
+            if not all(ok for *_, ok in results):
+                sys.exit(1)
+        else:
+            if len(args.items) != 1 or not os.path.isdir(args.items[0]):
+                parser.error('report 需要扫描目录')
+            print(f"变量扫描对比报告已生成: {generate_report(args.items[0])}")
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"错误: 执行SQL失败: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/bin/bash
+
+# MySQL 动态变量扫描: 按 VARIABLE_SWEEP 逐组 SET GLOBAL，每组运行一次完整测试矩阵，最后恢复原始值并生成对比报告
+# 用法: ./variable_sweep.sh [配置文件] [测试时间]
+set -e
+
+CONFIG_FILE="${1:-benchmark_config.conf}"
+OVERRIDE_TEST_TIME="$2"
+
+if [ ! -f "$CONFIG_FILE" ]; then
+    echo "配置文件不存在: $CONFIG_FILE"
+    exit 1
+fi
+source "$CONFIG_FILE"
+VARIABLE_SWEEP_MODE="${VARIABLE_SWEEP_MODE:-each}"
+VARIABLE_SWEEP_WAIT="${VARIABLE_SWEEP_WAIT:-60}"
+
+if [ -z "$VARIABLE_SWEEP" ]; then
+    echo "配置中没有 VARIABLE_SWEEP，例如: VARIABLE_SWEEP=\"innodb_flush_log_at_trx_commit=1,2 sync_binlog=0,1\""
+    exit 1
+fi
+if ! command -v python3 >/dev/null 2>&1; then
+    echo "变量扫描需要 python3"
+    exit 1
+fi
+
+# 变量的设置/读回/恢复，连接参数与压测相同
+sweep() {
+    MYSQL_PWD="$MYSQL_PASSWORD" python3 variable_sweep.py "$@" \
+      -H $MYSQL_HOST -P $MYSQL_PORT -u $MYSQL_USER --wait $VARIABLE_SWEEP_WAIT
+}
+
+SWEEP_PLAN=$(python3 variable_sweep.py plan --vars "$VARIABLE_SWEEP" --mode $VARIABLE_SWEEP_MODE)
+SWEEP_DIR="variable_sweep_$(date +%Y%m%d_%H%M%S)"
+mkdir -p "$SWEEP_DIR"
+echo "=== MySQL 变量扫描 ($VARIABLE_SWEEP_MODE): $VARIABLE_SWEEP ===" | tee "$SWEEP_DIR/sweep.log"
+echo "$SWEEP_PLAN" | tee -a "$SWEEP_DIR/sweep.log"
+
+sweep save --vars "$VARIABLE_SWEEP" -o "$SWEEP_DIR/original_variables.txt" | tee -a "$SWEEP_DIR/sweep.log"
+if [ ! -s "$SWEEP_DIR/original_variables.txt" ]; then
+    echo "无法读取变量的当前值，终止扫描" | tee -a "$SWEEP_DIR/sweep.log"
+    exit 1
+fi
+
+# 无论扫描是否中断，都恢复原始值
+restore_variables() {
+    echo "=== 恢复原始值 ===" | tee -a "$SWEEP_DIR/sweep.log"
+    sweep restore -i "$SWEEP_DIR/original_variables.txt" 2>&1 | tee -a "$SWEEP_DIR/sweep.log" || true
+}
+trap restore_variables EXIT
+
+# 第一组按配置准备数据，之后的各组复用同一数据集
+NEED_PREPARE_RUN=""
+run=0
+while read -r settings; do
+    run=$((run + 1))
+    run_dir="$SWEEP_DIR/run_$run"
+    mkdir -p "$run_dir"
+    echo "=== 第 $run 组: $settings ===" | tee -a "$SWEEP_DIR/sweep.log"
+    # 子命令不能读取标准输入 (ssh 等会吃掉后面的扫描计划)
+    sweep apply $settings --base "$SWEEP_DIR/original_variables.txt" -o "$run_dir/variable_settings.txt" < /dev/null 2>&1 | tee -a "$SWEEP_DIR/sweep.log"
+    if [ "${PIPESTATUS[0]}" -ne 0 ]; then
+        echo "设置未生效，跳过第 $run 组" | tee -a "$SWEEP_DIR/sweep.log"
+        continue
+    fi
+    if ! RESULT_DIR="$run_dir" VARIABLE_SETTINGS="$settings" \
+      bash mysql_benchmark.sh "$CONFIG_FILE" "$OVERRIDE_TEST_TIME" "$NEED_PREPARE_RUN" < /dev/null; then
+        echo "第 $run 组有失败的测试，详见 $run_dir/benchmark.log" | tee -a "$SWEEP_DIR/sweep.log"
+    fi
+    NEED_PREPARE_RUN="false"
+done <<< "$SWEEP_PLAN"
+
+restore_variables
+trap - EXIT
+
+python3 variable_sweep.py report "$SWEEP_DIR" | tee -a "$SWEEP_DIR/sweep.log"
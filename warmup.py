@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""压测矩阵开始前的缓冲池预热
+
+矩阵的第一个测试往往紧跟在数据准备或 MySQL 重启之后，缓冲池是冷的，
+结果会比后面的测试差，这与并发数无关。这里在正式测试前反复对所有 sbtest 表
+做只读扫描 (主键与二级索引)，每轮用 SHOW GLOBAL STATUS 的增量计算缓冲池
+命中率，直到相邻两轮命中率的变化小于阈值或达到最长预热时间。
+
+模式:
+    scan      多线程并行扫描所有表，直到命中率稳定 (默认)
+    bp_load   先执行 innodb_buffer_pool_load_now 加载上次保存的页面列表，
+              加载完成后再按 scan 的方式确认命中率稳定
+
+用法: MYSQL_PWD=密码 python3 warmup.py -H 主机 -P 端口 -u 用户 -D 库 --tables 16 \\
+          [--mode scan|bp_load] [--threads 16] [--max-time 600] -o 结果目录/warmup.log
+"""
+import argparse
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dataset_manifest import run_query, table_names
+from compressed_logs import open_log
+
+# 相邻两轮命中率变化小于该值 (百分点) 视为稳定
+STABLE_DELTA = 0.1
+# bp_load 模式轮询加载进度的间隔 (秒)
+LOAD_POLL_INTERVAL = 2
+
+
+def read_bp_counters(args):
+    """缓冲池逻辑读与物理读计数"""
+    rows = run_query(args, "SHOW GLOBAL STATUS WHERE Variable_name IN "
+                           "('Innodb_buffer_pool_read_requests', 'Innodb_buffer_pool_reads')")
+    status = {name: int(value) for name, value in rows}
+    return status.get('Innodb_buffer_pool_read_requests', 0), status.get('Innodb_buffer_pool_reads', 0)
+
+
+def scan_table(args, index, name):
+    """顺序读一遍主键 (聚簇索引) 与二级索引 k"""
+    run_query(args, f"SELECT COUNT(*) FROM {name} FORCE INDEX (PRIMARY); "
+                    f"SELECT COUNT(k) FROM {name} FORCE INDEX (k_{index})")
+
+
+def scan_round(args, pool):
+    """并行扫描所有表一轮，返回 (耗时秒, 本轮命中率%)"""
+    start = time.monotonic()
+    requests_before, reads_before = read_bp_counters(args)
+    futures = [pool.submit(scan_table, args, i, name)
+               for i, name in enumerate(table_names(args.tables), 1)]
+    for future in futures:
+        future.result()
+    requests_after, reads_after = read_bp_counters(args)
+
+    requests = requests_after - requests_before
+    reads = reads_after - reads_before
+    hit_ratio = (1 - reads / requests) * 100 if requests else 100.0
+    return time.monotonic() - start, hit_ratio
+
+
+def load_buffer_pool(args, deadline, out):
+    """触发 innodb_buffer_pool_load_now 并等待完成"""
+    run_query(args, "SET GLOBAL innodb_buffer_pool_load_now = ON")
+    status = ''
+    while time.monotonic() < deadline:
+        rows = run_query(args, "SHOW GLOBAL STATUS LIKE 'Innodb_buffer_pool_load_status'")
+        status = rows[0][1] if rows and len(rows[0]) > 1 else ''
+        if 'completed' in status or 'not found' in status.lower() or 'error' in status.lower():
+            break
+        time.sleep(LOAD_POLL_INTERVAL)
+    out.write(f"BP_LOAD_STATUS: {status}\n")
+
+
+def run(args, out):
+    start = time.monotonic()
+    deadline = start + args.max_time
+    out.write(f"WARMUP_MODE: {args.mode}\n")
+
+    if args.mode == 'bp_load':
+        load_buffer_pool(args, deadline, out)
+
+    rounds = 0
+    hit_ratio = None
+    stable = False
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        while time.monotonic() < deadline:
+            seconds, round_ratio = scan_round(args, pool)
+            rounds += 1
+            out.write(f"WARMUP_ROUND_{rounds}: {seconds:.1f}s hit_ratio={round_ratio:.3f}\n")
+            out.flush()
+            print(f"预热第{rounds}轮: {seconds:.1f}秒，命中率 {round_ratio:.3f}%")
+
+            if hit_ratio is not None and abs(round_ratio - hit_ratio) < STABLE_DELTA:
+                hit_ratio = round_ratio
+                stable = True
+                break
+            hit_ratio = round_ratio
+
+    elapsed = time.monotonic() - start
+    out.write(f"WARMUP_ROUNDS: {rounds}\n")
+    out.write(f"WARMUP_SECONDS: {elapsed:.1f}\n")
+    out.write(f"WARMUP_HIT_RATIO: {hit_ratio:.3f}\n" if hit_ratio is not None else "WARMUP_HIT_RATIO: N/A\n")
+    out.write(f"WARMUP_STABLE: {'yes' if stable else 'no'}\n")
+
+
+def parse_warmup_log(log_file):
+    """解析预热记录，返回 {'mode','rounds','seconds','hit_ratio','stable'}；文件不存在时返回 None"""
+    info = {}
+    try:
+        with open_log(log_file) as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                info[key.strip()] = value.strip()
+    except OSError:
+        return None
+
+    if 'WARMUP_ROUNDS' not in info:
+        return None
+
+    hit_ratio = info.get('WARMUP_HIT_RATIO', 'N/A')
+    return {
+        'mode': info.get('WARMUP_MODE', ''),
+        'rounds': int(info['WARMUP_ROUNDS']),
+        'seconds': float(info.get('WARMUP_SECONDS', 0)),
+        'hit_ratio': float(hit_ratio) if hit_ratio != 'N/A' else None,
+        'stable': info.get('WARMUP_STABLE') == 'yes'
+    }
+
+
+def format_warmup(info):
+    """预热信息的报告文字"""
+    if not info:
+        return "未预热"
+    hit_ratio = f"{info['hit_ratio']:.2f}%" if info['hit_ratio'] is not None else "N/A"
+    text = f"{info['mode']}，{info['rounds']} 轮，{info['seconds']:.1f} 秒，最终缓冲池命中率 {hit_ratio}"
+    if not info['stable']:
+        text += " (达到最长预热时间，命中率未稳定)"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='压测前的缓冲池预热')
+    parser.add_argument('-H', '--host', default='127.0.0.1')
+    parser.add_argument('-P', '--port', default='3306')
+    parser.add_argument('-u', '--user', default='root')
+    parser.add_argument('-D', '--database', default='sbtest')
+    parser.add_argument('--tables', type=int, required=True)
+    parser.add_argument('--mode', choices=['scan', 'bp_load'], default='scan')
+    parser.add_argument('--threads', type=int, default=0, help='并行扫描线程数，默认等于表数量')
+    parser.add_argument('--max-time', type=float, default=600, help='最长预热时间(秒)')
+    parser.add_argument('-o', '--output', required=True, help='预热记录文件')
+    parser.add_argument('--mysql-bin', default='mysql', help='mysql客户端命令')
+    args = parser.parse_args()
+    args.threads = args.threads or args.tables
+
+    try:
+        with open(args.output, 'w') as out:
+            run(args, out)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"错误: 预热失败: {e}")
+        sys.exit(1)
+
+    print(f"预热完成: {format_warmup(parse_warmup_log(args.output))}")
+
+
+if __name__ == "__main__":
+    main()